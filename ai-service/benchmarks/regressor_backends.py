@@ -0,0 +1,87 @@
+"""
+Compare the REGRESSOR_BACKEND choices on the SGPA model.
+
+For every training size each backend is fitted with SGPAPredictor's
+default hyperparameters and scored on the same held-out rows: fit time,
+single-row and batched predict latency of the compiled engine (the
+serving path) and RMSE.
+
+    cd ai-service && python benchmarks/regressor_backends.py --sizes 10000,100000,1000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from models.estimators import REGRESSOR_BACKENDS, build_boosting_regressor  # noqa: E402
+from models.sgpa_predictor import SGPAPredictor  # noqa: E402
+from models.tree_engine import compile_ensemble, compile_scaler  # noqa: E402
+from services.prediction_service import PredictionService  # noqa: E402
+
+FEATURES = ['mean_subject_prediction', 'active_backlog_count', 'previous_sgpa', 'attendance_average']
+TEST_ROWS = 20_000
+LATENCY_ROWS = 200
+
+def run(backend: str, X_train, y_train, X_test, y_test) -> dict:
+    from sklearn.preprocessing import StandardScaler
+
+    estimator = build_boosting_regressor(SGPAPredictor.DEFAULT_PARAMS, backend)
+    scaler = StandardScaler()
+    started = time.perf_counter()
+    estimator.fit(scaler.fit_transform(X_train), y_train)
+    fit_seconds = time.perf_counter() - started
+
+    engine, scaler_engine = compile_ensemble(estimator), compile_scaler(scaler)
+    started = time.perf_counter()
+    predictions = engine.predict(scaler_engine.transform(X_test))
+    batch_us = (time.perf_counter() - started) / len(X_test) * 1e6
+
+    timings = []
+    for row in X_test[:LATENCY_ROWS]:
+        started = time.perf_counter()
+        engine.predict(scaler_engine.transform(row))
+        timings.append(time.perf_counter() - started)
+
+    return {
+        "backend": backend,
+        "rows": len(X_train),
+        "fit_seconds": round(fit_seconds, 3),
+        "single_row_ms": round(float(np.median(timings)) * 1000, 4),
+        "batch_us_per_row": round(batch_us, 3),
+        "rmse": round(float(np.sqrt(np.mean((predictions - y_test) ** 2))), 5),
+        "engine_kb": round(engine.nbytes / 1024, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated training row counts")
+    parser.add_argument("--backends", default=",".join(REGRESSOR_BACKENDS))
+    parser.add_argument("--output", help="Write the results as JSON here")
+    args = parser.parse_args()
+
+    service = PredictionService(load_models=False)
+    test = service._demo_sgpa_data(TEST_ROWS, seed=0)
+    X_test, y_test = test[FEATURES].to_numpy(), test['sgpa'].to_numpy()
+
+    results = []
+    print(f"{'backend':<8}{'rows':>10}{'fit s':>10}{'1-row ms':>10}{'batch us/row':>14}{'rmse':>10}{'engine KB':>11}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        train = service._demo_sgpa_data(size, seed=42)
+        X_train, y_train = train[FEATURES].to_numpy(), train['sgpa'].to_numpy()
+        for backend in args.backends.split(","):
+            r = run(backend, X_train, y_train, X_test, y_test)
+            results.append(r)
+            print(f"{r['backend']:<8}{r['rows']:>10}{r['fit_seconds']:>10}{r['single_row_ms']:>10}"
+                  f"{r['batch_us_per_row']:>14}{r['rmse']:>10}{r['engine_kb']:>11}", flush=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Compare the response paths of the batch prediction routes.
+
+"before" is FastAPI's default path: the route returns a response model (or
+a plain dict), FastAPI re-validates it against response_model, runs
+jsonable_encoder and renders with the standard json module. "after"
+returns FastJSONResponse directly (orjson, no re-validation); "columns"
+is the JSON-columns output of /predict/batch/columnar, whose NumPy arrays
+are written without per-value Python objects. Payloads are shaped like the
+real results; time (through the ASGI test client, whole request) and
+bytes are reported per 1k predictions.
+
+    cd ai-service && python benchmarks/response_serialization.py --sizes 1000,10000,100000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from schemas.prediction_schemas import BatchPredictionResponse  # noqa: E402
+from services import columnar  # noqa: E402
+from utils.fast_json import FastJSONResponse  # noqa: E402
+
+REPEATS = 5
+RISK_LEVELS = np.array(['SAFE', 'NEEDS_ATTENTION', 'AT_RISK'], dtype=object)
+
+def subject_result(n: int, rng) -> tuple:
+    """student ids and a SubjectPredictor.predict_columns-shaped result, 1% failed rows"""
+    success = rng.random(n) >= 0.01
+    error = np.full(n, None, dtype=object)
+    error[~success] = "Missing required feature: behavior_score"
+    risk_level = RISK_LEVELS[rng.integers(0, 3, n)]
+    risk_level[~success] = ''
+    result = {
+        'success': success,
+        'error': error,
+        'predicted_score': np.where(success, np.round(rng.uniform(20, 100, n), 2), np.nan),
+        'confidence': np.where(success, np.round(rng.uniform(0.7, 1.0, n), 3), np.nan),
+        'risk_level': risk_level,
+        'model_version': '1'
+    }
+    return np.array([f"STU{i:06d}" for i in range(n)]), result
+
+def enhanced_rows(n: int, rng) -> list:
+    """Rows shaped like /api/predict/batch results"""
+    probabilities = rng.dirichlet(np.ones(3), n)
+    scores = rng.uniform(30, 100, n)
+    return [
+        {
+            "student_id": f"STU{i:06d}",
+            "risk_assessment": {
+                "risk_level": RISK_LEVELS[int(p.argmax())],
+                "confidence": float(p.max()),
+                "probabilities": {"SAFE": float(p[0]), "NEEDS_ATTENTION": float(p[1]), "AT_RISK": float(p[2])}
+            },
+            "performance_prediction": {"predicted_score": float(s), "predicted_grade": "B", "confidence": 0.85}
+        }
+        for i, (p, s) in enumerate(zip(probabilities, scores))
+    ]
+
+def build_apps(payload: dict):
+    """The two response paths, each over the same prebuilt inference output"""
+    before, after = FastAPI(), FastAPI(default_response_class=FastJSONResponse)
+
+    @before.get("/batch", response_model=BatchPredictionResponse)
+    async def batch_before():
+        rows = payload["rows"]
+        return BatchPredictionResponse(
+            success=True, predictions=rows, total_count=len(rows),
+            message=f"Batch prediction completed for {len(rows)} students"
+        )
+
+    @before.get("/enhanced")
+    async def enhanced_before():
+        rows = payload["enhanced"]
+        return {"success": True, "predictions": rows, "total_processed": len(rows)}
+
+    @after.get("/batch", response_model=BatchPredictionResponse)
+    async def batch_after():
+        rows = payload["rows"]
+        return FastJSONResponse({
+            "success": True, "predictions": rows, "total_count": len(rows),
+            "message": f"Batch prediction completed for {len(rows)} students"
+        })
+
+    @after.get("/enhanced")
+    async def enhanced_after():
+        rows = payload["enhanced"]
+        return FastJSONResponse({"success": True, "predictions": rows, "total_processed": len(rows)})
+
+    @after.get("/columns")
+    async def columns_after():
+        result = payload["columns"]
+        n = len(result[columnar.ID_COLUMN])
+        return FastJSONResponse({
+            "success": True, "columns": result, "total_count": n,
+            "message": f"Batch prediction completed for {n} students"
+        })
+
+    return TestClient(before), TestClient(after)
+
+def measure(client: TestClient, path: str, n: int) -> tuple:
+    timings, body = [], b""
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append(time.perf_counter() - started)
+        body = response.content
+        assert response.status_code == 200, response.text
+    per_1k = 1000 / n
+    return statistics.median(timings) * 1000 * per_1k, len(body) * per_1k, body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated prediction counts")
+    parser.add_argument("--output", help="Write the results as JSON here")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    results = []
+    print(f"{'payload':<10}{'path':<9}{'rows':>8}{'ms/1k':>9}{'KB/1k':>9}{'speedup':>9}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        student_ids, result = subject_result(n, rng)
+        payload = {
+            "rows": columnar.to_rows(student_ids, result),
+            "enhanced": enhanced_rows(n, rng),
+            "columns": columnar.to_columns(student_ids, result)
+        }
+        before, after = build_apps(payload)
+
+        cases = [
+            ("batch", "before", before, "/batch"),
+            ("batch", "after", after, "/batch"),
+            ("batch", "columns", after, "/columns"),
+            ("enhanced", "before", before, "/enhanced"),
+            ("enhanced", "after", after, "/enhanced")
+        ]
+        baseline, bodies = {}, {}
+        for name, path_name, client, path in cases:
+            ms, size, bodies[name, path_name] = measure(client, path, n)
+            baseline.setdefault(name, ms)
+            row = {"payload": name, "path": path_name, "rows": n,
+                   "ms_per_1k": round(ms, 3), "bytes_per_1k": round(size), "speedup": round(baseline[name] / ms, 2)}
+            results.append(row)
+            print(f"{name:<10}{path_name:<9}{n:>8}{row['ms_per_1k']:>9}{size / 1024:>9.1f}{row['speedup']:>9}", flush=True)
+
+        # Same document either way
+        for name in ("batch", "enhanced"):
+            assert json.loads(bodies[name, "before"]) == json.loads(bodies[name, "after"]), name
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
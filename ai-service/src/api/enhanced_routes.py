@@ -1,8 +1,17 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Any, Optional
+from functools import partial
 import numpy as np
-from ..models.enhanced_models import ml_models
+import orjson
+from models.enhanced_models import EnhancedMLModels
+from models.feature_builder import feature_builder
+from services.event_loop import cpu_bound
+from services.model_container import get_enhanced_models
+from services.stream_scoring import Lines, NDJSONStreamingResponse, score_ndjson, stream_chunk_rows
+from services.training_jobs import training_jobs
+from utils.fast_json import FastJSONResponse, dumps
 
 router = APIRouter()
 
@@ -22,87 +31,122 @@ class BatchPredictionRequest(BaseModel):
     students: List[Dict[str, Any]]
 
 @router.post("/predict/comprehensive")
-async def predict_comprehensive(features: StudentFeatures):
+@cpu_bound
+def predict_comprehensive(
+    features: StudentFeatures,
+    ml_models: EnhancedMLModels = Depends(get_enhanced_models)
+):
     """Comprehensive prediction for student performance and risk"""
     try:
         # Convert to feature array
-        feature_array = [
-            features.attendance,
-            features.internal_marks,
-            features.assignment_marks,
-            features.behavior_score,
-            features.previous_cgpa,
-            features.backlog_count,
-            features.semester,
-            features.study_hours,
-            features.family_income,
-            features.extracurricular,
-            features.attendance + np.random.normal(0, 2),  # attendance_trend
-            1 - (abs(features.internal_marks - features.assignment_marks) / 20)  # consistency
-        ]
+        feature_array = feature_builder.build([features])[0]
         
-        # Get predictions
-        risk_prediction = ml_models.predict_risk(feature_array)
-        performance_prediction = ml_models.predict_performance(feature_array)
+        # Get predictions (single scale + single forest pass)
+        prediction = ml_models.predict_all(feature_array)
+        risk_prediction = prediction['risk_assessment']
+        performance_prediction = prediction['performance_prediction']
         
         # Generate insights
         insights = generate_insights(features, risk_prediction, performance_prediction)
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "risk_assessment": risk_prediction,
             "performance_prediction": performance_prediction,
             "insights": insights,
             "model_version": "v2.0"
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/predict/batch")
-async def predict_batch(request: BatchPredictionRequest):
+@cpu_bound
+def predict_batch(
+    request: BatchPredictionRequest,
+    ml_models: EnhancedMLModels = Depends(get_enhanced_models)
+):
     """Batch prediction for multiple students"""
     try:
-        results = []
+        students = [StudentFeatures(**student_data) for student_data in request.students]
         
-        for student_data in request.students:
-            features = StudentFeatures(**student_data)
-            
-            feature_array = [
-                features.attendance,
-                features.internal_marks,
-                features.assignment_marks,
-                features.behavior_score,
-                features.previous_cgpa,
-                features.backlog_count,
-                features.semester,
-                features.study_hours,
-                features.family_income,
-                features.extracurricular,
-                features.attendance + np.random.normal(0, 2),
-                1 - (abs(features.internal_marks - features.assignment_marks) / 20)
-            ]
-            
-            risk_pred = ml_models.predict_risk(feature_array)
-            perf_pred = ml_models.predict_performance(feature_array)
-            
-            results.append({
+        feature_matrix = feature_builder.build(students)
+        
+        predictions = ml_models.predict_batch(feature_matrix)
+        
+        results = [
+            {
                 "student_id": student_data.get("student_id"),
-                "risk_assessment": risk_pred,
-                "performance_prediction": perf_pred
-            })
+                **prediction
+            }
+            for student_data, prediction in zip(request.students, predictions)
+        ]
             
-        return {
+        # Encoded directly instead of through jsonable_encoder
+        return FastJSONResponse({
             "success": True,
             "predictions": results,
             "total_processed": len(results)
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/predict/stream", response_class=NDJSONStreamingResponse)
+async def predict_stream(
+    request: Request,
+    chunk_size: Optional[int] = Query(None, ge=1, le=100_000),
+    ml_models: EnhancedMLModels = Depends(get_enhanced_models)
+):
+    """Score newline-delimited JSON student records as they arrive
+    
+    Records are scored ``chunk_size`` at a time (STREAM_CHUNK_ROWS by
+    default) and each chunk's results are written back as NDJSON as soon as
+    they are ready, in input order, so memory stays constant whatever the
+    upload size. A record that cannot be scored yields an ``error`` line
+    instead of failing the stream.
+    """
+    return NDJSONStreamingResponse(score_ndjson(
+        request.stream(),
+        partial(_score_ndjson_chunk, ml_models),
+        stream_chunk_rows(chunk_size)
+    ))
+
+def _score_ndjson_chunk(ml_models: EnhancedMLModels, lines: Lines) -> bytes:
+    """Validate, score and encode one chunk of NDJSON records"""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(lines)
+    students, positions, student_ids = [], [], []
+    for i, (line_number, line) in enumerate(lines):
+        student_id = None
+        try:
+            record = orjson.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("Record must be a JSON object")
+            student_id = record.get("student_id")
+            students.append(StudentFeatures(**record))
+            positions.append(i)
+            student_ids.append(student_id)
+        except (ValueError, ValidationError) as e:
+            results[i] = {"line": line_number, "student_id": student_id, "error": str(e)}
+
+    if students:
+        feature_matrix = feature_builder.build(students)
+        # One non-finite record would make the whole matrix invalid
+        finite = np.isfinite(feature_matrix).all(axis=1)
+        predictions = iter(ml_models.predict_batch(feature_matrix[finite]))
+        for i, student_id, ok in zip(positions, student_ids, finite):
+            if ok:
+                results[i] = {"student_id": student_id, **next(predictions)}
+            else:
+                results[i] = {"line": lines[i][0], "student_id": student_id, "error": "Features must be finite numbers"}
+
+    return b"".join(dumps(result) + b"\n" for result in results)
+
 @router.get("/analytics/department/{department}")
-async def get_department_analytics(department: str):
+async def get_department_analytics(
+    department: str,
+    ml_models: EnhancedMLModels = Depends(get_enhanced_models)
+):
     """Get comprehensive department analytics"""
     try:
         # Simulate department-wide analytics
@@ -125,27 +169,41 @@ async def get_department_analytics(department: str):
             "feature_importance": ml_models.get_feature_importance()
         }
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "analytics": analytics
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/model/retrain")
-async def retrain_models():
-    """Retrain ML models with latest data"""
+@router.post("/model/retrain", status_code=202)
+@cpu_bound
+def retrain_models(training_config: Dict[str, Any] = None):
+    """Start retraining the ML models in the background"""
     try:
-        ml_models.train_models()
+        job = training_jobs.submit("enhanced", training_config)
         return {
             "success": True,
-            "message": "Models retrained successfully",
-            "model_version": "v2.0"
+            "message": "Model retraining started",
+            "job": job
         }
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/model/retrain/{job_id}")
+async def get_retrain_status(job_id: str):
+    """Get status, progress, metrics or failure reason of a retrain job"""
+    job = await run_in_threadpool(training_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return {
+        "success": True,
+        "job": job
+    }
+
 def generate_insights(features: StudentFeatures, risk_pred: dict, perf_pred: dict) -> List[dict]:
     """Generate personalized insights based on predictions"""
     insights = []
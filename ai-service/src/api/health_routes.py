@@ -1,10 +1,20 @@
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from datetime import datetime
 import os
 import psutil
 
+from services.event_loop import loop_monitor
+from services.prefork import worker_memory
+from services.warmup import readiness
+
 router = APIRouter()
 
+# cpu_percent(interval=None) reports usage since the previous call; prime it
+# so the first /detailed call has a baseline instead of sleeping on the loop
+psutil.cpu_percent(interval=None)
+
 @router.get("/")
 async def health_check():
     """Basic health check endpoint"""
@@ -20,7 +30,7 @@ async def detailed_health_check():
     """Detailed health check with system information"""
     try:
         # Get system information
-        cpu_percent = psutil.cpu_percent(interval=1)
+        cpu_percent = psutil.cpu_percent(interval=None)
         memory = psutil.virtual_memory()
         disk = psutil.disk_usage('/')
         
@@ -51,31 +61,17 @@ async def detailed_health_check():
 
 @router.get("/ready")
 async def readiness_check():
-    """Readiness check for Kubernetes"""
-    try:
-        # Check if models are loaded
-        model_path = os.getenv("MODEL_PATH", "./data/models")
-        models_exist = os.path.exists(model_path)
-        
-        if models_exist:
-            return {
-                "status": "ready",
-                "timestamp": datetime.utcnow().isoformat(),
-                "models_loaded": True
-            }
-        else:
-            return {
-                "status": "not_ready",
-                "timestamp": datetime.utcnow().isoformat(),
-                "models_loaded": False,
-                "message": "Models not found"
-            }
-    except Exception as e:
-        return {
-            "status": "not_ready",
-            "timestamp": datetime.utcnow().isoformat(),
-            "error": str(e)
-        }
+    """Readiness check for Kubernetes: 503 until models are loaded and warmed up"""
+    content = {
+        "status": "ready" if readiness.ready else "not_ready",
+        "timestamp": datetime.utcnow().isoformat(),
+        "models_loaded": readiness.ready,
+        "startup": readiness.to_dict()
+    }
+    if not readiness.ready:
+        content["message"] = readiness.error or "Models are loading"
+        return JSONResponse(status_code=503, content=content)
+    return content
 
 @router.get("/live")
 async def liveness_check():
@@ -83,4 +79,20 @@ async def liveness_check():
     return {
         "status": "alive",
         "timestamp": datetime.utcnow().isoformat()
-    }
\ No newline at end of file
+    }
+
+@router.get("/workers")
+async def worker_memory_check():
+    """Per-process unique memory (USS) of the serving workers, to confirm models are shared"""
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        **await run_in_threadpool(worker_memory)
+    }
+
+@router.get("/loop")
+async def event_loop_check():
+    """Event-loop lag and the routes that blocked it"""
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        **loop_monitor.get_stats()
+    }
@@ -1,17 +1,22 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, Any
 import os
 from datetime import datetime
 
+from models.enhanced_models import EnhancedMLModels
+from models.estimators import regressor_backend
+from models.model_registry import model_registry
+from services.event_loop import cpu_bound
+from services.model_container import get_enhanced_models, get_prediction_service
 from services.prediction_service import PredictionService
+from services.training_jobs import training_jobs
 from utils.logger import get_logger
+from utils.prediction_cache import prediction_cache
 
 router = APIRouter()
 logger = get_logger(__name__)
 
-# Initialize prediction service
-prediction_service = PredictionService()
-
 @router.get("/info")
 async def get_models_info():
     """Get information about available models"""
@@ -92,7 +97,10 @@ async def get_model_performance():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/feature-importance/{model_name}")
-async def get_feature_importance(model_name: str):
+async def get_feature_importance(
+    model_name: str,
+    prediction_service: PredictionService = Depends(get_prediction_service)
+):
     """Get feature importance for a specific model"""
     try:
         if model_name == "subject_predictor":
@@ -124,32 +132,107 @@ async def get_feature_importance(model_name: str):
         logger.error(f"Failed to get feature importance: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/retrain/{model_name}")
-async def retrain_model(model_name: str, training_config: Dict[str, Any] = None):
-    """Retrain a specific model (placeholder for future implementation)"""
+@router.post("/retrain/{model_name}", status_code=202)
+@cpu_bound
+def retrain_model(model_name: str, training_config: Dict[str, Any] = None):
+    """Retrain a specific model in a background job"""
     try:
-        # This would be implemented in production to retrain models
-        # with new data
-        
-        if model_name not in ["subject_predictor", "sgpa_predictor"]:
-            raise HTTPException(status_code=404, detail=f"Model '{model_name}' not found")
-        
-        # Mock retraining response
+        job = training_jobs.submit(model_name, training_config)
+        logger.info(f"Retraining of {model_name} started as job {job['job_id']}")
         return {
             "success": True,
             "message": f"Model '{model_name}' retraining initiated",
-            "model_name": model_name,
-            "training_started": datetime.utcnow().isoformat(),
-            "estimated_completion": "30 minutes",
-            "status": "in_progress"
+            "job": job
         }
         
-    except HTTPException:
-        raise
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to retrain model: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/jobs")
+async def list_training_jobs():
+    """List recent retrain jobs, newest first"""
+    return {
+        "success": True,
+        "jobs": await run_in_threadpool(training_jobs.list)
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_training_job(job_id: str):
+    """Get status, progress, metrics or failure reason of a retrain job"""
+    job = await run_in_threadpool(training_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return {
+        "success": True,
+        "job": job
+    }
+
+@router.get("/registry")
+async def list_registry():
+    """List every registered model with its versions and active version"""
+    return {
+        "success": True,
+        "models": await run_in_threadpool(model_registry.list_models)
+    }
+
+@router.get("/registry/{model_name}")
+async def get_registry_manifest(model_name: str):
+    """Get the manifest (versions, features, metrics, checksums) of one model"""
+    manifest = await run_in_threadpool(model_registry.get_manifest, model_name)
+    if not manifest['versions']:
+        raise HTTPException(status_code=404, detail=f"Model '{model_name}' has no registered versions")
+    return {
+        "success": True,
+        "manifest": manifest
+    }
+
+@router.post("/registry/{model_name}/pin/{version}")
+async def pin_model_version(model_name: str, version: str):
+    """Activate a version and keep it active until unpinned"""
+    try:
+        manifest = await run_in_threadpool(model_registry.activate, model_name, version, True)
+        logger.info(f"Pinned {model_name} to version {version}")
+        return {
+            "success": True,
+            "message": f"Model '{model_name}' pinned to version {version}",
+            "manifest": manifest
+        }
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except Exception as e:
+        logger.error(f"Failed to pin model version: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/registry/{model_name}/pin")
+async def unpin_model_version(model_name: str):
+    """Let the next published version become active again"""
+    return {
+        "success": True,
+        "manifest": await run_in_threadpool(model_registry.unpin, model_name)
+    }
+
+@router.post("/registry/{model_name}/rollback")
+async def rollback_model_version(model_name: str):
+    """Activate and pin the version before the active one"""
+    try:
+        manifest = await run_in_threadpool(model_registry.rollback, model_name)
+        logger.info(f"Rolled {model_name} back to version {manifest['active']}")
+        return {
+            "success": True,
+            "message": f"Model '{model_name}' rolled back to version {manifest['active']}",
+            "manifest": manifest
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to roll back model: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/status")
 async def get_models_status():
     """Get current status of all models"""
@@ -182,50 +265,70 @@ async def get_models_status():
         logger.error(f"Failed to get models status: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/load-stats")
+async def get_load_stats(
+    prediction_service: PredictionService = Depends(get_prediction_service),
+    ml_models: EnhancedMLModels = Depends(get_enhanced_models)
+):
+    """Get load mode, load time and resident-memory growth of each loaded model"""
+    stats = {
+        predictor.model_name: predictor.load_stats
+        for predictor in prediction_service.predictors
+    }
+    stats[ml_models.MODEL_NAME] = ml_models.load_stats
+    return {
+        "success": True,
+        "load_stats": stats
+    }
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get prediction cache hit/miss/eviction counters"""
+    return {
+        "success": True,
+        "cache": prediction_cache.get_stats()
+    }
+
+@router.delete("/cache")
+async def clear_cache():
+    """Drop every cached prediction"""
+    prediction_cache.invalidate()
+    return {
+        "success": True,
+        "message": "Prediction cache cleared",
+        "cache": prediction_cache.get_stats()
+    }
+
 @router.get("/config/{model_name}")
-async def get_model_config(model_name: str):
-    """Get configuration for a specific model"""
+async def get_model_config(
+    model_name: str,
+    prediction_service: PredictionService = Depends(get_prediction_service)
+):
+    """Get the configuration of the served version of a model"""
     try:
         if model_name == "subject_predictor":
-            config = {
-                "model_type": "RandomForestRegressor",
-                "n_estimators": 100,
-                "max_depth": 10,
-                "random_state": 42,
-                "features": [
-                    "attendance_percentage",
-                    "best_of_two_internals",
-                    "assignment_marks", 
-                    "behavior_score"
-                ],
-                "target": "final_marks",
-                "preprocessing": {
-                    "scaler": "StandardScaler",
-                    "feature_selection": None
-                }
-            }
+            target = "final_marks"
         elif model_name == "sgpa_predictor":
-            config = {
-                "model_type": "GradientBoostingRegressor",
-                "n_estimators": 100,
-                "learning_rate": 0.1,
-                "max_depth": 6,
-                "random_state": 42,
-                "features": [
-                    "mean_subject_prediction",
-                    "active_backlog_count",
-                    "previous_sgpa",
-                    "attendance_average"
-                ],
-                "target": "sgpa",
-                "preprocessing": {
-                    "scaler": "StandardScaler",
-                    "feature_selection": None
-                }
-            }
+            target = "sgpa"
         else:
             raise HTTPException(status_code=404, detail=f"Model '{model_name}' not found")
         
+        predictor = prediction_service.get_predictor(model_name)
+        estimator = predictor.estimator_config()
+        config = {
+            "model_type": estimator["model_type"],
+            "version": predictor.version,
+            "params": estimator["params"],
+            "features": list(predictor.feature_names),
+            "target": target,
+            "preprocessing": {
+                "scaler": "StandardScaler",
+                "feature_selection": None
+            }
+        }
+        if model_name == "sgpa_predictor":
+            config["backend"] = regressor_backend()
+        
         return {
             "success": True,
             "model_name": model_name,
@@ -1,7 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from typing import List, Literal
 
 from schemas.prediction_schemas import (
     SubjectPredictionRequest,
@@ -9,41 +7,39 @@ from schemas.prediction_schemas import (
     SemesterPredictionRequest,
     SemesterPredictionResponse,
     BatchPredictionRequest,
-    BatchPredictionResponse
+    BatchPredictionResponse,
+    PredictionType
 )
-from services.prediction_service import PredictionService
+from services import columnar
+from services.inference_pool import InferencePool
+from services.micro_batcher import MicroBatcher
+from services.model_container import get_inference_pool, get_subject_batcher, get_semester_batcher
+from utils.fast_json import FastJSONResponse
 from utils.logger import get_logger
 
 router = APIRouter()
 logger = get_logger(__name__)
 
-# Initialize prediction service
-prediction_service = PredictionService()
-
-# Thread pool for CPU-intensive tasks
-executor = ThreadPoolExecutor(max_workers=4)
-
 @router.post("/subject", response_model=SubjectPredictionResponse)
-async def predict_subject_performance(request: SubjectPredictionRequest):
+async def predict_subject_performance(
+    request: SubjectPredictionRequest,
+    subject_batcher: MicroBatcher = Depends(get_subject_batcher)
+):
     """
     Predict individual subject performance
     """
     try:
         logger.info(f"Subject prediction request for student: {request.student_id}")
         
-        # Run prediction in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            executor,
-            prediction_service.predict_subject_performance,
-            request.dict()
-        )
+        # Coalesced with concurrent requests and scored on the inference pool
+        result = await subject_batcher.submit(request.dict())
         
-        return SubjectPredictionResponse(
-            success=True,
-            prediction=result,
-            message="Subject performance prediction completed successfully"
-        )
+        # Built here from the model's own output: skip response_model re-validation
+        return FastJSONResponse({
+            "success": True,
+            "prediction": result,
+            "message": "Subject performance prediction completed successfully"
+        })
         
     except Exception as e:
         logger.error(f"Subject prediction failed: {str(e)}")
@@ -53,26 +49,24 @@ async def predict_subject_performance(request: SubjectPredictionRequest):
         )
 
 @router.post("/semester", response_model=SemesterPredictionResponse)
-async def predict_semester_sgpa(request: SemesterPredictionRequest):
+async def predict_semester_sgpa(
+    request: SemesterPredictionRequest,
+    semester_batcher: MicroBatcher = Depends(get_semester_batcher)
+):
     """
     Predict semester SGPA
     """
     try:
         logger.info(f"Semester prediction request for student: {request.student_id}")
         
-        # Run prediction in thread pool
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            executor,
-            prediction_service.predict_semester_sgpa,
-            request.dict()
-        )
+        # Coalesced with concurrent requests and scored on the inference pool
+        result = await semester_batcher.submit(request.dict())
         
-        return SemesterPredictionResponse(
-            success=True,
-            prediction=result,
-            message="Semester SGPA prediction completed successfully"
-        )
+        return FastJSONResponse({
+            "success": True,
+            "prediction": result,
+            "message": "Semester SGPA prediction completed successfully"
+        })
         
     except Exception as e:
         logger.error(f"Semester prediction failed: {str(e)}")
@@ -82,28 +76,31 @@ async def predict_semester_sgpa(request: SemesterPredictionRequest):
         )
 
 @router.post("/batch", response_model=BatchPredictionResponse)
-async def batch_predict(request: BatchPredictionRequest):
+async def batch_predict(
+    request: BatchPredictionRequest,
+    inference_pool: InferencePool = Depends(get_inference_pool)
+):
     """
     Batch prediction for multiple students
     """
     try:
         logger.info(f"Batch prediction request for {len(request.students)} students")
         
-        # Run batch prediction in thread pool
-        loop = asyncio.get_event_loop()
-        results = await loop.run_in_executor(
-            executor,
-            prediction_service.batch_predict,
-            request.students,
+        # Run batch prediction on the inference pool
+        results = await inference_pool.run(
+            "batch_predict",
+            [student.dict() for student in request.students],
             request.prediction_type
         )
         
-        return BatchPredictionResponse(
-            success=True,
-            predictions=results,
-            total_count=len(results),
-            message=f"Batch prediction completed for {len(results)} students"
-        )
+        # Rows come complete from the service; re-validating each one costs
+        # as much as the prediction for large batches
+        return FastJSONResponse({
+            "success": True,
+            "predictions": results,
+            "total_count": len(results),
+            "message": f"Batch prediction completed for {len(results)} students"
+        })
         
     except Exception as e:
         logger.error(f"Batch prediction failed: {str(e)}")
@@ -112,19 +109,94 @@ async def batch_predict(request: BatchPredictionRequest):
             detail=f"Batch prediction failed: {str(e)}"
         )
 
+@router.post("/batch/columnar", response_model=BatchPredictionResponse)
+async def batch_predict_columnar(
+    request: Request,
+    prediction_type: PredictionType = Query(..., description="Type of prediction"),
+    response_format: Literal["json", "json_columns", "npz", "arrow"] = Query("json", description="Encoding of the results"),
+    inference_pool: InferencePool = Depends(get_inference_pool)
+):
+    """
+    Batch prediction from a columnar payload
+    
+    The body is an Arrow IPC stream (application/vnd.apache.arrow.stream,
+    needs pyarrow) or an .npz archive (application/x-npz) with one column
+    per feature plus ``student_id``. Results come back as JSON rows or, with
+    ``response_format``, as JSON columns or in the same columnar encodings.
+    """
+    payload = await request.body()
+    try:
+        input_format = columnar.input_format(request.headers.get("content-type"), payload)
+    except columnar.ColumnarFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    if columnar.ARROW in (input_format, response_format) and not columnar.arrow_available():
+        raise HTTPException(status_code=415, detail="Arrow payloads need pyarrow, which is not installed")
+    
+    try:
+        result = await inference_pool.run(
+            "batch_predict_columnar",
+            payload,
+            input_format,
+            prediction_type.value,
+            response_format
+        )
+    except columnar.ColumnarFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Columnar batch prediction failed: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch prediction failed: {str(e)}"
+        )
+    
+    if response_format == columnar.JSON_COLUMNS:
+        return FastJSONResponse({
+            "success": True,
+            "columns": result,
+            "total_count": len(result[columnar.ID_COLUMN]),
+            "message": f"Batch prediction completed for {len(result[columnar.ID_COLUMN])} students"
+        })
+    if response_format != columnar.JSON:
+        return Response(content=result, media_type=columnar.MEDIA_TYPES[response_format])
+    return FastJSONResponse({
+        "success": True,
+        "predictions": result,
+        "total_count": len(result),
+        "message": f"Batch prediction completed for {len(result)} students"
+    })
+
+@router.get("/batching/stats")
+async def get_batching_stats(
+    inference_pool: InferencePool = Depends(get_inference_pool),
+    subject_batcher: MicroBatcher = Depends(get_subject_batcher),
+    semester_batcher: MicroBatcher = Depends(get_semester_batcher)
+):
+    """
+    Micro-batching settings and achieved batch sizes
+    """
+    return {
+        "success": True,
+        "backend": inference_pool.get_info(),
+        "batchers": {
+            "subject": subject_batcher.get_stats(),
+            "semester": semester_batcher.get_stats()
+        }
+    }
+
 @router.post("/explain/{prediction_id}")
-async def explain_prediction(prediction_id: str):
+async def explain_prediction(
+    prediction_id: str,
+    inference_pool: InferencePool = Depends(get_inference_pool)
+):
     """
     Get explanation for a specific prediction using SHAP
     """
     try:
         logger.info(f"Explanation request for prediction: {prediction_id}")
         
-        # Run explanation in thread pool
-        loop = asyncio.get_event_loop()
-        explanation = await loop.run_in_executor(
-            executor,
-            prediction_service.explain_prediction,
+        # Run explanation on the inference pool
+        explanation = await inference_pool.run(
+            "explain_prediction",
             prediction_id
         )
         
@@ -142,18 +214,19 @@ async def explain_prediction(prediction_id: str):
         )
 
 @router.get("/risk-analysis/{student_id}")
-async def get_risk_analysis(student_id: str):
+async def get_risk_analysis(
+    student_id: str,
+    inference_pool: InferencePool = Depends(get_inference_pool)
+):
     """
     Get comprehensive risk analysis for a student
     """
     try:
         logger.info(f"Risk analysis request for student: {student_id}")
         
-        # Run risk analysis in thread pool
-        loop = asyncio.get_event_loop()
-        analysis = await loop.run_in_executor(
-            executor,
-            prediction_service.get_risk_analysis,
+        # Run risk analysis on the inference pool
+        analysis = await inference_pool.run(
+            "get_risk_analysis",
             student_id
         )
         
@@ -1,6 +1,8 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import os
 from dotenv import load_dotenv
@@ -9,6 +11,11 @@ from api.prediction_routes import router as prediction_router
 from api.model_routes import router as model_router
 from api.health_routes import router as health_router
 from api.enhanced_routes import router as enhanced_router
+from services.event_loop import RequestTracker, loop_monitor
+from services.model_container import container, watch_registry
+from services.prefork import PreforkServer, server_workers
+from services.warmup import readiness
+from utils.fast_json import FastJSONResponse
 from utils.logger import setup_logger
 
 # Load environment variables
@@ -17,13 +24,50 @@ load_dotenv()
 # Setup logging
 logger = setup_logger()
 
+def load_enhanced_models():
+    ml_models = container.enhanced_models
+    if not ml_models.is_trained:
+        ml_models.load_models()
+    return ml_models.load_stats
+
+def load_and_warm_up(worker: bool = True):
+    """
+    Load every model and run warm-up predictions before taking traffic.
+    
+    The prefork master runs it with ``worker=False``: the inference pool is
+    per-process state, started by each worker's own (otherwise no-op) run.
+    """
+    steps = [
+        ("load_prediction_models", container.load_prediction_models),
+        ("load_enhanced_models", load_enhanced_models),
+        ("warm_up_enhanced_models", container.enhanced_models.warm_up),
+        ("warm_up_prediction_models", lambda: container.prediction_service.warm_up()),
+    ]
+    if worker:
+        steps.append(("warm_up_inference_pool", lambda: container.inference_pool.warm_up()))
+    readiness.run(steps)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Liveness is served while models load; /health/ready reports 503 until done
+    startup = asyncio.create_task(asyncio.to_thread(load_and_warm_up))
+    watcher = asyncio.create_task(watch_registry())
+    loop_monitor.start()
+    yield
+    loop_monitor.stop()
+    watcher.cancel()
+    if not startup.done():
+        startup.cancel()
+
 # Create FastAPI app
 app = FastAPI(
     title="MentorTrack AI Service",
     description="AI-powered academic performance prediction service",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -35,6 +79,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Attributes event-loop stalls to the request being served (GET /health/loop)
+app.add_middleware(RequestTracker, monitor=loop_monitor)
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -66,10 +113,15 @@ async def root():
 
 if __name__ == "__main__":
     port = int(os.getenv("AI_SERVICE_PORT", 8000))
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=port,
-        reload=True if os.getenv("DEBUG") == "true" else False,
-        log_level="info"
-    )
\ No newline at end of file
+    workers = server_workers()
+    if workers > 1 and os.getenv("DEBUG") != "true":
+        # Models are loaded once and shared copy-on-write by the workers
+        PreforkServer(app, "0.0.0.0", port, workers, preload=lambda: load_and_warm_up(worker=False)).run()
+    else:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=port,
+            reload=True if os.getenv("DEBUG") == "true" else False,
+            log_level="info"
+        )
\ No newline at end of file
@@ -1,17 +1,40 @@
 import os
+import json
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 import joblib
+import numpy as np
+from .tree_engine import (
+    compile_ensemble, compile_scaler, save_engine, load_engine, save_scaler, load_scaler
+)
+from .model_registry import ModelBundle, model_registry
+from .incremental import TrainingSet, grow_ensemble, incremental_estimators, timed, time_saved
+from .data_source import TrainingDataSource, hash_split
+from .estimators import tree_count, tree_count_param
+from .compression import check_compression, compress_for_serving
+from utils.resource_usage import measure_load
 
 class BaseModel(ABC):
     """Base class for all ML models"""
     
+    # Held-out rows kept from a streamed source to check the compression
+    COMPRESSION_VALIDATION_ROWS = 50_000
+    
     def __init__(self, model_name: str, model_path: Optional[str] = None):
         self.model_name = model_name
         self.model_path = model_path or os.getenv('MODEL_PATH', './data/models')
         self.version = "1.0"
         self.is_trained = False
         
+        # Snapshot served by predict(), replaced as a whole by compile()/load
+        self.bundle: Optional[ModelBundle] = None
+        self.registry = model_registry
+        # Timing and memory of the last load, see load_version/load_engines
+        self.load_stats: Dict = {}
+        # Report of the last checked compression, see compile()
+        self.compression: Optional[Dict] = None
+        
         # Ensure model directory exists
         os.makedirs(self.model_path, exist_ok=True)
     
@@ -35,13 +58,383 @@ class BaseModel(ABC):
         """Load a trained model"""
         pass
     
+    @property
+    def engine(self):
+        return self.bundle.engine if self.bundle else None
+    
+    @property
+    def scaler_engine(self):
+        return self.bundle.scaler_engine if self.bundle else None
+    
+    @property
+    def model_token(self) -> int:
+        return self.bundle.token if self.bundle else 0
+    
+    def compile(self, X_val: Any = None, y_val: Any = None):
+        """
+        Flatten the fitted estimator and scaler into a new served bundle.
+        
+        The engine is compressed (see models.compression); training passes
+        its held-out rows so the loss is measured and publish can refuse a
+        model compressed past COMPRESSION_TOLERANCE.
+        """
+        scaler_engine = compile_scaler(self.scaler)
+        if X_val is not None:
+            X_val = scaler_engine.transform(X_val)
+        engine, self.compression = compress_for_serving(compile_ensemble(self.model), X_val, y_val)
+        self.bundle = ModelBundle(
+            self.version,
+            self.feature_names,
+            model=self.model,
+            scaler=self.scaler,
+            engine=engine,
+            scaler_engine=scaler_engine,
+            feature_importance=self._feature_importance(),
+            estimator=self._describe_estimator(self.model)
+        )
+    
+    @staticmethod
+    def _describe_estimator(estimator: Any) -> Dict:
+        """Estimator class and hyperparameters, JSON-ready for the engine header"""
+        params = {}
+        for name, value in estimator.get_params(deep=False).items():
+            if isinstance(value, np.generic):
+                value = value.item()
+            params[name] = value if value is None or isinstance(value, (bool, int, float, str)) else repr(value)
+        return {'model_type': type(estimator).__name__, 'params': params}
+    
+    def estimator_config(self) -> Dict:
+        """
+        Class and hyperparameters of the served estimator. Versions exported
+        before they were recorded report the estimator this predictor would
+        build from its current ``params``.
+        """
+        bundle = self.bundle
+        config = getattr(bundle, 'estimator', None) if bundle is not None else None
+        return config or self._describe_estimator(self._build_model())
+    
+    def _feature_importance(self) -> Optional[Dict]:
+        importances = getattr(self.model, 'feature_importances_', None)
+        if importances is None:
+            return None
+        return dict(zip(self.feature_names, np.asarray(importances).tolist()))
+    
+    def train_full(self, training_data: Any) -> Dict:
+        """Full retrain that also resets the persisted training set"""
+        metrics, seconds = timed(self.train, training_data)
+        TrainingSet(self.model_name, self.model_path).replace(training_data)
+        metrics.update(
+            mode='full',
+            train_seconds=round(seconds, 3),
+            full_train_seconds=round(seconds, 3),
+            rows_total=len(training_data)
+        )
+        return metrics
+    
+    def train_incremental(self, new_data: Any, n_estimators: Optional[int] = None,
+                          compare_full: bool = False) -> Dict:
+        """
+        Grow the current model on a new slice of training rows.
+        
+        ``n_estimators`` trees (or boosting stages) are added with warm_start
+        on the persisted training set plus the new rows, keeping the fitted
+        scaler. 20% of the new rows are held out for scoring. With
+        ``compare_full`` a from-scratch fit on the same rows is timed and
+        scored too; otherwise savings are reported against the last recorded
+        full retrain. Falls back to a full retrain when there is no model or
+        training set to grow from.
+        """
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.metrics import mean_squared_error, r2_score
+        
+        training_set = TrainingSet(self.model_name, self.model_path)
+        if not training_set.exists() or (self.model is None and not self.load_version(mode='pickle')):
+            return self.train_full(new_data)
+        
+        resolved = self.registry.resolve(self.model_name, verify=False)
+        base_metrics = (resolved[0].get('metrics') or {}) if resolved else {}
+        
+        new_train, new_test = train_test_split(new_data, test_size=0.2, random_state=42)
+        train_data = pd.concat([training_set.load(), new_train], ignore_index=True)
+        X_train, y_train = train_data[self.feature_names], train_data[self.target_name]
+        X_test, y_test = new_test[self.feature_names], new_test[self.target_name]
+        
+        # Existing splits are in the fitted scaler's units, so it stays fixed
+        n_new = incremental_estimators(n_estimators)
+        model, seconds = timed(grow_ensemble, self.model, n_new, self.scaler.transform(X_train), y_train)
+        test_pred = model.predict(self.scaler.transform(X_test))
+        
+        metrics = {
+            'mode': 'incremental',
+            'base_version': self.version,
+            'estimators_added': n_new,
+            'n_estimators': tree_count(model),
+            'rows_added': len(new_data),
+            'rows_total': len(train_data) + len(new_test),
+            'train_seconds': round(seconds, 3),
+            'test_rmse': float(np.sqrt(mean_squared_error(y_test, test_pred))),
+            'test_r2': float(r2_score(y_test, test_pred)),
+            'full_train_seconds': base_metrics.get('full_train_seconds')
+        }
+        
+        if compare_full:
+            full_model, full_scaler = self._build_model(), StandardScaler()
+            _, full_seconds = timed(lambda: full_model.fit(full_scaler.fit_transform(X_train), y_train))
+            full_pred = full_model.predict(full_scaler.transform(X_test))
+            metrics['full_retrain'] = {
+                'train_seconds': round(full_seconds, 3),
+                'test_rmse': float(np.sqrt(mean_squared_error(y_test, full_pred))),
+                'test_r2': float(r2_score(y_test, full_pred))
+            }
+            metrics['full_train_seconds'] = round(full_seconds, 3)
+        metrics.update(time_saved(seconds, metrics['full_train_seconds']))
+        
+        self.model = model
+        self.is_trained = True
+        self.compile(X_test, y_test)
+        metrics['compression'] = self.compression
+        training_set.append(new_data)
+        return metrics
+    
+    def train_streaming(self, source: TrainingDataSource, test_fraction: float = 0.2,
+                        id_column: str = 'student_id') -> Dict:
+        """
+        Train from a chunked source without loading it whole.
+        
+        Pass one fits the scaler with ``partial_fit``; pass two grows the
+        ensemble with warm_start, each chunk adding its share of the
+        configured trees (or boosting stages, fitted to the residuals on that
+        chunk); pass three scores the held-out rows. Test rows are picked by
+        hash_split on ``id_column``, so peak memory is one chunk plus the
+        model. The rows are also streamed into the persisted training set.
+        """
+        from sklearn.preprocessing import StandardScaler
+        
+        columns = self.feature_names + [self.target_name, id_column]
+        
+        def split_chunks():
+            offset = 0
+            for chunk in source.chunks(columns):
+                test = hash_split(chunk, test_fraction, id_column, offset)
+                offset += len(chunk)
+                X = chunk[self.feature_names].to_numpy(dtype=np.float64)
+                y = chunk[self.target_name].to_numpy(dtype=np.float64)
+                yield X[~test], y[~test], X[test], y[test]
+        
+        started = time.perf_counter()
+        scaler = StandardScaler()
+        n_chunks, rows_train, rows_test, peak_rows = 0, 0, 0, 0
+        for X_train, _, X_test, _ in split_chunks():
+            if len(X_train):
+                scaler.partial_fit(X_train)
+            n_chunks += 1
+            rows_train += len(X_train)
+            rows_test += len(X_test)
+            peak_rows = max(peak_rows, len(X_train) + len(X_test))
+        if rows_train == 0:
+            raise ValueError("Training data source has no training rows")
+        
+        model = self._build_model()
+        total, count_param = tree_count(model), tree_count_param(model)
+        model.set_params(warm_start=True)
+        grown = 0
+        for i, (X_train, y_train, _, _) in enumerate(split_chunks()):
+            if not len(X_train):
+                continue
+            # Spread the trees evenly over the chunks, at least one each
+            grown += max(1, total * (i + 1) // n_chunks - total * i // n_chunks)
+            model.set_params(**{count_param: grown})
+            model.fit(scaler.transform(X_train), y_train)
+        model.set_params(warm_start=False)
+        train_seconds = time.perf_counter() - started
+        
+        sse, sum_y, sum_y2 = 0.0, 0.0, 0.0
+        X_val, y_val, val_rows = [], [], 0
+        for _, _, X_test, y_test in split_chunks():
+            if len(X_test):
+                sse += float(np.sum((model.predict(scaler.transform(X_test)) - y_test) ** 2))
+                sum_y += float(y_test.sum())
+                sum_y2 += float(np.dot(y_test, y_test))
+                # Bounded sample of the held-out rows checks the compression
+                take = min(len(X_test), self.COMPRESSION_VALIDATION_ROWS - val_rows)
+                if take > 0:
+                    X_val.append(X_test[:take])
+                    y_val.append(y_test[:take])
+                    val_rows += take
+        
+        self.model, self.scaler = model, scaler
+        self.is_trained = True
+        if val_rows:
+            self.compile(np.concatenate(X_val), np.concatenate(y_val))
+        else:
+            self.compile()
+        TrainingSet(self.model_name, self.model_path).replace_chunks(
+            chunk[self.feature_names + [self.target_name]] for chunk in source.chunks(columns)
+        )
+        
+        metrics = {
+            'mode': 'streaming',
+            'chunks': n_chunks,
+            'chunk_size': source.chunk_size,
+            'peak_chunk_rows': peak_rows,
+            'rows_train': rows_train,
+            'rows_test': rows_test,
+            'n_estimators': tree_count(model),
+            'train_seconds': round(train_seconds, 3),
+            'full_train_seconds': round(train_seconds, 3),
+            'rows_total': rows_train + rows_test,
+            'feature_importance': self._feature_importance(),
+            'compression': self.compression
+        }
+        if rows_test:
+            total_ss = sum_y2 - sum_y ** 2 / rows_test
+            metrics['test_rmse'] = float(np.sqrt(sse / rows_test))
+            metrics['test_r2'] = float(1 - sse / total_ss) if total_ss > 0 else None
+        return metrics
+    
+    def publish(self, metrics: Optional[Dict] = None) -> Dict:
+        """
+        Publish the trained model as a new registry version: the estimator
+        pickle for retraining plus the engine arrays served by load_version.
+        """
+        if not self.is_trained:
+            raise Exception("No trained model to publish")
+        check_compression(self.compression, self.model_name)
+        
+        model_data = self._model_data()
+        
+        def write(directory: str):
+            joblib.dump(model_data, os.path.join(directory, f"{self.model_name}.pkl"))
+            self.export_engines(directory)
+        
+        entry = self.registry.publish(self.model_name, write, self.feature_names, metrics)
+        self.version = entry['version']
+        self.bundle = self.bundle.replace(version=self.version)
+        return entry
+    
+    def load_version(self, version: Optional[str] = None, mode: Optional[str] = None) -> bool:
+        """
+        Serve a registry version (default: the active one); False if there is
+        none. In ``mmap`` mode (MODEL_LOAD_MODE, the default) the engine
+        arrays are memory-mapped; ``pickle`` mode, or a version without
+        engine arrays, unpickles the estimator and compiles it.
+        """
+        resolved = self.registry.resolve(self.model_name, version, verify=False)
+        if resolved is None:
+            return False
+        
+        entry, directory = resolved
+        mode = mode or os.getenv('MODEL_LOAD_MODE', 'mmap')
+        pickle_file = f"{self.model_name}.pkl"
+        if mode == 'mmap' and os.path.exists(os.path.join(directory, f"{self.model_name}.json")):
+            # Only the files the mapping reads, never the pickle
+            verify_ms = self.registry.verify_files(
+                self.model_name, entry, [name for name in entry['files'] if name != pickle_file]
+            )
+            self.load_engines(directory, 'r', version=entry['version'])
+            self.load_stats['verify_ms'] = verify_ms
+            self.load_stats['load_ms'] = round(self.load_stats['load_ms'] + verify_ms, 3)
+            return True
+        
+        stats = {'mode': 'pickle', 'version': entry['version']}
+        with measure_load(stats):
+            stats['verify_ms'] = self.registry.verify_files(self.model_name, entry, [pickle_file])
+            model_data = joblib.load(os.path.join(directory, pickle_file))
+            self.model = model_data['model']
+            self.scaler = model_data['scaler']
+            self.feature_names = model_data['feature_names']
+            self.version = entry['version']
+            self.is_trained = True
+            self.compile()
+        self.load_stats = stats
+        return True
+    
+    def _model_data(self) -> Dict:
+        return {
+            'model': self.model,
+            'scaler': self.scaler,
+            'feature_names': self.feature_names,
+            'version': self.version,
+            'is_trained': self.is_trained
+        }
+    
+    def export_engines(self, directory: str) -> str:
+        """
+        Write the served model as uncompressed ``.npy`` arrays plus a small
+        JSON header, for memory-mapped loading without the estimator.
+        """
+        bundle = self.bundle
+        if bundle is None:
+            raise Exception("Model not compiled. Train or load the model first.")
+        
+        os.makedirs(directory, exist_ok=True)
+        meta = {
+            'model_name': self.model_name,
+            'version': bundle.version,
+            'feature_names': list(bundle.feature_names),
+            'feature_importance': bundle.feature_importance,
+            'estimator': bundle.estimator,
+            'engine': save_engine(bundle.engine, directory, self.model_name),
+            'scaler': save_scaler(bundle.scaler_engine, directory, self.model_name)
+        }
+        path = os.path.join(directory, f"{self.model_name}.json")
+        with open(path, 'w') as f:
+            json.dump(meta, f)
+        return path
+    
+    def load_engines(self, directory: str, mmap_mode: Optional[str] = 'r', version: Optional[str] = None) -> bool:
+        """Serve from engine arrays written by export_engines, without the estimator"""
+        path = os.path.join(directory, f"{self.model_name}.json")
+        if not os.path.exists(path):
+            return False
+        
+        stats = {'mode': 'mmap' if mmap_mode else 'arrays'}
+        with measure_load(stats):
+            with open(path) as f:
+                meta = json.load(f)
+            bundle = ModelBundle(
+                version or meta['version'],
+                meta['feature_names'],
+                model=None,
+                scaler=None,
+                engine=load_engine(directory, self.model_name, meta['engine'], mmap_mode),
+                scaler_engine=load_scaler(directory, self.model_name, meta['scaler'], mmap_mode),
+                feature_importance=meta.get('feature_importance'),
+                estimator=meta.get('estimator')
+            )
+            self.feature_names = list(bundle.feature_names)
+            self.version = bundle.version
+            self.is_trained = True
+            self.bundle = bundle
+        stats['version'] = bundle.version
+        stats['mapped_mb'] = round((bundle.engine.nbytes + bundle.scaler_engine.nbytes) / (1 << 20), 3)
+        self.load_stats = stats
+        return True
+    
+    def warm_up(self, n_rows: Optional[int] = None) -> Dict:
+        """Fault in the served arrays and push one synthetic batch through them"""
+        bundle = self.bundle
+        if bundle is None:
+            return {'skipped': 'not trained'}
+        
+        n_rows = n_rows or int(os.getenv('WARMUP_ROWS', 256))
+        prefaulted = bundle.engine.prefault()
+        X = np.random.default_rng(0).standard_normal((n_rows, bundle.engine.n_features))
+        bundle.scaler_engine.transform(X)
+        bundle.engine.tree_values(X)
+        return {'rows': n_rows, 'prefaulted_mb': round(prefaulted / (1 << 20), 3)}
+    
     def get_model_info(self) -> Dict:
         """Get model information"""
         return {
             'name': self.model_name,
             'version': self.version,
             'is_trained': self.is_trained,
-            'model_path': self.model_path
+            'model_path': self.model_path,
+            'load_stats': self.load_stats,
+            'compression': self.compression
         }
     
     def validate_features(self, features: Dict, required_features: list) -> bool:
@@ -49,4 +442,37 @@ class BaseModel(ABC):
         missing_features = [f for f in required_features if f not in features]
         if missing_features:
             raise ValueError(f"Missing required features: {missing_features}")
-        return True
\ No newline at end of file
+        return True
+    
+    def column_matrix(self, columns: Dict[str, np.ndarray], n_rows: int,
+                      defaults: Optional[Dict] = None) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Build the feature matrix of ``n_rows`` students from named columns
+        (columnar batch input); absent columns are missing for every row.
+        
+        Returns the matrix, one error message (or None) per row, and for
+        each feature in ``defaults`` the mask of rows it was filled in. NaN
+        counts as missing and infinities as invalid; the first bad feature
+        of a row names its error.
+        """
+        X = np.empty((n_rows, len(self.feature_names)), dtype=np.float64)
+        errors = np.full(n_rows, None, dtype=object)
+        filled: Dict[str, np.ndarray] = {}
+        defaults = defaults or {}
+        
+        for j, feature_name in enumerate(self.feature_names):
+            if feature_name in columns:
+                column = np.asarray(columns[feature_name], dtype=np.float64)
+            else:
+                column = np.full(n_rows, np.nan)
+            missing, invalid = np.isnan(column), np.isinf(column)
+            if feature_name in defaults:
+                filled[feature_name] = missing
+                column = np.where(missing, defaults[feature_name], column)
+                missing = np.zeros(n_rows, dtype=bool)
+            unset = errors == None  # noqa: E711 - elementwise on the object array
+            errors[missing & unset] = f"Missing required feature: {feature_name}"
+            errors[invalid & unset] = f"Invalid value for feature: {feature_name}"
+            X[:, j] = column
+        
+        return X, errors, filled
@@ -0,0 +1,221 @@
+import os
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .tree_engine import CompiledTreeEnsemble, load_engine, save_engine
+
+# Rows timed one at a time for the single-row latency of a report
+LATENCY_ROWS = 50
+
+def compression_settings() -> Dict:
+    """
+    Post-training compression of the served engines (MODEL_COMPRESSION,
+    COMPRESSION_MAX_DEPTH, COMPRESSION_FLOAT32, COMPRESSION_TOLERANCE).
+    """
+    max_depth = os.getenv("COMPRESSION_MAX_DEPTH")
+    return {
+        'enabled': os.getenv("MODEL_COMPRESSION", "true").lower() == "true",
+        'max_depth': int(max_depth) if max_depth else None,
+        'float32': os.getenv("COMPRESSION_FLOAT32", "true").lower() == "true",
+        'tolerance': float(os.getenv("COMPRESSION_TOLERANCE", 0.01))
+    }
+
+def _round_down_float32(threshold: np.ndarray) -> np.ndarray:
+    """
+    Largest float32 not above each threshold. For any float32 ``x``,
+    ``x > t32`` then decides exactly like ``x > t``.
+    """
+    rounded = threshold.astype(np.float32)
+    over = rounded > threshold
+    rounded[over] = np.nextafter(rounded[over], np.float32(-np.inf))
+    return rounded
+
+def _node_depths(children: np.ndarray, roots: np.ndarray, is_leaf: np.ndarray,
+                 max_depth: Optional[int] = None) -> np.ndarray:
+    """Deepest level every node is reached at, -1 for nodes below ``max_depth`` or unreachable"""
+    depth = np.full(len(children), -1, dtype=np.intp)
+    frontier, level = np.unique(roots), 0
+    while frontier.size:
+        depth[frontier] = level
+        if level == max_depth:
+            break
+        frontier = np.unique(children[frontier[~is_leaf[frontier]]])
+        level += 1
+    return depth
+
+def compress_ensemble(engine: CompiledTreeEnsemble, max_depth: Optional[int] = None,
+                      float32: bool = True) -> CompiledTreeEnsemble:
+    """
+    Smaller engine for a freshly compiled one.
+
+    - ``max_depth`` turns the splits at that depth into leaves holding the
+      split node's own value (the mean, or class distribution, of its
+      subtree); lossy.
+    - Identical subtrees, leaves included, are stored once and shared, so
+      duplicate trees cost nothing and equal leaves collapse into one node;
+      a split whose two sides are identical is dropped. Lossless.
+    - With ``float32`` the values are stored as float32, and so are the
+      thresholds of engines fed float32 inputs, rounded down so routing
+      stays exact. Node indices become int32.
+    """
+    n_nodes = engine.n_nodes
+    is_leaf = engine.children[:, 0] == np.arange(n_nodes)
+    depth = _node_depths(engine.children, engine.roots, is_leaf, max_depth)
+    if max_depth is not None:
+        is_leaf = is_leaf | (depth == max_depth)
+
+    value = engine.value.astype(np.float32) if float32 else engine.value
+    threshold = engine.threshold
+    if float32 and engine.input_dtype == np.float32:
+        threshold = _round_down_float32(threshold)
+    missing = engine.missing_right if engine.missing_right is not None else np.zeros(n_nodes, dtype=bool)
+
+    # Children before parents: deepest nodes first
+    reachable = np.flatnonzero(depth >= 0)
+    order = reachable[np.argsort(-depth[reachable], kind='stable')]
+
+    leaf, feature, left, right = is_leaf.tolist(), engine.feature.tolist(), engine.left.tolist(), engine.right.tolist()
+    thresholds, missing_flags = threshold.tolist(), missing.tolist()
+    canonical = [-1] * n_nodes
+    interned: Dict = {}
+    sources, new_left, new_right = [], [], []
+    for node in order.tolist():
+        if leaf[node]:
+            key = value[node].tobytes()
+            index = interned.get(key)
+            if index is None:
+                index = interned[key] = len(sources)
+                sources.append(node)
+                new_left.append(index)
+                new_right.append(index)
+        else:
+            l, r = canonical[left[node]], canonical[right[node]]
+            if l == r:
+                canonical[node] = l
+                continue
+            key = (feature[node], thresholds[node], missing_flags[node], l, r)
+            index = interned.get(key)
+            if index is None:
+                index = interned[key] = len(sources)
+                sources.append(node)
+                new_left.append(l)
+                new_right.append(r)
+        canonical[node] = index
+
+    sources = np.asarray(sources, dtype=np.intp)
+    new_leaf = is_leaf[sources]
+    children = np.ascontiguousarray(np.stack([new_left, new_right], axis=1), dtype=np.int32)
+    roots = np.asarray([canonical[root] for root in engine.roots.tolist()], dtype=np.int32)
+    return CompiledTreeEnsemble(
+        kind=engine.kind,
+        feature=np.ascontiguousarray(np.where(new_leaf, 0, engine.feature[sources]), dtype=np.int32),
+        threshold=np.ascontiguousarray(np.where(new_leaf, np.inf, threshold[sources]), dtype=threshold.dtype),
+        children=children,
+        value=np.ascontiguousarray(value[sources]),
+        roots=roots,
+        max_depth=int(_node_depths(children, roots, new_leaf).max()),
+        n_features=engine.n_features,
+        baseline=engine.baseline,
+        learning_rate=engine.learning_rate,
+        classes=engine.classes,
+        input_dtype=engine.input_dtype,
+        missing_right=None if engine.missing_right is None else missing[sources] & ~new_leaf
+    )
+
+def compress_for_serving(engine: CompiledTreeEnsemble, X_val=None,
+                         y_val=None) -> Tuple[CompiledTreeEnsemble, Optional[Dict]]:
+    """
+    Apply the configured compression to a freshly compiled engine.
+
+    With validation rows it goes through compress_engine and the report is
+    returned; without (models restored from a pickle, already checked when
+    they were published) it is compressed unchecked and the report is None.
+    """
+    settings = compression_settings()
+    if not settings['enabled']:
+        return engine, None
+    if X_val is None:
+        return compress_ensemble(engine, settings['max_depth'], settings['float32']), None
+    return compress_engine(engine, X_val, y_val, settings)
+
+def check_compression(report: Optional[Dict], model_name: str):
+    """Refuse to publish a model whose compression lost more accuracy than allowed"""
+    if report and not report['accepted']:
+        raise Exception(
+            f"Compression of {model_name} lost {report['accuracy_loss']:.2%} {report['metric']}, "
+            f"over the {report['settings']['tolerance']:.2%} tolerance (COMPRESSION_TOLERANCE); not publishing"
+        )
+
+def _score(engine: CompiledTreeEnsemble, X: np.ndarray, y: np.ndarray) -> Dict:
+    predictions = engine.predict(X)
+    if engine.kind == CompiledTreeEnsemble.FOREST_CLASSIFIER:
+        return {'accuracy': float(np.mean(predictions == y))}
+    return {'rmse': float(np.sqrt(np.mean((predictions - y) ** 2)))}
+
+def profile_engine(engine: CompiledTreeEnsemble, X: np.ndarray, y: np.ndarray) -> Dict:
+    """Size, cold load time (full read of the saved arrays), latency and accuracy of one engine"""
+    with tempfile.TemporaryDirectory() as directory:
+        meta = save_engine(engine, directory, 'engine')
+        file_bytes = sum(entry.stat().st_size for entry in os.scandir(directory))
+        load_seconds = []
+        for _ in range(3):
+            started = time.perf_counter()
+            load_engine(directory, 'engine', meta, mmap_mode=None)
+            load_seconds.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    engine.predict(X)
+    batch_seconds = time.perf_counter() - started
+    timings = []
+    for row in X[:LATENCY_ROWS]:
+        started = time.perf_counter()
+        engine.predict(row)
+        timings.append(time.perf_counter() - started)
+
+    return {
+        'nodes': engine.n_nodes,
+        'max_depth': engine.max_depth,
+        'bytes': int(engine.nbytes),
+        'file_bytes': int(file_bytes),
+        'load_ms': round(min(load_seconds) * 1000, 3),
+        'single_row_ms': round(float(np.median(timings)) * 1000, 4),
+        'batch_us_per_row': round(batch_seconds / max(len(X), 1) * 1e6, 3),
+        **_score(engine, X, y)
+    }
+
+def _accuracy_loss(metric: str, before: float, after: float) -> float:
+    """Relative degradation: RMSE increase or accuracy drop as a fraction of the uncompressed score"""
+    change = after - before if metric == 'rmse' else before - after
+    return change / before if before else change
+
+def compress_engine(engine: CompiledTreeEnsemble, X_val, y_val,
+                    settings: Optional[Dict] = None) -> Tuple[CompiledTreeEnsemble, Dict]:
+    """
+    Compress ``engine`` and report size, load time, latency and accuracy
+    before and after on the validation rows (already scaled).
+
+    Returns the engine to serve and the report: the compressed engine if
+    its accuracy loss is within ``tolerance``, otherwise the original one
+    with ``accepted`` False, which publish refuses.
+    """
+    settings = settings or compression_settings()
+    X_val = np.asarray(X_val, dtype=np.float64)
+    y_val = np.asarray(y_val)
+
+    compressed = compress_ensemble(engine, settings['max_depth'], settings['float32'])
+    before, after = profile_engine(engine, X_val, y_val), profile_engine(compressed, X_val, y_val)
+    metric = 'accuracy' if engine.kind == CompiledTreeEnsemble.FOREST_CLASSIFIER else 'rmse'
+    loss = _accuracy_loss(metric, before[metric], after[metric])
+    report = {
+        'settings': settings,
+        'metric': metric,
+        'before': before,
+        'after': after,
+        'size_ratio': round(after['bytes'] / before['bytes'], 4),
+        'accuracy_loss': round(loss, 6),
+        'accepted': loss <= settings['tolerance']
+    }
+    return (compressed if report['accepted'] else engine), report
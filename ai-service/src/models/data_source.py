@@ -0,0 +1,83 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+# Resolution of the hash split (test_fraction is rounded to 1 / HASH_BUCKETS)
+HASH_BUCKETS = 10_000
+
+def training_chunk_size(chunk_size: Optional[int] = None) -> int:
+    """Rows per streamed chunk (TRAINING_CHUNK_ROWS)"""
+    return int(chunk_size or os.getenv("TRAINING_CHUNK_ROWS", 50_000))
+
+class TrainingDataSource(ABC):
+    """
+    Training rows read as a sequence of DataFrame chunks.
+
+    Every pass re-reads the source, so memory holds one chunk at a time
+    however large the export is. Subclasses implement ``_read``.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None):
+        self.chunk_size = training_chunk_size(chunk_size)
+
+    def chunks(self, columns: Optional[List[str]] = None) -> Iterator:
+        """Yield the rows as DataFrames of at most ``chunk_size`` rows"""
+        return self._read(columns)
+
+    @abstractmethod
+    def _read(self, columns: Optional[List[str]]) -> Iterator:
+        """Yield the chunks, restricted to ``columns`` where the source has them"""
+        pass
+
+class CSVDataSource(TrainingDataSource):
+    def __init__(self, path: str, chunk_size: Optional[int] = None):
+        super().__init__(chunk_size)
+        self.path = path
+
+    def _read(self, columns):
+        import pandas as pd
+        # Callable usecols skips requested columns the file doesn't have
+        usecols = None if columns is None else (lambda column: column in columns)
+        return iter(pd.read_csv(self.path, usecols=usecols, chunksize=self.chunk_size))
+
+class ParquetDataSource(TrainingDataSource):
+    def __init__(self, path: str, chunk_size: Optional[int] = None):
+        super().__init__(chunk_size)
+        self.path = path
+
+    def _read(self, columns):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet training data requires pyarrow")
+        parquet_file = pq.ParquetFile(self.path)
+        if columns is not None:
+            columns = [column for column in columns if column in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=self.chunk_size, columns=columns):
+            yield batch.to_pandas()
+
+def open_training_data(path: str, chunk_size: Optional[int] = None) -> TrainingDataSource:
+    """Source for a CSV or (with pyarrow) Parquet training export"""
+    if path.endswith(".parquet"):
+        return ParquetDataSource(path, chunk_size)
+    return CSVDataSource(path, chunk_size)
+
+def hash_split(chunk, test_fraction: float, id_column: str = "student_id", offset: int = 0) -> np.ndarray:
+    """
+    Boolean test-row mask for one chunk.
+
+    Rows are assigned by a stable hash of their student id, so every row of
+    a student lands on the same side, the split is identical on every pass
+    and run, and no shuffled copy is ever built. Without an id column the
+    global row number (``offset`` + position in the chunk) is hashed.
+    """
+    import pandas as pd
+
+    if id_column in chunk.columns:
+        keys = chunk[id_column].astype(str)
+    else:
+        keys = pd.Series(np.arange(offset, offset + len(chunk)))
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    return (hashes % HASH_BUCKETS) < int(round(test_fraction * HASH_BUCKETS))
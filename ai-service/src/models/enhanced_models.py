@@ -1,123 +1,197 @@
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import accuracy_score, mean_squared_error
+from .tree_engine import (
+    compile_ensemble, compile_scaler, save_engine, load_engine, save_scaler, load_scaler
+)
+from .feature_builder import feature_builder, FeatureBuilder
+from .model_registry import ModelBundle, model_registry
+from .estimators import build_boosting_regressor
+from .incremental import TrainingSet, grow_ensemble, incremental_estimators, timed, time_saved
+from .compression import check_compression, compress_for_serving
 import joblib
+import json
 import os
+import time
+from utils.prediction_cache import prediction_cache
+from utils.resource_usage import measure_load
 
 class EnhancedMLModels:
+    FEATURE_COLUMNS = FeatureBuilder.FEATURE_COLUMNS
+    RISK_LABELS = ['SAFE', 'NEEDS_ATTENTION', 'AT_RISK']
+    MODEL_NAME = 'enhanced'
+    # Rows per generated training-data block
+    TRAINING_CHUNK_SIZE = 100_000
+    
     def __init__(self):
-        self.risk_model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.performance_model = GradientBoostingRegressor(n_estimators=100, random_state=42)
-        self.scaler = StandardScaler()
+        # Estimators are created by train_models() or restored by a load;
+        # mmap loads serve from the engine arrays alone
+        self.risk_model = None
+        self.performance_model = None
+        self.scaler = None
         self.is_trained = False
+        self.version = None
+        
+        # Snapshot served by the predict methods, replaced as a whole by compile()
+        self.bundle = None
+        self.registry = model_registry
+        # Timing and memory of the last load
+        self.load_stats = {}
+        # Reports of the last checked compression per engine, see compile()
+        self.compression = None
+        
+    @property
+    def risk_engine(self):
+        return self.bundle.risk_engine if self.bundle else None
+        
+    @property
+    def performance_engine(self):
+        return self.bundle.performance_engine if self.bundle else None
+        
+    @property
+    def scaler_engine(self):
+        return self.bundle.scaler_engine if self.bundle else None
+        
+    @property
+    def model_token(self):
+        return self.bundle.token if self.bundle else 0
         
-    def generate_training_data(self, n_samples=1000):
+    def generate_training_data(self, n_samples=1000, seed=42, chunk_size=None):
         """Generate comprehensive training data for all scenarios"""
-        np.random.seed(42)
-        
-        # Generate diverse student profiles
-        data = []
-        for i in range(n_samples):
-            # Basic features
-            attendance = np.random.normal(80, 15)
-            attendance = np.clip(attendance, 0, 100)
-            
-            internal_marks = np.random.normal(16, 4)
-            internal_marks = np.clip(internal_marks, 0, 20)
-            
-            assignment_marks = np.random.normal(15, 3)
-            assignment_marks = np.clip(assignment_marks, 0, 20)
-            
-            behavior_score = np.random.normal(8, 1.5)
-            behavior_score = np.clip(behavior_score, 1, 10)
-            
-            previous_cgpa = np.random.normal(7.5, 1.2)
-            previous_cgpa = np.clip(previous_cgpa, 4.0, 10.0)
-            
-            backlog_count = np.random.poisson(0.3)
-            backlog_count = min(backlog_count, 5)
-            
-            semester = np.random.choice([5, 6, 7, 8])
-            
-            # Advanced features
-            study_hours = np.random.normal(6, 2)
-            study_hours = np.clip(study_hours, 1, 12)
-            
-            family_income = np.random.choice([1, 2, 3, 4, 5])  # 1=Low, 5=High
-            
-            extracurricular = np.random.choice([0, 1], p=[0.6, 0.4])
-            
-            # Calculate derived features
-            attendance_trend = attendance + np.random.normal(0, 5)
-            performance_consistency = 1 - (np.std([internal_marks, assignment_marks]) / 20)
-            
-            # Calculate target variables
-            # Risk level based on multiple factors
-            risk_score = (
-                (100 - attendance) * 0.3 +
-                (20 - internal_marks) * 0.25 +
-                (20 - assignment_marks) * 0.2 +
-                backlog_count * 10 +
-                (10 - behavior_score) * 5 +
-                (10 - previous_cgpa) * 3
-            )
-            
-            if risk_score < 20:
-                risk_level = 0  # SAFE
-            elif risk_score < 40:
-                risk_level = 1  # NEEDS_ATTENTION
-            else:
-                risk_level = 2  # AT_RISK
-                
-            # Performance prediction
-            performance_score = (
-                attendance * 0.3 +
-                internal_marks * 2.5 +
-                assignment_marks * 2.5 +
-                behavior_score * 5 +
-                previous_cgpa * 5 +
-                study_hours * 2 -
-                backlog_count * 5 +
-                family_income * 2 +
-                extracurricular * 5
-            )
-            performance_score = np.clip(performance_score, 0, 100)
-            
-            data.append({
-                'attendance': attendance,
-                'internal_marks': internal_marks,
-                'assignment_marks': assignment_marks,
-                'behavior_score': behavior_score,
-                'previous_cgpa': previous_cgpa,
-                'backlog_count': backlog_count,
-                'semester': semester,
-                'study_hours': study_hours,
-                'family_income': family_income,
-                'extracurricular': extracurricular,
-                'attendance_trend': attendance_trend,
-                'performance_consistency': performance_consistency,
-                'risk_level': risk_level,
-                'performance_score': performance_score
-            })
-            
-        return pd.DataFrame(data)
+        import pandas as pd
+        
+        if n_samples <= 0:
+            return self._generate_block(np.random.default_rng(seed), 0)
+        return pd.concat(
+            self.iter_training_data(n_samples, seed=seed, chunk_size=chunk_size),
+            ignore_index=True
+        )
+    
+    def iter_training_data(self, n_samples, seed=42, chunk_size=None):
+        """
+        Yield the training data as DataFrames of at most ``chunk_size`` rows.
+        
+        All blocks come from one seeded Generator, so a (seed, chunk_size)
+        pair always reproduces the same rows and memory stays at one block
+        however many samples are requested.
+        """
+        chunk_size = chunk_size or self.TRAINING_CHUNK_SIZE
+        rng = np.random.default_rng(seed)
+        for start in range(0, n_samples, chunk_size):
+            yield self._generate_block(rng, min(chunk_size, n_samples - start))
     
-    def train_models(self):
-        """Train all ML models with comprehensive data"""
+    def write_training_data(self, path, n_samples, seed=42, chunk_size=None):
+        """
+        Stream the training data to a CSV (or, with pyarrow, Parquet) file
+        block by block. Returns the number of rows written.
+        """
+        chunks = self.iter_training_data(n_samples, seed=seed, chunk_size=chunk_size)
+        rows = 0
+        if path.endswith('.parquet'):
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Writing Parquet training data requires pyarrow")
+            writer = None
+            try:
+                for chunk in chunks:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(path, table.schema)
+                    writer.write_table(table)
+                    rows += len(chunk)
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+                rows += len(chunk)
+        return rows
+    
+    def _generate_block(self, rng, n):
+        """Generate ``n`` student profiles column by column"""
+        import pandas as pd
+        
+        # Basic features
+        attendance = np.clip(rng.normal(80, 15, n), 0, 100)
+        internal_marks = np.clip(rng.normal(16, 4, n), 0, 20)
+        assignment_marks = np.clip(rng.normal(15, 3, n), 0, 20)
+        behavior_score = np.clip(rng.normal(8, 1.5, n), 1, 10)
+        previous_cgpa = np.clip(rng.normal(7.5, 1.2, n), 4.0, 10.0)
+        backlog_count = np.minimum(rng.poisson(0.3, n), 5)
+        semester = rng.integers(5, 9, n)
+        
+        # Advanced features
+        study_hours = np.clip(rng.normal(6, 2, n), 1, 12)
+        family_income = rng.integers(1, 6, n)  # 1=Low, 5=High
+        extracurricular = (rng.random(n) < 0.4).astype(np.int64)
+        
+        # Observed trend; performance_consistency is derived by FeatureBuilder
+        attendance_trend = attendance + rng.normal(0, 5, n)
+        
+        # Calculate target variables
+        # Risk level based on multiple factors
+        risk_score = (
+            (100 - attendance) * 0.3 +
+            (20 - internal_marks) * 0.25 +
+            (20 - assignment_marks) * 0.2 +
+            backlog_count * 10 +
+            (10 - behavior_score) * 5 +
+            (10 - previous_cgpa) * 3
+        )
+        # < 20 SAFE, < 40 NEEDS_ATTENTION, else AT_RISK
+        risk_level = np.digitize(risk_score, [20, 40])
+        
+        # Performance prediction
+        performance_score = (
+            attendance * 0.3 +
+            internal_marks * 2.5 +
+            assignment_marks * 2.5 +
+            behavior_score * 5 +
+            previous_cgpa * 5 +
+            study_hours * 2 -
+            backlog_count * 5 +
+            family_income * 2 +
+            extracurricular * 5
+        )
+        performance_score = np.clip(performance_score, 0, 100)
+        
+        return pd.DataFrame({
+            'attendance': attendance,
+            'internal_marks': internal_marks,
+            'assignment_marks': assignment_marks,
+            'behavior_score': behavior_score,
+            'previous_cgpa': previous_cgpa,
+            'backlog_count': backlog_count,
+            'semester': semester,
+            'study_hours': study_hours,
+            'family_income': family_income,
+            'extracurricular': extracurricular,
+            'attendance_trend': attendance_trend,
+            'risk_level': risk_level,
+            'performance_score': performance_score
+        })
+    
+    def train_models(self, n_samples=2000, progress=None):
+        """
+        Train all ML models with comprehensive data.
+        
+        ``progress(fraction, stage)`` is called as training advances; returns
+        the evaluation metrics.
+        """
+        # Training-only dependencies stay out of the serving import path
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score, mean_squared_error
+        
+        progress = progress or (lambda fraction, stage: None)
+        self._build_models()
         print("Generating training data...")
-        df = self.generate_training_data(2000)
+        progress(0.05, "generating training data")
+        df = self.generate_training_data(n_samples)
+        started = time.perf_counter()
         
         # Prepare features
-        feature_columns = [
-            'attendance', 'internal_marks', 'assignment_marks', 'behavior_score',
-            'previous_cgpa', 'backlog_count', 'semester', 'study_hours',
-            'family_income', 'extracurricular', 'attendance_trend', 'performance_consistency'
-        ]
-        
-        X = df[feature_columns]
+        X = feature_builder.build(df)
         y_risk = df['risk_level']
         y_performance = df['performance_score']
         
@@ -134,52 +208,386 @@ class EnhancedMLModels:
         
         # Train risk model
         print("Training risk assessment model...")
+        progress(0.2, "training risk model")
         self.risk_model.fit(X_train, y_risk_train)
         risk_accuracy = accuracy_score(y_risk_test, self.risk_model.predict(X_test))
         print(f"Risk model accuracy: {risk_accuracy:.3f}")
         
         # Train performance model
         print("Training performance prediction model...")
+        progress(0.55, "training performance model")
         self.performance_model.fit(X_train, y_perf_train)
         perf_mse = mean_squared_error(y_perf_test, self.performance_model.predict(X_test))
         print(f"Performance model MSE: {perf_mse:.3f}")
         
         self.is_trained = True
-        self.save_models()
-        
-    def save_models(self):
-        """Save trained models"""
-        os.makedirs('models', exist_ok=True)
-        joblib.dump(self.risk_model, 'models/risk_model.pkl')
-        joblib.dump(self.performance_model, 'models/performance_model.pkl')
-        joblib.dump(self.scaler, 'models/scaler.pkl')
-        print("Models saved successfully!")
-        
-    def load_models(self):
-        """Load pre-trained models"""
+        self.compile((X_test, y_risk_test, y_perf_test))
+        train_seconds = round(time.perf_counter() - started, 3)
+        metrics = {
+            'mode': 'full',
+            'risk_accuracy': float(risk_accuracy),
+            'performance_mse': float(perf_mse),
+            'n_samples': int(n_samples),
+            'train_seconds': train_seconds,
+            'full_train_seconds': train_seconds,
+            'compression': self.compression
+        }
+        progress(0.9, "saving models")
+        self.save_models(metrics)
+        TrainingSet(self.MODEL_NAME).replace(df)
+        
+        return metrics
+    
+    def train_incremental(self, n_samples=500, seed=None, n_estimators=None,
+                          compare_full=False, progress=None):
+        """
+        Grow the active models on ``n_samples`` new rows instead of refitting.
+        
+        Both ensembles get ``n_estimators`` more trees / boosting stages via
+        warm_start on the persisted training set plus the new rows, with the
+        scaler kept fixed; 20% of the new rows are held out for scoring.
+        ``compare_full`` also times and scores a from-scratch fit on the same
+        rows. Falls back to train_models when there is nothing to grow.
+        """
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score, mean_squared_error
+        
+        progress = progress or (lambda fraction, stage: None)
+        training_set = TrainingSet(self.MODEL_NAME)
+        resolved = self.registry.resolve(self.MODEL_NAME, verify=False)
+        if not training_set.exists() or resolved is None:
+            return self.train_models(n_samples, progress)
+        entry, directory = resolved
+        if self.risk_model is None:
+            self._load_from(directory, entry['version'], entry)
+        
+        progress(0.05, "generating training data")
+        history = training_set.load()
+        # Each slice gets its own rows unless a seed is given
+        new_data = self.generate_training_data(n_samples, seed=len(history) if seed is None else seed)
+        new_train, new_test = train_test_split(new_data, test_size=0.2, random_state=42)
+        train_df = pd.concat([history, new_train], ignore_index=True)
+        X_train = self.scaler.transform(feature_builder.build(train_df))
+        X_test = self.scaler.transform(feature_builder.build(new_test))
+        
+        n_new = incremental_estimators(n_estimators)
+        progress(0.2, "growing risk model")
+        risk_model, risk_seconds = timed(grow_ensemble, self.risk_model, n_new, X_train, train_df['risk_level'])
+        progress(0.5, "growing performance model")
+        performance_model, perf_seconds = timed(
+            grow_ensemble, self.performance_model, n_new, X_train, train_df['performance_score']
+        )
+        train_seconds = risk_seconds + perf_seconds
+        
+        metrics = {
+            'mode': 'incremental',
+            'base_version': entry['version'],
+            'estimators_added': n_new,
+            'n_samples': int(n_samples),
+            'rows_total': len(history) + len(new_data),
+            'train_seconds': round(train_seconds, 3),
+            'risk_accuracy': float(accuracy_score(new_test['risk_level'], risk_model.predict(X_test))),
+            'performance_mse': float(mean_squared_error(new_test['performance_score'], performance_model.predict(X_test))),
+            'full_train_seconds': (entry.get('metrics') or {}).get('full_train_seconds')
+        }
+        
+        if compare_full:
+            progress(0.7, "timing full retrain")
+            full = EnhancedMLModels()
+            full._build_models()
+            started = time.perf_counter()
+            X_full = full.scaler.fit_transform(feature_builder.build(train_df))
+            full.risk_model.fit(X_full, train_df['risk_level'])
+            full.performance_model.fit(X_full, train_df['performance_score'])
+            full_seconds = time.perf_counter() - started
+            X_full_test = full.scaler.transform(feature_builder.build(new_test))
+            metrics['full_retrain'] = {
+                'train_seconds': round(full_seconds, 3),
+                'risk_accuracy': float(accuracy_score(new_test['risk_level'], full.risk_model.predict(X_full_test))),
+                'performance_mse': float(mean_squared_error(new_test['performance_score'], full.performance_model.predict(X_full_test)))
+            }
+            metrics['full_train_seconds'] = round(full_seconds, 3)
+        metrics.update(time_saved(train_seconds, metrics['full_train_seconds']))
+        
+        self.risk_model, self.performance_model = risk_model, performance_model
+        self.is_trained = True
+        self.compile((X_test, new_test['risk_level'], new_test['performance_score']))
+        metrics['compression'] = self.compression
+        progress(0.9, "saving models")
+        self.save_models(metrics)
+        training_set.append(new_data)
+        
+        return metrics
+        
+    def _build_models(self):
+        """Fresh unfitted estimators and scaler for a training run"""
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+        
+        self.risk_model = RandomForestClassifier(n_estimators=100, random_state=42)
+        # Exact or histogram boosting, see REGRESSOR_BACKEND
+        self.performance_model = build_boosting_regressor({'n_estimators': 100})
+        self.scaler = StandardScaler()
+        
+    def compile(self, validation=None):
+        """
+        Flatten the fitted models and scaler into a new served bundle.
+        
+        Both engines are compressed (see models.compression); training
+        passes ``validation`` = (scaled X, risk labels, performance scores)
+        so the loss is measured and save_models can refuse a compression
+        past COMPRESSION_TOLERANCE.
+        """
+        X_val, y_risk, y_performance = validation or (None, None, None)
+        risk_engine, risk_report = compress_for_serving(compile_ensemble(self.risk_model), X_val, y_risk)
+        performance_engine, performance_report = compress_for_serving(
+            compile_ensemble(self.performance_model), X_val, y_performance
+        )
+        self.compression = None
+        if risk_report is not None:
+            self.compression = {'risk_model': risk_report, 'performance_model': performance_report}
+        self.bundle = ModelBundle(
+            self.version,
+            self.FEATURE_COLUMNS,
+            risk_model=self.risk_model,
+            performance_model=self.performance_model,
+            scaler=self.scaler,
+            risk_engine=risk_engine,
+            performance_engine=performance_engine,
+            scaler_engine=compile_scaler(self.scaler),
+            feature_importance={
+                name: dict(zip(self.FEATURE_COLUMNS, model.feature_importances_.tolist()))
+                for name, model in (('risk_model', self.risk_model), ('performance_model', self.performance_model))
+                # The hist backend has no impurity importances
+                if hasattr(model, 'feature_importances_')
+            }
+        )
+        
+    def save_models(self, metrics=None):
+        """Publish the trained models (pickles and engine arrays) as a new registry version"""
+        for name, report in (self.compression or {}).items():
+            check_compression(report, name)
+        
+        def write(directory):
+            joblib.dump(self.risk_model, os.path.join(directory, 'risk_model.pkl'))
+            joblib.dump(self.performance_model, os.path.join(directory, 'performance_model.pkl'))
+            joblib.dump(self.scaler, os.path.join(directory, 'scaler.pkl'))
+            self.export_engines(directory)
+        
+        entry = self.registry.publish(self.MODEL_NAME, write, self.FEATURE_COLUMNS, metrics)
+        self.version = entry['version']
+        self.bundle = self.bundle.replace(version=self.version)
+        print(f"Models saved successfully! (version {self.version})")
+        return entry
+        
+    def load_models(self, version=None):
+        """
+        Load pre-trained models (default: the active registry version).
+        
+        Engine arrays are memory-mapped unless MODEL_LOAD_MODE is ``pickle``
+        or the version has none.
+        """
+        resolved = self.registry.resolve(self.MODEL_NAME, version, verify=False)
+        if resolved is not None:
+            entry, directory = resolved
+            mmap = os.getenv('MODEL_LOAD_MODE', 'mmap') == 'mmap'
+            if mmap and os.path.exists(os.path.join(directory, f"{self.MODEL_NAME}.json")):
+                # Only the files the mapping reads, never the pickles
+                verify_ms = self.registry.verify_files(
+                    self.MODEL_NAME, entry, [name for name in entry['files'] if not name.endswith('.pkl')]
+                )
+                self.load_engines(directory, 'r', version=entry['version'])
+                self.load_stats['verify_ms'] = verify_ms
+                self.load_stats['load_ms'] = round(self.load_stats['load_ms'] + verify_ms, 3)
+            else:
+                self._load_from(directory, entry['version'], entry)
+            print(f"Models loaded successfully! (version {self.version}, {self.load_stats['load_ms']} ms)")
+            return
+        
         try:
-            self.risk_model = joblib.load('models/risk_model.pkl')
-            self.performance_model = joblib.load('models/performance_model.pkl')
-            self.scaler = joblib.load('models/scaler.pkl')
-            self.is_trained = True
+            # Models saved before the registry existed
+            self._load_from('models', None)
+            self.save_models()
             print("Models loaded successfully!")
         except FileNotFoundError:
             print("No pre-trained models found. Training new models...")
             self.train_models()
             
+    def _load_from(self, directory, version, entry=None):
+        stats = {'mode': 'pickle', 'version': version}
+        with measure_load(stats):
+            if entry is not None:
+                stats['verify_ms'] = self.registry.verify_files(
+                    self.MODEL_NAME, entry, [name for name in entry['files'] if name.endswith('.pkl')]
+                )
+            risk_model = joblib.load(os.path.join(directory, 'risk_model.pkl'))
+            performance_model = joblib.load(os.path.join(directory, 'performance_model.pkl'))
+            scaler = joblib.load(os.path.join(directory, 'scaler.pkl'))
+            self.risk_model, self.performance_model, self.scaler = risk_model, performance_model, scaler
+            self.version = version
+            self.is_trained = True
+            self.compile()
+        self.load_stats = stats
+        
+    def export_engines(self, directory):
+        """Write the engines and scaler as ``.npy`` arrays plus a JSON header"""
+        bundle = self.bundle
+        if bundle is None:
+            raise Exception("Models not compiled. Train or load the models first.")
+        
+        os.makedirs(directory, exist_ok=True)
+        meta = {
+            'model_name': self.MODEL_NAME,
+            'version': bundle.version,
+            'feature_names': list(bundle.feature_names),
+            'feature_importance': bundle.feature_importance,
+            'risk_engine': save_engine(bundle.risk_engine, directory, 'risk'),
+            'performance_engine': save_engine(bundle.performance_engine, directory, 'performance'),
+            'scaler': save_scaler(bundle.scaler_engine, directory, self.MODEL_NAME)
+        }
+        path = os.path.join(directory, f"{self.MODEL_NAME}.json")
+        with open(path, 'w') as f:
+            json.dump(meta, f)
+        return path
+        
+    def load_engines(self, directory, mmap_mode='r', version=None):
+        """Serve from arrays written by export_engines, without the estimators"""
+        path = os.path.join(directory, f"{self.MODEL_NAME}.json")
+        if not os.path.exists(path):
+            return False
+        
+        stats = {'mode': 'mmap' if mmap_mode else 'arrays'}
+        with measure_load(stats):
+            with open(path) as f:
+                meta = json.load(f)
+            bundle = ModelBundle(
+                version or meta['version'],
+                meta['feature_names'],
+                risk_model=None,
+                performance_model=None,
+                scaler=None,
+                risk_engine=load_engine(directory, 'risk', meta['risk_engine'], mmap_mode),
+                performance_engine=load_engine(directory, 'performance', meta['performance_engine'], mmap_mode),
+                scaler_engine=load_scaler(directory, self.MODEL_NAME, meta['scaler'], mmap_mode),
+                feature_importance=meta['feature_importance']
+            )
+            self.version = bundle.version
+            self.is_trained = True
+            self.bundle = bundle
+        stats['version'] = bundle.version
+        stats['mapped_mb'] = round(sum(
+            engine.nbytes for engine in (bundle.risk_engine, bundle.performance_engine, bundle.scaler_engine)
+        ) / (1 << 20), 3)
+        self.load_stats = stats
+        return True
+            
+    def warm_up(self, n_rows=None):
+        """Fault in the served arrays and push one synthetic batch through them"""
+        bundle = self.bundle
+        if bundle is None:
+            return {'skipped': 'not trained'}
+        
+        n_rows = n_rows or int(os.getenv('WARMUP_ROWS', 256))
+        prefaulted = bundle.risk_engine.prefault() + bundle.performance_engine.prefault()
+        X = np.random.default_rng(0).standard_normal((n_rows, len(self.FEATURE_COLUMNS)))
+        bundle.scaler_engine.transform(X)
+        bundle.risk_engine.predict_proba(X)
+        bundle.performance_engine.predict(X)
+        return {'rows': n_rows, 'prefaulted_mb': round(prefaulted / (1 << 20), 3)}
+            
     def predict_risk(self, features):
         """Predict student risk level"""
         if not self.is_trained:
             self.load_models()
             
-        features_scaled = self.scaler.transform([features])
-        risk_prob = self.risk_model.predict_proba(features_scaled)[0]
-        risk_level = self.risk_model.predict(features_scaled)[0]
+        bundle = self.bundle
+        features_scaled = bundle.scaler_engine.transform([features])
+        risk_prob = bundle.risk_engine.predict_proba(features_scaled)[0]
+        risk_level = bundle.risk_engine.predict(features_scaled)[0]
         
-        risk_labels = ['SAFE', 'NEEDS_ATTENTION', 'AT_RISK']
+        return self._format_risk(risk_level, risk_prob)
         
+    def predict_performance(self, features):
+        """Predict student performance score"""
+        if not self.is_trained:
+            self.load_models()
+            
+        bundle = self.bundle
+        features_scaled = bundle.scaler_engine.transform([features])
+        performance_score = bundle.performance_engine.predict(features_scaled)[0]
+        
+        return self._format_performance(performance_score)
+        
+    def predict_all(self, features):
+        """Predict risk and performance for one student
+        
+        Validates and scales the feature vector once and evaluates the risk
+        forest once, instead of the two transforms and two forest walks made
+        by calling predict_risk and predict_performance back to back.
+        """
+        return self.predict_batch([features])[0]
+        
+    def predict_batch(self, feature_matrix):
+        """Predict risk and performance for many students in one pass
+        
+        Builds a single (n_students x 12) matrix, scales it once and calls
+        each model once; the risk label is taken from the probability argmax
+        so the forest is only walked a single time.
+        """
+        if not self.is_trained:
+            self.load_models()
+            
+        X = self._validate_matrix(feature_matrix)
+        if len(X) == 0:
+            return []
+            
+        bundle = self.bundle
+        results = [None] * len(X)
+        cache_keys = [prediction_cache.make_key('enhanced', bundle.token, row) for row in X]
+        misses = []
+        for i, cache_key in enumerate(cache_keys):
+            results[i] = prediction_cache.get(cache_key)
+            if results[i] is None:
+                misses.append(i)
+        if not misses:
+            return results
+            
+        X_scaled = bundle.scaler_engine.transform(X[misses])
+        risk_probs = bundle.risk_engine.predict_proba(X_scaled)
+        risk_levels = bundle.risk_engine.classes.take(np.argmax(risk_probs, axis=1))
+        performance_scores = bundle.performance_engine.predict(X_scaled)
+        
+        for i, risk_level, risk_prob, performance_score in zip(
+            misses, risk_levels, risk_probs, performance_scores
+        ):
+            results[i] = {
+                'risk_assessment': self._format_risk(risk_level, risk_prob),
+                'performance_prediction': self._format_performance(performance_score)
+            }
+            prediction_cache.put(cache_keys[i], results[i])
+        
+        return results
+        
+    def _validate_matrix(self, feature_matrix):
+        """Coerce input to a 2-D float matrix with one column per feature"""
+        X = np.asarray(feature_matrix, dtype=float)
+        if X.size == 0:
+            return X.reshape(0, len(self.FEATURE_COLUMNS))
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != len(self.FEATURE_COLUMNS):
+            raise ValueError(
+                f"Expected {len(self.FEATURE_COLUMNS)} features per student, got shape {X.shape}"
+            )
+        if not np.isfinite(X).all():
+            raise ValueError("Features must be finite numbers")
+        return X
+        
+    def _format_risk(self, risk_level, risk_prob):
+        """Build the risk assessment payload for one student"""
         return {
-            'risk_level': risk_labels[risk_level],
+            'risk_level': self.RISK_LABELS[risk_level],
             'confidence': float(max(risk_prob)),
             'probabilities': {
                 'SAFE': float(risk_prob[0]),
@@ -188,14 +596,8 @@ class EnhancedMLModels:
             }
         }
         
-    def predict_performance(self, features):
-        """Predict student performance score"""
-        if not self.is_trained:
-            self.load_models()
-            
-        features_scaled = self.scaler.transform([features])
-        performance_score = self.performance_model.predict(features_scaled)[0]
-        
+    def _format_performance(self, performance_score):
+        """Build the performance prediction payload for one student"""
         return {
             'predicted_score': float(performance_score),
             'predicted_grade': self._score_to_grade(performance_score),
@@ -216,19 +618,9 @@ class EnhancedMLModels:
         if not self.is_trained:
             self.load_models()
             
-        feature_names = [
-            'attendance', 'internal_marks', 'assignment_marks', 'behavior_score',
-            'previous_cgpa', 'backlog_count', 'semester', 'study_hours',
-            'family_income', 'extracurricular', 'attendance_trend', 'performance_consistency'
-        ]
+        feature_importance = self.bundle.feature_importance
         
-        risk_importance = dict(zip(feature_names, self.risk_model.feature_importances_))
-        perf_importance = dict(zip(feature_names, self.performance_model.feature_importances_))
-        
-        return {
-            'risk_model': risk_importance,
-            'performance_model': perf_importance
-        }
+        return {name: dict(importance) for name, importance in feature_importance.items()}
 
 # Initialize global model instance
 ml_models = EnhancedMLModels()
\ No newline at end of file
@@ -0,0 +1,41 @@
+import os
+from typing import Dict, Optional
+
+EXACT = "exact"
+HIST = "hist"
+REGRESSOR_BACKENDS = (EXACT, HIST)
+
+def regressor_backend(backend: Optional[str] = None) -> str:
+    """Boosting backend of the regressors (REGRESSOR_BACKEND)"""
+    backend = (backend or os.getenv("REGRESSOR_BACKEND", EXACT)).lower()
+    if backend not in REGRESSOR_BACKENDS:
+        raise ValueError(f"Invalid regressor backend: {backend}")
+    return backend
+
+def build_boosting_regressor(params: Optional[Dict] = None, backend: Optional[str] = None):
+    """
+    Unfitted gradient-boosting regressor for GradientBoostingRegressor-style
+    ``params``.
+
+    ``exact`` is sklearn's GradientBoostingRegressor. ``hist`` is
+    HistGradientBoostingRegressor, which bins features and builds each tree
+    on all cores: ``n_estimators`` becomes ``max_iter``, early stopping is
+    off so the stage count is the one asked for, and ``subsample`` is
+    dropped (every stage sees every row).
+    """
+    params = dict(params or {})
+    if regressor_backend(backend) == EXACT:
+        from sklearn.ensemble import GradientBoostingRegressor
+        return GradientBoostingRegressor(random_state=42, **params)
+
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    params.pop('subsample', None)
+    max_iter = params.pop('n_estimators', 100)
+    return HistGradientBoostingRegressor(max_iter=max_iter, early_stopping=False, random_state=42, **params)
+
+def tree_count_param(estimator) -> str:
+    """Name of the parameter holding an ensemble's tree / stage count"""
+    return 'max_iter' if 'max_iter' in estimator.get_params() else 'n_estimators'
+
+def tree_count(estimator) -> int:
+    return estimator.get_params()[tree_count_param(estimator)]
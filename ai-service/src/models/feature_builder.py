@@ -0,0 +1,82 @@
+import numpy as np
+from typing import Any, Sequence, Union
+
+class FeatureBuilder:
+    """
+    Builds the 12-column feature matrix of the enhanced models.
+
+    Used by both training and serving so derived features are computed one
+    way only. Input is a DataFrame or a sequence of Pydantic objects / dicts;
+    columns are filled one at a time into a preallocated float array, so
+    batches never build per-row Python lists.
+    """
+
+    FEATURE_COLUMNS = [
+        'attendance', 'internal_marks', 'assignment_marks', 'behavior_score',
+        'previous_cgpa', 'backlog_count', 'semester', 'study_hours',
+        'family_income', 'extracurricular', 'attendance_trend', 'performance_consistency'
+    ]
+
+    # Raw inputs and defaults for the optional ones
+    REQUIRED_COLUMNS = [
+        'attendance', 'internal_marks', 'assignment_marks', 'behavior_score',
+        'previous_cgpa', 'backlog_count', 'semester'
+    ]
+    OPTIONAL_DEFAULTS = {
+        'study_hours': 6.0,
+        'family_income': 3,
+        'extracurricular': 0
+    }
+
+    def build(self, data: Union[Any, Sequence[Any]]) -> np.ndarray:
+        """Return the (n_students x 12) float matrix for ``data``"""
+        if not hasattr(data, 'columns'):  # not a DataFrame
+            data = list(data)
+        n_rows = len(data)
+        X = np.empty((n_rows, len(self.FEATURE_COLUMNS)), dtype=np.float64)
+        index = {name: i for i, name in enumerate(self.FEATURE_COLUMNS)}
+
+        for name in self.REQUIRED_COLUMNS:
+            X[:, index[name]] = self._column(data, name, None)
+        for name, default in self.OPTIONAL_DEFAULTS.items():
+            X[:, index[name]] = self._column(data, name, default)
+
+        attendance = X[:, index['attendance']]
+        internal_marks = X[:, index['internal_marks']]
+        assignment_marks = X[:, index['assignment_marks']]
+
+        # Without attendance history the trend is the current attendance
+        X[:, index['attendance_trend']] = self._column(data, 'attendance_trend', attendance)
+        # 1 - std([internal, assignment]) / 20; the std of two values is |a - b| / 2
+        X[:, index['performance_consistency']] = 1 - (np.abs(internal_marks - assignment_marks) / 2) / 20
+
+        return X
+
+    def _column(self, data, name: str, default) -> np.ndarray:
+        """Read one column of ``data`` as floats, filling gaps from ``default``"""
+        n_rows = len(data)
+        if hasattr(data, 'columns'):
+            if name in data.columns:
+                column = data[name].to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                column = np.full(n_rows, np.nan)
+        else:
+            if data and isinstance(data[0], dict):
+                values = (row.get(name) for row in data)
+            else:
+                values = (getattr(row, name, None) for row in data)
+            column = np.fromiter(
+                (np.nan if value is None else value for value in values),
+                dtype=np.float64,
+                count=n_rows
+            )
+
+        missing = np.isnan(column)
+        if missing.any():
+            if default is None:
+                raise ValueError(f"Missing required feature: {name}")
+            column = column.copy()
+            column[missing] = np.broadcast_to(default, column.shape)[missing]
+        return column
+
+feature_builder = FeatureBuilder()
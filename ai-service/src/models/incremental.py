@@ -0,0 +1,87 @@
+import copy
+import os
+import time
+from typing import Dict, Optional
+
+from .estimators import tree_count, tree_count_param
+
+def incremental_estimators(n_estimators: Optional[int] = None) -> int:
+    """Trees (or boosting stages) added per incremental run (INCREMENTAL_ESTIMATORS)"""
+    return int(n_estimators or os.getenv("INCREMENTAL_ESTIMATORS", 20))
+
+def grow_ensemble(estimator, n_new: int, X, y):
+    """
+    Copy of a fitted forest or gradient-boosting estimator with ``n_new``
+    more trees (or stages) grown on ``X``/``y`` through ``warm_start``.
+
+    Existing trees are kept as they are; forests add bootstrapped trees and
+    boosting adds stages fitted to the current residuals. The estimator is
+    copied so the one referenced by the served bundle never changes.
+    """
+    grown = copy.deepcopy(estimator)
+    grown.set_params(warm_start=True, **{tree_count_param(grown): tree_count(grown) + n_new})
+    grown.fit(X, y)
+    grown.set_params(warm_start=False)
+    return grown
+
+def timed(fn, *args):
+    """Run ``fn(*args)``; returns (result, seconds)"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+def time_saved(incremental_seconds: float, full_seconds: Optional[float]) -> Dict:
+    """Savings of an incremental run against a full retrain"""
+    if not full_seconds:
+        return {}
+    return {
+        'time_saved_seconds': round(full_seconds - incremental_seconds, 3),
+        'speedup': round(full_seconds / max(incremental_seconds, 1e-9), 2)
+    }
+
+class TrainingSet:
+    """
+    Persisted rows a model has been trained on, one CSV per model under
+    ``<MODEL_PATH>/training_sets``. Full retrains replace it; incremental
+    runs append the new semester's rows after training succeeds.
+    """
+
+    def __init__(self, model_name: str, model_path: Optional[str] = None):
+        root = os.path.join(model_path or os.getenv('MODEL_PATH', './data/models'), 'training_sets')
+        self.path = os.path.join(root, f"{model_name}.csv")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self):
+        import pandas as pd
+        return pd.read_csv(self.path)
+
+    def replace(self, data) -> int:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        staging = f"{self.path}.tmp"
+        data.to_csv(staging, index=False)
+        os.replace(staging, self.path)
+        return len(data)
+
+    def replace_chunks(self, chunks) -> int:
+        """Replace the set with streamed chunks, one chunk in memory at a time"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        staging = f"{self.path}.tmp"
+        rows = 0
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(staging, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            rows += len(chunk)
+        if rows:
+            os.replace(staging, self.path)
+        return rows
+
+    def append(self, data) -> int:
+        import pandas as pd
+
+        if not self.exists():
+            return self.replace(data)
+        # Same column order as the stored header
+        columns = list(pd.read_csv(self.path, nrows=0).columns)
+        data.to_csv(self.path, mode='a', header=False, index=False, columns=columns)
+        return len(data)
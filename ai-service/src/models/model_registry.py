@@ -0,0 +1,332 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+MANIFEST_FILE = "manifest.json"
+
+class ModelBundle:
+    """
+    Immutable snapshot of one served model version.
+
+    Holds the estimators, compiled engines, feature list and version that
+    belong together. Models replace their ``bundle`` in a single assignment
+    and serving code reads it once per call, so a request never sees a new
+    scaler next to an old model.
+    """
+
+    def __init__(self, version: str, feature_names, **components):
+        object.__setattr__(self, '_components', dict(components))
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'feature_names', tuple(feature_names))
+        # Increases with every bundle; keys prediction caches
+        object.__setattr__(self, 'token', time.monotonic_ns())
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self.__dict__['_components'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("ModelBundle is immutable")
+
+    def replace(self, **changes) -> "ModelBundle":
+        """New bundle with some fields changed"""
+        fields = dict(self._components, version=self.version, feature_names=self.feature_names)
+        fields.update(changes)
+        return ModelBundle(**fields)
+
+def _json_default(value: Any) -> Any:
+    """Serialize numpy scalars and arrays found in metrics"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _directory_checksum(directory: str) -> str:
+    """sha256 over every file name and content in ``directory``"""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, directory).encode())
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+    return digest.hexdigest()
+
+def _file_checksums(directory: str) -> Dict[str, str]:
+    """sha256 of every file in ``directory``, by path relative to it"""
+    checksums = {}
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            checksums[os.path.relpath(path, directory).replace(os.sep, '/')] = _file_checksum(path)
+    return dict(sorted(checksums.items()))
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive lock on ``path`` across processes: flock on POSIX, msvcrt.locking on Windows"""
+    with open(path, 'a+b') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        else:
+            lock.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ten one-second retries; keep waiting
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+class ModelRegistry:
+    """
+    Versioned on-disk model store.
+
+    Every model has a directory under MODEL_REGISTRY_PATH with one
+    sub-directory per published version and a ``manifest.json`` listing each
+    version's features, metrics and checksum plus the active (and optionally
+    pinned) version. Versions are written to a staging directory and renamed
+    into place, and never modified afterwards; the manifest is replaced
+    atomically under a file lock, so training processes and the server can
+    share one registry.
+
+    Changing the active version in-process runs the hooks subscribed for that
+    model, which swap the new bundle into serving; ``poll`` does the same for
+    changes made by other processes.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.getenv(
+            'MODEL_REGISTRY_PATH',
+            os.path.join(os.getenv('MODEL_PATH', './data/models'), 'registry')
+        )
+        self.verify = os.getenv('MODEL_REGISTRY_VERIFY', 'true').lower() == 'true'
+        # (model, version, file) already checked in this process; versions never change
+        self._verified = set()
+        self._subscribers: Dict[str, List[Callable[[], Any]]] = {}
+        # Active version per subscribed model as of its last notify, see poll
+        self._seen_active: Dict[str, Optional[str]] = {}
+
+    def publish(
+        self,
+        model_name: str,
+        write: Callable[[str], Any],
+        feature_names: List[str],
+        metrics: Optional[Dict] = None,
+        activate: bool = True
+    ) -> Dict:
+        """
+        Publish a new version whose files ``write(directory)`` creates.
+
+        The new version becomes active unless ``activate`` is False or another
+        version is pinned. Returns its manifest entry.
+        """
+        model_dir = self._model_dir(model_name)
+        os.makedirs(model_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=model_dir)
+        try:
+            write(staging)
+            checksum = _directory_checksum(staging)
+            file_checksums = _file_checksums(staging)
+            with self._locked(model_name):
+                manifest = self._read_manifest(model_name)
+                version = str(max((int(v['version']) for v in manifest['versions']), default=0) + 1)
+                os.rename(staging, os.path.join(model_dir, version))
+                entry = {
+                    'version': version,
+                    'created_at': datetime.utcnow().isoformat(),
+                    'feature_names': list(feature_names),
+                    'metrics': metrics or {},
+                    'checksum': checksum,
+                    'file_checksums': file_checksums,
+                    'files': sorted(os.listdir(os.path.join(model_dir, version)))
+                }
+                manifest['versions'].append(entry)
+                if activate and not manifest['pinned']:
+                    manifest['active'] = version
+                self._write_manifest(model_name, manifest)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return entry
+
+    def resolve(self, model_name: str, version: Optional[str] = None,
+                verify: bool = True) -> Optional[Tuple[Dict, str]]:
+        """
+        Manifest entry and directory of ``version`` (default: the active one),
+        or None if the model has no active version. With ``verify`` every
+        file is checked (see verify_files); loaders pass False and check
+        only the files they read.
+        """
+        manifest = self._read_manifest(model_name)
+        version = version or manifest['active']
+        if version is None:
+            return None
+        entry = self._entry(manifest, model_name, version)
+        directory = os.path.join(self._model_dir(model_name), version)
+        if verify:
+            self.verify_files(model_name, entry)
+        return entry, directory
+
+    def verify_files(self, model_name: str, entry: Dict, files: Optional[List[str]] = None) -> float:
+        """
+        Check ``files`` of a version (default: all of them) against their
+        manifest checksums when MODEL_REGISTRY_VERIFY is on, and return the
+        milliseconds spent. Each file is hashed once per process. Versions
+        published without per-file checksums are checked as a whole.
+        """
+        if not self.verify:
+            return 0.0
+        started = time.perf_counter()
+        version = entry['version']
+        directory = os.path.join(self._model_dir(model_name), version)
+        expected = entry.get('file_checksums')
+        if expected is None:
+            if (model_name, version, None) not in self._verified:
+                if _directory_checksum(directory) != entry['checksum']:
+                    raise ValueError(f"Checksum mismatch for {model_name} version {version}")
+                self._verified.add((model_name, version, None))
+        else:
+            for name in (expected if files is None else files):
+                if (model_name, version, name) in self._verified:
+                    continue
+                path = os.path.join(directory, name)
+                if name not in expected or not os.path.exists(path) or _file_checksum(path) != expected[name]:
+                    raise ValueError(f"Checksum mismatch for {model_name} version {version}: {name}")
+                self._verified.add((model_name, version, name))
+        return round((time.perf_counter() - started) * 1000, 3)
+
+    def get_manifest(self, model_name: str) -> Dict:
+        return self._read_manifest(model_name)
+
+    def list_models(self) -> Dict[str, Dict]:
+        """Manifests of every model in the registry"""
+        if not os.path.isdir(self.root):
+            return {}
+        return {
+            name: self._read_manifest(name)
+            for name in sorted(os.listdir(self.root))
+            if os.path.exists(os.path.join(self.root, name, MANIFEST_FILE))
+        }
+
+    def activate(self, model_name: str, version: str, pin: bool = False) -> Dict:
+        """Make ``version`` active (and pinned, so new publishes don't replace it)"""
+        with self._locked(model_name):
+            manifest = self._read_manifest(model_name)
+            self._entry(manifest, model_name, version)
+            manifest['active'] = version
+            manifest['pinned'] = pin
+            self._write_manifest(model_name, manifest)
+        self.notify(model_name)
+        return manifest
+
+    def unpin(self, model_name: str) -> Dict:
+        """Let the next published version become active again"""
+        with self._locked(model_name):
+            manifest = self._read_manifest(model_name)
+            manifest['pinned'] = False
+            self._write_manifest(model_name, manifest)
+        return manifest
+
+    def rollback(self, model_name: str) -> Dict:
+        """
+        Activate and pin the version published before the active one. The
+        previous version is chosen under the same lock as the activation, so
+        a concurrent publish cannot leave it relative to a stale active one.
+        """
+        with self._locked(model_name):
+            manifest = self._read_manifest(model_name)
+            versions = [entry['version'] for entry in manifest['versions']]
+            if manifest['active'] not in versions or versions.index(manifest['active']) == 0:
+                raise ValueError(f"No earlier version of '{model_name}' to roll back to")
+            manifest['active'] = versions[versions.index(manifest['active']) - 1]
+            manifest['pinned'] = True
+            self._write_manifest(model_name, manifest)
+        self.notify(model_name)
+        return manifest
+
+    def subscribe(self, model_name: str, hook: Callable[[], Any]):
+        """Run ``hook`` in this process whenever ``model_name``'s active version changes"""
+        self._subscribers.setdefault(model_name, []).append(hook)
+        self._seen_active.setdefault(model_name, self._read_manifest(model_name)['active'])
+
+    def notify(self, model_name: str):
+        """Run the subscribed hooks, e.g. after another process published a version"""
+        self._seen_active[model_name] = self._read_manifest(model_name)['active']
+        for hook in self._subscribers.get(model_name, []):
+            hook()
+
+    def poll(self) -> List[str]:
+        """
+        Notify the subscribers of every model whose active version was
+        changed by another process (a sibling server worker, a CLI publish)
+        since this process last swapped it in. Returns those models.
+        """
+        changed = []
+        for model_name in list(self._subscribers):
+            if self._read_manifest(model_name)['active'] != self._seen_active.get(model_name):
+                self.notify(model_name)
+                changed.append(model_name)
+        return changed
+
+    def _entry(self, manifest: Dict, model_name: str, version: str) -> Dict:
+        for entry in manifest['versions']:
+            if entry['version'] == version:
+                return entry
+        raise KeyError(f"Version '{version}' of '{model_name}' not found")
+
+    def _model_dir(self, model_name: str) -> str:
+        return os.path.join(self.root, model_name)
+
+    def _read_manifest(self, model_name: str) -> Dict:
+        path = os.path.join(self._model_dir(model_name), MANIFEST_FILE)
+        if not os.path.exists(path):
+            return {'model_name': model_name, 'active': None, 'pinned': False, 'versions': []}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, model_name: str, manifest: Dict):
+        model_dir = self._model_dir(model_name)
+        fd, tmp_path = tempfile.mkstemp(prefix='.manifest-', dir=model_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2, default=_json_default)
+        os.replace(tmp_path, os.path.join(model_dir, MANIFEST_FILE))
+
+    @contextmanager
+    def _locked(self, model_name: str):
+        """Serialize manifest updates across processes"""
+        model_dir = self._model_dir(model_name)
+        os.makedirs(model_dir, exist_ok=True)
+        with file_lock(os.path.join(model_dir, '.lock')):
+            yield
+
+model_registry = ModelRegistry()
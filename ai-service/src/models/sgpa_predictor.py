@@ -1,13 +1,12 @@
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import GradientBoostingRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import mean_squared_error, r2_score
 import joblib
 import os
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, TYPE_CHECKING
 from .base_model import BaseModel
+from .estimators import build_boosting_regressor
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 class SGPAPredictor(BaseModel):
     """
@@ -19,45 +18,116 @@ class SGPAPredictor(BaseModel):
     - Average attendance across subjects
     """
     
+    # Filled column-wise when a request omits them
+    FEATURE_DEFAULTS = {
+        'previous_sgpa': 7.0,
+        'active_backlog_count': 0
+    }
+    
+    # Hyperparameters of _build_model and the space services.hyperparameter_search explores
+    DEFAULT_PARAMS = {'n_estimators': 100, 'learning_rate': 0.1, 'max_depth': 6}
+    PARAM_SPACE = {
+        'n_estimators': [50, 100, 200, 400],
+        'learning_rate': [0.03, 0.05, 0.1, 0.2],
+        'max_depth': [3, 4, 6, 8],
+        'subsample': [0.8, 1.0]
+    }
+    
     def __init__(self, model_path: Optional[str] = None):
         super().__init__("sgpa_predictor", model_path)
-        self.model = GradientBoostingRegressor(
-            n_estimators=100,
-            learning_rate=0.1,
-            max_depth=6,
-            random_state=42
-        )
-        self.scaler = StandardScaler()
+        self.params = dict(self.DEFAULT_PARAMS)
+        # Estimator and scaler are created by train() or restored by a load
+        self.model = None
+        self.scaler = None
         self.feature_names = [
             'mean_subject_prediction',
             'active_backlog_count',
             'previous_sgpa',
             'attendance_average'
         ]
+        self.target_name = 'sgpa'
         
     def prepare_features(self, data: Dict) -> np.ndarray:
         """Prepare features for prediction"""
-        features = []
-        for feature_name in self.feature_names:
-            if feature_name not in data:
-                # Handle missing features with defaults
-                if feature_name == 'previous_sgpa':
-                    features.append(7.0)  # Default SGPA
-                elif feature_name == 'active_backlog_count':
-                    features.append(0)
-                else:
-                    raise ValueError(f"Missing required feature: {feature_name}")
-            else:
-                features.append(data[feature_name])
-        
-        return np.array(features).reshape(1, -1)
-    
-    def train(self, training_data: pd.DataFrame) -> Dict:
+        X, errors, _ = self.prepare_feature_matrix([data])
+        if errors[0]:
+            raise ValueError(errors[0])
+        return X
+    
+    def prepare_feature_matrix(self, features_list: List[Dict]) -> Tuple[np.ndarray, List[Optional[str]], np.ndarray]:
+        """
+        Build the feature matrix for many requests one column at a time.
+        
+        Returns the matrix, one error message (or None) per row, and a mask
+        of the rows that had no previous SGPA. Missing previous SGPA and
+        backlog counts are filled with their defaults.
+        """
+        n_rows = len(features_list)
+        X = np.empty((n_rows, len(self.feature_names)), dtype=np.float64)
+        errors: List[Optional[str]] = [None] * n_rows
+        missing_previous_sgpa = np.zeros(n_rows, dtype=bool)
+        
+        for j, feature_name in enumerate(self.feature_names):
+            column, invalid = self._feature_column(features_list, feature_name)
+            # Infinity passes request validation; NaN stays "missing" below
+            invalid |= ~np.isfinite(column) & ~np.isnan(column)
+            missing = np.isnan(column) | invalid
+            if feature_name == 'previous_sgpa':
+                missing_previous_sgpa = missing & ~invalid
+            if feature_name in self.FEATURE_DEFAULTS:
+                column[missing & ~invalid] = self.FEATURE_DEFAULTS[feature_name]
+                missing = invalid
+            for i in np.flatnonzero(missing):
+                if errors[i] is None:
+                    errors[i] = (f"Invalid value for feature: {feature_name}" if invalid[i]
+                                 else f"Missing required feature: {feature_name}")
+            X[:, j] = column
+        
+        return X, errors, missing_previous_sgpa
+    
+    @staticmethod
+    def _feature_column(features_list: List[Dict], feature_name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """One feature as floats (NaN where absent) plus a mask of non-numeric values"""
+        values = [features.get(feature_name) for features in features_list]
+        try:
+            column = np.fromiter(
+                (np.nan if value is None else value for value in values),
+                dtype=np.float64,
+                count=len(values)
+            )
+            return column, np.zeros(len(values), dtype=bool)
+        except (TypeError, ValueError):
+            pass
+        
+        column = np.full(len(values), np.nan)
+        invalid = np.zeros(len(values), dtype=bool)
+        for i, value in enumerate(values):
+            if value is None:
+                continue
+            try:
+                column[i] = float(value)
+            except (TypeError, ValueError):
+                invalid[i] = True
+        return column, invalid
+    
+    def _build_model(self, params: Optional[Dict] = None):
+        """Unfitted estimator with this model's hyperparameters (``params`` override them)"""
+        return build_boosting_regressor({**self.params, **(params or {})})
+    
+    def train(self, training_data: "pd.DataFrame") -> Dict:
         """Train the SGPA predictor model"""
+        # Training-only dependencies stay out of the serving import path
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.metrics import mean_squared_error, r2_score
+        
         try:
+            self.model = self._build_model()
+            self.scaler = StandardScaler()
+            
             # Prepare features and target
             X = training_data[self.feature_names]
-            y = training_data['sgpa']  # Target variable
+            y = training_data[self.target_name]  # Target variable
             
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(
@@ -80,13 +150,13 @@ class SGPAPredictor(BaseModel):
                 'test_rmse': np.sqrt(mean_squared_error(y_test, test_pred)),
                 'train_r2': r2_score(y_train, train_pred),
                 'test_r2': r2_score(y_test, test_pred),
-                'feature_importance': dict(zip(
-                    self.feature_names,
-                    self.model.feature_importances_
-                ))
+                # None for estimators without impurity importances (hist backend)
+                'feature_importance': self._feature_importance()
             }
             
             self.is_trained = True
+            self.compile(X_test, y_test)
+            metrics['compression'] = self.compression
             return metrics
             
         except Exception as e:
@@ -97,97 +167,139 @@ class SGPAPredictor(BaseModel):
         if not self.is_trained:
             raise Exception("Model not trained. Please train the model first.")
         
-        try:
-            # Prepare features
-            X = self.prepare_features(features)
-            X_scaled = self.scaler.transform(X)
-            
-            # Make prediction
-            predicted_sgpa = self.model.predict(X_scaled)[0]
-            
-            # Clamp SGPA to valid range (0-10)
-            predicted_sgpa = max(0.0, min(10.0, predicted_sgpa))
-            
-            # Calculate confidence based on feature values
-            confidence = self._calculate_confidence(features, predicted_sgpa)
-            
-            # Determine risk level
-            risk_level = self._determine_risk_level(predicted_sgpa, features)
-            
-            return {
-                'predicted_sgpa': round(predicted_sgpa, 2),
-                'confidence': round(confidence, 3),
-                'risk_level': risk_level,
-                'model_version': self.version
-            }
-            
-        except Exception as e:
-            raise Exception(f"Prediction failed: {str(e)}")
+        result = self.batch_predict([features])[0]
+        if not result['success']:
+            raise Exception(result['error'])
+        return result['prediction']
+    
+    def predict_matrix(self, X: np.ndarray, missing_previous_sgpa: np.ndarray, bundle=None) -> Dict[str, np.ndarray]:
+        """Predicted SGPA, confidence and risk level for a prepared feature matrix"""
+        bundle = bundle or self.bundle
+        X_scaled = bundle.scaler_engine.transform(X)
+        predicted_sgpa = np.clip(bundle.engine.predict(X_scaled), 0.0, 10.0)
+        
+        backlog_count = X[:, self.feature_names.index('active_backlog_count')]
+        attendance = X[:, self.feature_names.index('attendance_average')]
+        
+        return {
+            'predicted_sgpa': predicted_sgpa,
+            'confidence': self._calculate_confidence(predicted_sgpa, backlog_count, attendance, missing_previous_sgpa),
+            'risk_level': self._determine_risk_level(predicted_sgpa, backlog_count, attendance)
+        }
+    
+    def predict_columns(self, columns: Dict[str, np.ndarray], n_rows: int) -> Dict[str, np.ndarray]:
+        """
+        Predict the ``n_rows`` rows of a columnar batch without per-row objects.
+        
+        Returns one array per output field plus ``success`` and ``error``;
+        rows that failed validation hold NaN / empty values.
+        """
+        if not self.is_trained:
+            raise Exception("Model not trained. Please train the model first.")
+        
+        bundle = self.bundle
+        X, errors, filled = self.column_matrix(columns, n_rows, self.FEATURE_DEFAULTS)
+        valid = errors == None  # noqa: E711 - elementwise on the object array
+        result = self.predict_matrix(X[valid], filled['previous_sgpa'][valid], bundle)
+        
+        output = {
+            'success': valid,
+            'error': errors,
+            'predicted_sgpa': np.full(n_rows, np.nan),
+            'confidence': np.full(n_rows, np.nan),
+            'risk_level': np.full(n_rows, '', dtype=object)
+        }
+        output['predicted_sgpa'][valid] = np.round(result['predicted_sgpa'], 2)
+        output['confidence'][valid] = np.round(result['confidence'], 3)
+        output['risk_level'][valid] = result['risk_level']
+        output['model_version'] = bundle.version
+        return output
     
     def batch_predict(self, features_list: List[Dict]) -> List[Dict]:
-        """Make batch predictions"""
-        predictions = []
-        for features in features_list:
-            try:
-                prediction = self.predict(features)
-                predictions.append({
-                    'success': True,
-                    'prediction': prediction
-                })
-            except Exception as e:
-                predictions.append({
+        """Make batch predictions with one scaling and one model pass"""
+        if not self.is_trained:
+            error = "Prediction failed: Model not trained. Please train the model first."
+            return [{'success': False, 'error': error} for _ in features_list]
+        
+        bundle = self.bundle
+        predictions = [None] * len(features_list)
+        X, errors, missing_previous_sgpa = self.prepare_feature_matrix(features_list)
+        for i, error in enumerate(errors):
+            if error is not None:
+                predictions[i] = {
                     'success': False,
-                    'error': str(e)
-                })
+                    'error': f"Prediction failed: {error}"
+                }
+        
+        valid = np.array([error is None for error in errors], dtype=bool)
+        if valid.any():
+            result = self.predict_matrix(X[valid], missing_previous_sgpa[valid], bundle)
+            rows = zip(
+                np.flatnonzero(valid),
+                result['predicted_sgpa'].tolist(),
+                result['confidence'].tolist(),
+                result['risk_level'].tolist()
+            )
+            for i, predicted_sgpa, confidence, risk_level in rows:
+                predictions[i] = {
+                    'success': True,
+                    'prediction': {
+                        'predicted_sgpa': round(predicted_sgpa, 2),
+                        'confidence': round(confidence, 3),
+                        'risk_level': risk_level,
+                        'model_version': bundle.version
+                    }
+                }
         
         return predictions
     
-    def _calculate_confidence(self, features: Dict, predicted_sgpa: float) -> float:
+    def _calculate_confidence(
+        self,
+        predicted_sgpa: np.ndarray,
+        backlog_count: np.ndarray,
+        attendance: np.ndarray,
+        missing_previous_sgpa: np.ndarray
+    ) -> np.ndarray:
         """Calculate prediction confidence based on feature quality"""
-        confidence = 1.0
+        confidence = np.ones(len(predicted_sgpa))
         
         # Reduce confidence for extreme predictions
-        if predicted_sgpa < 4.0 or predicted_sgpa > 9.5:
-            confidence *= 0.8
+        confidence[(predicted_sgpa < 4.0) | (predicted_sgpa > 9.5)] *= 0.8
         
         # Reduce confidence for high backlog count
-        backlog_count = features.get('active_backlog_count', 0)
-        if backlog_count > 3:
-            confidence *= 0.7
+        confidence[backlog_count > 3] *= 0.7
         
         # Reduce confidence for low attendance
-        attendance = features.get('attendance_average', 100)
-        if attendance < 70:
-            confidence *= 0.8
+        confidence[attendance < 70] *= 0.8
         
         # Reduce confidence if no previous SGPA available
-        if 'previous_sgpa' not in features or features['previous_sgpa'] is None:
-            confidence *= 0.9
+        confidence[missing_previous_sgpa] *= 0.9
         
-        return max(0.1, confidence)
+        return np.maximum(confidence, 0.1)
     
-    def _determine_risk_level(self, predicted_sgpa: float, features: Dict) -> str:
+    def _determine_risk_level(
+        self,
+        predicted_sgpa: np.ndarray,
+        backlog_count: np.ndarray,
+        attendance: np.ndarray
+    ) -> np.ndarray:
         """Determine risk level based on predicted SGPA and features"""
-        backlog_count = features.get('active_backlog_count', 0)
-        attendance = features.get('attendance_average', 100)
-        
         # High risk conditions
-        if predicted_sgpa < 6.0 or backlog_count > 2 or attendance < 70:
-            return 'AT_RISK'
+        at_risk = (predicted_sgpa < 6.0) | (backlog_count > 2) | (attendance < 70)
         
         # Medium risk conditions
-        if predicted_sgpa < 7.5 or backlog_count > 0 or attendance < 80:
-            return 'NEEDS_ATTENTION'
+        needs_attention = (predicted_sgpa < 7.5) | (backlog_count > 0) | (attendance < 80)
         
-        # Low risk
-        return 'SAFE'
+        return np.where(at_risk, 'AT_RISK', np.where(needs_attention, 'NEEDS_ATTENTION', 'SAFE'))
     
     def get_feature_importance(self) -> Dict:
         """Get feature importance scores"""
         if not self.is_trained:
             raise Exception("Model not trained")
+        if self.bundle.feature_importance is None:
+            raise Exception("Feature importance not available for this model")
         
-        return dict(zip(self.feature_names, self.model.feature_importances_))
+        return dict(self.bundle.feature_importance)
     
     def save_model(self, path: str = None) -> str:
         """Save the trained model"""
@@ -211,6 +323,9 @@ class SGPAPredictor(BaseModel):
     def load_model(self, path: str = None) -> bool:
         """Load a trained model"""
         if path is None:
+            # Active registry version first, then the legacy file
+            if self.load_version():
+                return True
             path = os.path.join(self.model_path, f"{self.model_name}_v{self.version}.pkl")
         
         if not os.path.exists(path):
@@ -223,6 +338,8 @@ class SGPAPredictor(BaseModel):
             self.feature_names = model_data['feature_names']
             self.version = model_data['version']
             self.is_trained = model_data['is_trained']
+            if self.is_trained:
+                self.compile()
             return True
         except Exception as e:
             print(f"Failed to load model: {str(e)}")
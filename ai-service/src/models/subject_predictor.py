@@ -1,14 +1,12 @@
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import mean_squared_error, r2_score
 import joblib
 import os
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, TYPE_CHECKING
 from .base_model import BaseModel
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 class SubjectPredictor(BaseModel):
     """
     Subject Performance Predictor (Model S)
@@ -19,21 +17,28 @@ class SubjectPredictor(BaseModel):
     - Behavior score
     """
     
+    # Hyperparameters of _build_model and the space services.hyperparameter_search explores
+    DEFAULT_PARAMS = {'n_estimators': 100, 'max_depth': 10}
+    PARAM_SPACE = {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [6, 8, 10, 14, None],
+        'min_samples_leaf': [1, 2, 5],
+        'max_features': [1.0, 0.5]
+    }
+    
     def __init__(self, model_path: Optional[str] = None):
         super().__init__("subject_predictor", model_path)
-        self.model = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42,
-            n_jobs=-1
-        )
-        self.scaler = StandardScaler()
+        self.params = dict(self.DEFAULT_PARAMS)
+        # Estimator and scaler are created by train() or restored by a load
+        self.model = None
+        self.scaler = None
         self.feature_names = [
             'attendance_percentage',
             'best_of_two_internals',
             'assignment_marks',
             'behavior_score'
         ]
+        self.target_name = 'final_marks'
         
     def prepare_features(self, data: Dict) -> np.ndarray:
         """Prepare features for prediction"""
@@ -45,12 +50,26 @@ class SubjectPredictor(BaseModel):
         
         return np.array(features).reshape(1, -1)
     
-    def train(self, training_data: pd.DataFrame) -> Dict:
+    def _build_model(self, params: Optional[Dict] = None):
+        """Unfitted estimator with this model's hyperparameters (``params`` override them)"""
+        from sklearn.ensemble import RandomForestRegressor
+        
+        return RandomForestRegressor(random_state=42, n_jobs=-1, **{**self.params, **(params or {})})
+    
+    def train(self, training_data: "pd.DataFrame") -> Dict:
         """Train the subject predictor model"""
+        # Training-only dependencies stay out of the serving import path
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.metrics import mean_squared_error, r2_score
+        
         try:
+            self.model = self._build_model()
+            self.scaler = StandardScaler()
+            
             # Prepare features and target
             X = training_data[self.feature_names]
-            y = training_data['final_marks']  # Target variable
+            y = training_data[self.target_name]  # Target variable
             
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(
@@ -80,6 +99,8 @@ class SubjectPredictor(BaseModel):
             }
             
             self.is_trained = True
+            self.compile(X_test, y_test)
+            metrics['compression'] = self.compression
             return metrics
             
         except Exception as e:
@@ -93,66 +114,133 @@ class SubjectPredictor(BaseModel):
         try:
             # Prepare features
             X = self.prepare_features(features)
-            X_scaled = self.scaler.transform(X)
-            
-            # Make prediction
-            predicted_score = self.model.predict(X_scaled)[0]
-            
-            # Calculate confidence (based on prediction variance)
-            # For RandomForest, we can use the standard deviation of tree predictions
-            tree_predictions = np.array([
-                tree.predict(X_scaled)[0] for tree in self.model.estimators_
-            ])
-            confidence = 1.0 - (np.std(tree_predictions) / 100.0)  # Normalize to 0-1
-            confidence = max(0.0, min(1.0, confidence))  # Clamp to [0,1]
             
-            # Determine risk level
-            risk_level = self._determine_risk_level(predicted_score, features)
+            # Forest mean and tree spread from a single pass
+            bundle = self.bundle
+            predicted_scores, tree_std = self.predict_with_uncertainty(X, bundle)
             
-            return {
-                'predicted_score': round(predicted_score, 2),
-                'confidence': round(confidence, 3),
-                'risk_level': risk_level,
-                'model_version': self.version
-            }
+            return self._build_prediction(predicted_scores[0], tree_std[0], features, bundle.version)
             
         except Exception as e:
             raise Exception(f"Prediction failed: {str(e)}")
     
+    def predict_with_uncertainty(self, X: np.ndarray, bundle=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Predict scores together with the spread of the individual trees.
+        
+        Builds the (n_rows x n_trees) leaf-value matrix in one vectorized
+        pass over the compiled forest; its row mean is the forest prediction
+        and its row standard deviation the uncertainty.
+        """
+        if not self.is_trained:
+            raise Exception("Model not trained. Please train the model first.")
+        
+        bundle = bundle or self.bundle
+        X_scaled = bundle.scaler_engine.transform(X)
+        tree_predictions = bundle.engine.tree_values(X_scaled)
+        return tree_predictions.mean(axis=1), tree_predictions.std(axis=1)
+    
+    def predict_matrix(self, X: np.ndarray, bundle=None) -> Dict[str, np.ndarray]:
+        """Predicted score, confidence and risk level for a prepared feature matrix"""
+        bundle = bundle or self.bundle
+        predicted_scores, tree_std = self.predict_with_uncertainty(X, bundle)
+        attendance = X[:, self.feature_names.index('attendance_percentage')]
+        return {
+            'predicted_score': np.round(predicted_scores, 2),
+            'confidence': np.round(np.clip(1.0 - tree_std / 100.0, 0.0, 1.0), 3),
+            'risk_level': self._risk_levels(predicted_scores, attendance)
+        }
+    
+    def predict_columns(self, columns: Dict[str, np.ndarray], n_rows: int) -> Dict[str, np.ndarray]:
+        """
+        Predict the ``n_rows`` rows of a columnar batch without per-row objects.
+        
+        Returns one array per output field plus ``success`` and ``error``;
+        rows that failed validation hold NaN / empty values.
+        """
+        if not self.is_trained:
+            raise Exception("Model not trained. Please train the model first.")
+        
+        bundle = self.bundle
+        X, errors, _ = self.column_matrix(columns, n_rows)
+        valid = errors == None  # noqa: E711 - elementwise on the object array
+        result = self.predict_matrix(X[valid], bundle)
+        
+        output = {
+            'success': valid,
+            'error': errors,
+            'predicted_score': np.full(n_rows, np.nan),
+            'confidence': np.full(n_rows, np.nan),
+            'risk_level': np.full(n_rows, '', dtype=object)
+        }
+        for name, values in result.items():
+            output[name][valid] = values
+        output['model_version'] = bundle.version
+        return output
+    
     def batch_predict(self, features_list: List[Dict]) -> List[Dict]:
         """Make batch predictions"""
-        predictions = []
-        for features in features_list:
+        bundle = self.bundle
+        predictions = [None] * len(features_list)
+        rows, valid_indices = [], []
+        for i, features in enumerate(features_list):
             try:
-                prediction = self.predict(features)
-                predictions.append({
-                    'success': True,
-                    'prediction': prediction
-                })
+                if not self.is_trained:
+                    raise Exception("Model not trained. Please train the model first.")
+                rows.append(self.prepare_features(features)[0])
+                valid_indices.append(i)
             except Exception as e:
-                predictions.append({
+                predictions[i] = {
                     'success': False,
-                    'error': str(e)
-                })
+                    'error': f"Prediction failed: {str(e)}"
+                }
+        
+        if rows:
+            predicted_scores, tree_std = self.predict_with_uncertainty(np.array(rows), bundle)
+            for i, score, std in zip(valid_indices, predicted_scores, tree_std):
+                predictions[i] = {
+                    'success': True,
+                    'prediction': self._build_prediction(score, std, features_list[i], bundle.version)
+                }
         
         return predictions
     
+    def _build_prediction(self, predicted_score: float, tree_std: float, features: Dict, version: str) -> Dict:
+        """Assemble the prediction payload for one row"""
+        # Confidence from the spread of the individual tree predictions
+        confidence = 1.0 - (tree_std / 100.0)  # Normalize to 0-1
+        confidence = max(0.0, min(1.0, confidence))  # Clamp to [0,1]
+        
+        # Determine risk level
+        risk_level = self._determine_risk_level(predicted_score, features)
+        
+        return {
+            'predicted_score': round(predicted_score, 2),
+            'confidence': round(confidence, 3),
+            'risk_level': risk_level,
+            'model_version': version
+        }
+    
     def _determine_risk_level(self, predicted_score: float, features: Dict) -> str:
         """Determine risk level based on predicted score and features"""
+        attendance = features.get('attendance_percentage', 0)
+        return str(self._risk_levels(np.array([predicted_score]), np.array([attendance], dtype=float))[0])
+    
+    def _risk_levels(self, predicted_scores: np.ndarray, attendance: np.ndarray) -> np.ndarray:
+        """Risk level of every row from its predicted score and attendance"""
         # Risk thresholds
-        if predicted_score >= 70 and features.get('attendance_percentage', 0) >= 80:
-            return 'SAFE'
-        elif predicted_score >= 50 and features.get('attendance_percentage', 0) >= 70:
-            return 'NEEDS_ATTENTION'
-        else:
-            return 'AT_RISK'
+        safe = (predicted_scores >= 70) & (attendance >= 80)
+        needs_attention = (predicted_scores >= 50) & (attendance >= 70)
+        return np.where(safe, 'SAFE', np.where(needs_attention, 'NEEDS_ATTENTION', 'AT_RISK'))
     
     def get_feature_importance(self) -> Dict:
         """Get feature importance scores"""
         if not self.is_trained:
             raise Exception("Model not trained")
+        if self.bundle.feature_importance is None:
+            raise Exception("Feature importance not available for this model")
         
-        return dict(zip(self.feature_names, self.model.feature_importances_))
+        return dict(self.bundle.feature_importance)
     
     def save_model(self, path: str = None) -> str:
         """Save the trained model"""
@@ -176,6 +264,9 @@ class SubjectPredictor(BaseModel):
     def load_model(self, path: str = None) -> bool:
         """Load a trained model"""
         if path is None:
+            # Active registry version first, then the legacy file
+            if self.load_version():
+                return True
             path = os.path.join(self.model_path, f"{self.model_name}_v{self.version}.pkl")
         
         if not os.path.exists(path):
@@ -188,6 +279,8 @@ class SubjectPredictor(BaseModel):
             self.feature_names = model_data['feature_names']
             self.version = model_data['version']
             self.is_trained = model_data['is_trained']
+            if self.is_trained:
+                self.compile()
             return True
         except Exception as e:
             print(f"Failed to load model: {str(e)}")
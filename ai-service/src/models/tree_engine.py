@@ -0,0 +1,390 @@
+import mmap
+import os
+import numpy as np
+from typing import Dict, Optional
+
+# sklearn's tree predict path casts inputs to float32 before comparing them
+# against the (float64) split thresholds; doing the same keeps every routing
+# decision identical to sklearn.
+TREE_INPUT_DTYPE = np.float32
+
+class CompiledTreeEnsemble:
+    """
+    Array-backed inference engine for a fitted sklearn tree ensemble.
+
+    Every tree is flattened into shared contiguous arrays (feature, threshold,
+    children, value). ``children`` holds the (left, right) pair of every
+    node; indices are global and leaves point at themselves, so all trees are
+    traversed together, one level per step, for any number of rows. Arrays
+    are stored in the dtype the traversal uses, so engines loaded from
+    memory-mapped files never need a private copy.
+
+    Missing values go left unless ``missing_right`` (optional, one flag per
+    node) sends them right, as histogram boosting learns per split. Split
+    nodes keep the value of their subtree (mean or class distribution) so
+    compression can cut trees at any depth.
+    """
+
+    FOREST_REGRESSOR = "forest_regressor"
+    FOREST_CLASSIFIER = "forest_classifier"
+    BOOSTING_REGRESSOR = "boosting_regressor"
+
+    # Levels between compactions of the active (row, tree) set
+    COMPACT_EVERY = 4
+
+    def __init__(
+        self,
+        kind: str,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        n_features: int,
+        baseline: float = 0.0,
+        learning_rate: float = 1.0,
+        classes: Optional[np.ndarray] = None,
+        input_dtype=TREE_INPUT_DTYPE,
+        missing_right: Optional[np.ndarray] = None
+    ):
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.baseline = float(baseline)
+        self.learning_rate = float(learning_rate)
+        self.classes = classes
+        self.input_dtype = input_dtype
+        self.missing_right = missing_right
+
+        # Interleaved (left, right) view so one gather picks the next node
+        self._children = children.reshape(-1)
+
+    @property
+    def left(self) -> np.ndarray:
+        return self.children[:, 0]
+
+    @property
+    def right(self) -> np.ndarray:
+        return self.children[:, 1]
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def arrays(self):
+        """Every node array of the engine"""
+        arrays = [self.feature, self.threshold, self.children, self.value, self.roots]
+        if self.missing_right is not None:
+            arrays.append(self.missing_right)
+        return arrays
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the node arrays in bytes"""
+        return sum(a.nbytes for a in self.arrays)
+
+    def prefault(self) -> int:
+        """
+        Read one byte of every page of the node arrays so memory-mapped
+        engines are resident before the first request. Returns the bytes
+        covered.
+        """
+        for array in self.arrays:
+            if array.size:
+                np.ascontiguousarray(array).reshape(-1).view(np.uint8)[::mmap.PAGESIZE].sum()
+        return self.nbytes
+
+    def apply(self, X) -> np.ndarray:
+        """Return the (n_rows x n_trees) matrix of leaf indices reached by X"""
+        X = np.ascontiguousarray(X, dtype=self.input_dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+
+        n_rows = X.shape[0]
+        # Flat (row-major) walk: one entry per (row, tree) pair
+        leaves = np.tile(self.roots, n_rows)
+        positions = np.arange(leaves.size)
+        nodes = leaves.copy()
+        row_base = np.repeat(np.arange(n_rows, dtype=np.intp) * self.n_features, self.n_trees)
+        X_flat = X.ravel()
+        route_missing = self.missing_right is not None and np.isnan(X_flat).any()
+        for depth in range(1, self.max_depth + 1):
+            x = X_flat.take(row_base + self.feature.take(nodes))
+            go_right = x > self.threshold.take(nodes)
+            if route_missing:
+                go_right |= np.isnan(x) & self.missing_right.take(nodes)
+            nodes = self._children.take(2 * nodes + go_right)
+            if depth % self.COMPACT_EVERY == 0 and depth < self.max_depth:
+                # Drop finished paths so deep, unbalanced trees stop paying
+                # for entries that already reached a leaf
+                live = self._children.take(2 * nodes) != nodes
+                if not live.all():
+                    leaves[positions[~live]] = nodes[~live]
+                    positions, nodes, row_base = positions[live], nodes[live], row_base[live]
+        leaves[positions] = nodes
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def tree_values(self, X) -> np.ndarray:
+        """
+        Per-tree leaf outputs for X.
+
+        Shape is (n_rows x n_trees) for regressors and
+        (n_rows x n_trees x n_classes) for classifiers.
+        """
+        values = self.value[self.apply(X)]
+        if values.dtype != np.float64:
+            # Compressed engines store float32; sums and means stay float64
+            values = values.astype(np.float64)
+        if self.kind == self.FOREST_CLASSIFIER:
+            return values
+        return values[..., 0]
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities (forest classifiers only)"""
+        if self.kind != self.FOREST_CLASSIFIER:
+            raise ValueError("predict_proba is only available for classifiers")
+        return self.tree_values(X).mean(axis=1)
+
+    def predict(self, X) -> np.ndarray:
+        """Ensemble prediction matching the source estimator's predict"""
+        if self.kind == self.FOREST_CLASSIFIER:
+            return self.classes.take(np.argmax(self.predict_proba(X), axis=1))
+        if self.kind == self.BOOSTING_REGRESSOR:
+            return self.baseline + self.learning_rate * self.tree_values(X).sum(axis=1)
+        return self.tree_values(X).mean(axis=1)
+
+class CompiledScaler:
+    """Array-backed StandardScaler.transform without sklearn's validation overhead"""
+
+    def __init__(self, mean: Optional[np.ndarray], scale: Optional[np.ndarray]):
+        self.mean = mean
+        self.scale = scale
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.mean, self.scale) if a is not None)
+
+    def transform(self, X) -> np.ndarray:
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale is not None:
+            X /= self.scale
+        return X
+
+ENGINE_ARRAYS = ('feature', 'threshold', 'children', 'value', 'roots')
+
+def save_engine(engine: CompiledTreeEnsemble, directory: str, prefix: str) -> Dict:
+    """
+    Write an engine's node arrays as uncompressed ``.npy`` files.
+
+    Returns the metadata needed by load_engine to rebuild it.
+    """
+    for name in ENGINE_ARRAYS:
+        np.save(os.path.join(directory, f"{prefix}.{name}.npy"), getattr(engine, name))
+    if engine.missing_right is not None:
+        np.save(os.path.join(directory, f"{prefix}.missing_right.npy"), engine.missing_right)
+    return {
+        'kind': engine.kind,
+        'max_depth': engine.max_depth,
+        'n_features': engine.n_features,
+        'baseline': engine.baseline,
+        'learning_rate': engine.learning_rate,
+        'classes': None if engine.classes is None else engine.classes.tolist(),
+        'input_dtype': np.dtype(engine.input_dtype).name,
+        'missing_right': engine.missing_right is not None
+    }
+
+def load_engine(directory: str, prefix: str, meta: Dict, mmap_mode: Optional[str] = 'r') -> CompiledTreeEnsemble:
+    """
+    Rebuild an engine written by save_engine.
+
+    With ``mmap_mode='r'`` the node arrays are mapped read-only, so every
+    process loading the same files shares one copy through the page cache.
+    """
+    arrays = {
+        name: np.asarray(np.load(os.path.join(directory, f"{prefix}.{name}.npy"), mmap_mode=mmap_mode))
+        for name in ENGINE_ARRAYS
+    }
+    if meta.get('missing_right'):
+        arrays['missing_right'] = np.asarray(
+            np.load(os.path.join(directory, f"{prefix}.missing_right.npy"), mmap_mode=mmap_mode)
+        )
+    return CompiledTreeEnsemble(
+        kind=meta['kind'],
+        max_depth=meta['max_depth'],
+        n_features=meta['n_features'],
+        baseline=meta['baseline'],
+        learning_rate=meta['learning_rate'],
+        classes=None if meta['classes'] is None else np.asarray(meta['classes']),
+        input_dtype=np.dtype(meta['input_dtype']).type,
+        **arrays
+    )
+
+def save_scaler(scaler: CompiledScaler, directory: str, prefix: str) -> Dict:
+    """Write scaler parameters next to the engine arrays"""
+    meta = {}
+    for name in ('mean', 'scale'):
+        array = getattr(scaler, name)
+        meta[name] = array is not None
+        if array is not None:
+            np.save(os.path.join(directory, f"{prefix}.scaler_{name}.npy"), array)
+    return meta
+
+def load_scaler(directory: str, prefix: str, meta: Dict, mmap_mode: Optional[str] = 'r') -> CompiledScaler:
+    """Rebuild a scaler written by save_scaler"""
+    params = {
+        name: np.asarray(np.load(os.path.join(directory, f"{prefix}.scaler_{name}.npy"), mmap_mode=mmap_mode))
+        if meta[name] else None
+        for name in ('mean', 'scale')
+    }
+    return CompiledScaler(params['mean'], params['scale'])
+
+def compile_scaler(scaler) -> CompiledScaler:
+    """Extract the fitted parameters of a StandardScaler"""
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    return CompiledScaler(
+        None if mean is None else np.ascontiguousarray(mean, dtype=np.float64),
+        None if scale is None else np.ascontiguousarray(scale, dtype=np.float64)
+    )
+
+def compile_ensemble(estimator) -> CompiledTreeEnsemble:
+    """
+    Flatten a fitted RandomForestRegressor, RandomForestClassifier,
+    GradientBoostingRegressor or HistGradientBoostingRegressor into a
+    CompiledTreeEnsemble.
+    """
+    name = type(estimator).__name__
+    if name == "HistGradientBoostingRegressor":
+        return _compile_hist_boosting(estimator)
+    if name in ("RandomForestRegressor", "ExtraTreesRegressor"):
+        kind = CompiledTreeEnsemble.FOREST_REGRESSOR
+        trees = [est.tree_ for est in estimator.estimators_]
+    elif name in ("RandomForestClassifier", "ExtraTreesClassifier"):
+        if getattr(estimator, 'n_outputs_', 1) != 1:
+            raise ValueError("Multi-output classifiers are not supported")
+        kind = CompiledTreeEnsemble.FOREST_CLASSIFIER
+        trees = [est.tree_ for est in estimator.estimators_]
+    elif name == "GradientBoostingRegressor":
+        kind = CompiledTreeEnsemble.BOOSTING_REGRESSOR
+        trees = [est.tree_ for est in estimator.estimators_[:, 0]]
+    else:
+        raise ValueError(f"Cannot compile estimator of type {name}")
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for tree in trees:
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        own = np.arange(offset, offset + n)
+
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, own, tree.children_left + offset))
+        rights.append(np.where(is_leaf, own, tree.children_right + offset))
+
+        value = tree.value[:, 0, :]
+        if kind == CompiledTreeEnsemble.FOREST_CLASSIFIER:
+            totals = value.sum(axis=1, keepdims=True)
+            value = value / np.where(totals == 0, 1.0, totals)
+        values.append(value)
+
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n
+
+    baseline, learning_rate, classes = 0.0, 1.0, None
+    if kind == CompiledTreeEnsemble.BOOSTING_REGRESSOR:
+        learning_rate = estimator.learning_rate
+        if not isinstance(estimator.init_, str):  # 'zero' means no baseline
+            baseline = float(np.ravel(estimator.init_.constant_)[0])
+    elif kind == CompiledTreeEnsemble.FOREST_CLASSIFIER:
+        classes = np.asarray(estimator.classes_)
+
+    return CompiledTreeEnsemble(
+        kind=kind,
+        feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+        threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+        children=np.ascontiguousarray(
+            np.stack([np.concatenate(lefts), np.concatenate(rights)], axis=1), dtype=np.intp
+        ),
+        value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+        roots=np.asarray(roots, dtype=np.intp),
+        max_depth=max_depth,
+        n_features=estimator.n_features_in_,
+        baseline=baseline,
+        learning_rate=learning_rate,
+        classes=classes
+    )
+
+def _compile_hist_boosting(estimator) -> CompiledTreeEnsemble:
+    """
+    Flatten a HistGradientBoostingRegressor.
+
+    Its predictor nodes split on raw float64 values (``num_threshold``), keep
+    the learning rate already applied to the leaf values and learn a
+    missing-value direction per split. Split nodes carry no value of their
+    own, so they get the sample-weighted mean of their children.
+    """
+    if estimator.loss not in ("squared_error", "absolute_error", "quantile"):
+        raise ValueError(f"Cannot compile HistGradientBoostingRegressor with loss '{estimator.loss}'")
+
+    features, thresholds, lefts, rights, values, missing_right, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for iteration in estimator._predictors:
+        nodes = iteration[0].nodes
+        if nodes['is_categorical'].any():
+            raise ValueError("Categorical splits are not supported")
+        n = len(nodes)
+        is_leaf = nodes['is_leaf'].astype(bool)
+        own = np.arange(offset, offset + n)
+
+        features.append(np.where(is_leaf, 0, nodes['feature_idx']))
+        thresholds.append(np.where(is_leaf, np.inf, nodes['num_threshold']))
+        lefts.append(np.where(is_leaf, own, nodes['left'].astype(np.intp) + offset))
+        rights.append(np.where(is_leaf, own, nodes['right'].astype(np.intp) + offset))
+        value, count = nodes['value'].copy(), nodes['count'].astype(np.float64)
+        # Children follow their parent, so one backwards pass fills every split
+        for i in np.flatnonzero(~is_leaf)[::-1]:
+            l, r = nodes['left'][i], nodes['right'][i]
+            value[i] = (value[l] * count[l] + value[r] * count[r]) / max(count[l] + count[r], 1.0)
+        values.append(value[:, None])
+        missing_right.append(~is_leaf & (nodes['missing_go_to_left'] == 0))
+
+        roots.append(offset)
+        max_depth = max(max_depth, int(nodes['depth'].max()))
+        offset += n
+
+    return CompiledTreeEnsemble(
+        kind=CompiledTreeEnsemble.BOOSTING_REGRESSOR,
+        feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+        threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+        children=np.ascontiguousarray(
+            np.stack([np.concatenate(lefts), np.concatenate(rights)], axis=1), dtype=np.intp
+        ),
+        value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+        roots=np.asarray(roots, dtype=np.intp),
+        max_depth=max_depth,
+        n_features=estimator.n_features_in_,
+        baseline=float(np.ravel(estimator._baseline_prediction)[0]),
+        learning_rate=1.0,
+        # Histogram boosting compares float64 inputs
+        input_dtype=np.float64,
+        missing_right=np.concatenate(missing_right)
+    )
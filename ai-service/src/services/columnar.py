@@ -0,0 +1,160 @@
+import io
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+NPZ = "npz"
+ARROW = "arrow"
+JSON = "json"
+JSON_COLUMNS = "json_columns"
+
+MEDIA_TYPES = {
+    NPZ: "application/x-npz",
+    ARROW: "application/vnd.apache.arrow.stream"
+}
+
+ID_COLUMN = "student_id"
+
+class ColumnarFormatError(ValueError):
+    """A columnar payload that cannot be read"""
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def input_format(content_type: Optional[str], payload: bytes) -> str:
+    """
+    Format of a columnar request body from its Content-Type; untyped or
+    application/octet-stream bodies are sniffed (an .npz file is a zip).
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    for name, known in MEDIA_TYPES.items():
+        if media_type == known:
+            return name
+    if media_type in ("", "application/octet-stream"):
+        return NPZ if payload[:2] == b"PK" else ARROW
+    raise ColumnarFormatError(
+        f"Unsupported content type {media_type!r}; send {MEDIA_TYPES[NPZ]} or {MEDIA_TYPES[ARROW]}"
+    )
+
+def read_columns(payload: bytes, fmt: str) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Student ids and the named feature columns of a columnar batch.
+
+    Numeric columns come back as float64 with NaN for nulls, ready for
+    BaseModel.column_matrix. Every column must have one value per student.
+    """
+    if fmt == NPZ:
+        columns = _read_npz(payload)
+    elif fmt == ARROW:
+        columns = _read_arrow(payload)
+    else:
+        raise ColumnarFormatError(f"Unknown columnar format: {fmt}")
+
+    if ID_COLUMN not in columns:
+        raise ColumnarFormatError(f"Missing {ID_COLUMN!r} column")
+    student_ids = columns.pop(ID_COLUMN)
+    for name, column in columns.items():
+        if column.ndim != 1 or len(column) != len(student_ids):
+            raise ColumnarFormatError(
+                f"Column {name!r} has shape {column.shape}, expected ({len(student_ids)},)"
+            )
+        if column.dtype.kind not in "biuf":
+            raise ColumnarFormatError(f"Column {name!r} is not numeric ({column.dtype})")
+    return student_ids, columns
+
+def _read_npz(payload: bytes) -> Dict[str, np.ndarray]:
+    if not payload.startswith(b"PK"):
+        raise ColumnarFormatError("Invalid .npz payload: not a zip archive")
+    try:
+        # No pickles: object arrays in an upload are refused, not executed
+        with np.load(io.BytesIO(payload), allow_pickle=False) as archive:
+            return {name: archive[name] for name in archive.files}
+    except (zipfile.BadZipFile, ValueError, OSError) as e:
+        raise ColumnarFormatError(f"Invalid .npz payload: {str(e)}")
+
+def _read_arrow(payload: bytes) -> Dict[str, np.ndarray]:
+    import pyarrow as pa
+
+    try:
+        table = pa.ipc.open_stream(payload).read_all()
+    except pa.ArrowInvalid as e:
+        raise ColumnarFormatError(f"Invalid Arrow IPC stream: {str(e)}")
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+            # Nulls become NaN; float64 columns without nulls are not copied
+            column = column.cast(pa.float64()) if column.null_count else column
+        columns[name] = column.to_numpy()
+    return columns
+
+def write_columns(student_ids: np.ndarray, result: Dict[str, Any], fmt: str) -> bytes:
+    """
+    Encode a predict_columns result as a columnar response.
+
+    Array fields become columns next to ``student_id`` (error is an empty
+    string for successful rows); scalar fields such as the model version
+    are stored once, as a 0-d array in .npz or as Arrow schema metadata.
+    """
+    columns, metadata = {ID_COLUMN: np.asarray(student_ids)}, {}
+    for name, value in result.items():
+        if isinstance(value, np.ndarray):
+            if value.dtype == object:
+                value = np.array(["" if v is None else v for v in value.tolist()], dtype=str)
+            columns[name] = value
+        else:
+            metadata[name] = str(value)
+
+    buffer = io.BytesIO()
+    if fmt == NPZ:
+        # Compressed: fixed-width string columns (risk level, error) are mostly padding
+        np.savez_compressed(buffer, **columns, **{name: np.array(value) for name, value in metadata.items()})
+    elif fmt == ARROW:
+        import pyarrow as pa
+
+        table = pa.table(columns).replace_schema_metadata(metadata)
+        with pa.ipc.new_stream(buffer, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ColumnarFormatError(f"Unknown columnar format: {fmt}")
+    return buffer.getvalue()
+
+def to_columns(student_ids: np.ndarray, result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A predict_columns result as JSON columns: the arrays are left to the
+    response encoder, which writes numeric ones without per-value objects.
+    """
+    return {ID_COLUMN: student_ids, **result}
+
+def to_rows(student_ids: np.ndarray, result: Dict[str, Any]) -> List[Dict]:
+    """Row-wise BatchPredictionResult dicts (every field, in schema order) for a predict_columns result"""
+    fields = [
+        name for name, value in result.items()
+        if isinstance(value, np.ndarray) and name not in ("success", "error")
+    ]
+    scalars = {name: value for name, value in result.items() if not isinstance(value, np.ndarray)}
+    values = [result[name].tolist() for name in fields]
+
+    rows = []
+    for student_id, success, error, *row in zip(
+        student_ids.tolist(), result["success"].tolist(), result["error"].tolist(), *values
+    ):
+        if success:
+            rows.append({
+                "student_id": str(student_id),
+                "success": True,
+                "prediction": {**dict(zip(fields, row)), **scalars},
+                "error": None
+            })
+        else:
+            rows.append({
+                "student_id": str(student_id),
+                "success": False,
+                "prediction": None,
+                "error": f"Prediction failed: {error}"
+            })
+    return rows
@@ -0,0 +1,198 @@
+import asyncio
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Route handlers declared with @cpu_bound, by qualified name
+OFFLOADED_ROUTES = set()
+
+_cpu_executor: Optional[ThreadPoolExecutor] = None
+_cpu_executor_lock = threading.Lock()
+
+def cpu_executor() -> ThreadPoolExecutor:
+    """Bounded pool running @cpu_bound handlers (CPU_BOUND_WORKERS, default CPU count)"""
+    global _cpu_executor
+    if _cpu_executor is None:
+        with _cpu_executor_lock:
+            if _cpu_executor is None:
+                workers = int(os.getenv("CPU_BOUND_WORKERS", os.cpu_count() or 1))
+                _cpu_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpu-bound")
+    return _cpu_executor
+
+def cpu_bound(fn: Callable) -> Callable:
+    """
+    Mark a synchronous route handler as CPU-bound: every call runs on
+    cpu_executor() instead of the event loop (or Starlette's general-purpose
+    threadpool), so feature building, model scoring and process spawning
+    never stall other requests. The signature is kept for FastAPI's
+    dependency and body resolution.
+    """
+    if inspect.iscoroutinefunction(fn):
+        raise TypeError(f"@cpu_bound needs a plain function, {fn.__qualname__} is async")
+    OFFLOADED_ROUTES.add(f"{fn.__module__}.{fn.__qualname__}")
+
+    @functools.wraps(fn)
+    async def run_off_loop(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(cpu_executor(), functools.partial(fn, *args, **kwargs))
+
+    return run_off_loop
+
+class LoopMonitor:
+    """
+    Event-loop lag instrumentation.
+
+    A heartbeat task sleeps ``interval_ms`` and records how late it wakes
+    up: the time the loop was busy with something else. A watchdog thread
+    notices a heartbeat overdue by more than ``stall_ms`` while the stall is
+    still going on and looks at what the loop is running: the request of
+    the current task (see RequestTracker), which covers body validation and
+    response encoding as well as the handler, and the innermost frame of the
+    loop thread. Settings come from LOOP_MONITOR_INTERVAL_MS (0 disables)
+    and LOOP_STALL_MS.
+    """
+
+    def __init__(self, interval_ms: Optional[float] = None, stall_ms: Optional[float] = None,
+                 history: int = 1000):
+        self.interval_ms = float(interval_ms if interval_ms is not None else os.getenv("LOOP_MONITOR_INTERVAL_MS", 100))
+        self.stall_ms = float(stall_ms if stall_ms is not None else os.getenv("LOOP_STALL_MS", 100))
+        self._lags = deque(maxlen=history)
+        self._stalls = deque(maxlen=50)
+        self._by_route: Dict[str, Dict] = {}
+        self._samples = 0
+        self._max_lag_ms = 0.0
+        # Request scope served by each in-flight task, see RequestTracker
+        self.requests: Dict[asyncio.Task, Dict] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._deadline: Optional[float] = None
+        self._sampled: Optional[Dict] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval_ms > 0
+
+    def start(self):
+        """Start the heartbeat on the running loop and the watchdog thread"""
+        if not self.enabled or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stopped.clear()
+        self._task = self._loop.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self):
+        interval = self.interval_ms / 1000
+        while True:
+            self._deadline = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            self._record((time.perf_counter() - self._deadline) * 1000)
+
+    def _watch(self):
+        while not self._stopped.wait(self.stall_ms / 2000):
+            deadline = self._deadline
+            if deadline is None or (time.perf_counter() - deadline) * 1000 < self.stall_ms:
+                continue
+            if self._sampled is None or self._sampled['deadline'] != deadline:
+                self._sampled = {'deadline': deadline, **self._holder()}
+
+    def _holder(self) -> Dict:
+        """Route of the request the loop is running and the innermost frame of the loop thread"""
+        task = asyncio.current_task(self._loop)
+        frame = sys._current_frames().get(self._loop_thread)
+        return {
+            'route': _route_name(self.requests.get(task)) if task is not None else None,
+            'location': f"{frame.f_code.co_filename}:{frame.f_lineno} {frame.f_code.co_name}" if frame else None
+        }
+
+    def _record(self, lag_ms: float):
+        lag_ms = max(lag_ms, 0.0)
+        self._lags.append(lag_ms)
+        self._samples += 1
+        self._max_lag_ms = max(self._max_lag_ms, lag_ms)
+        if lag_ms < self.stall_ms:
+            return
+
+        sampled = self._sampled
+        holder = sampled if sampled and sampled['deadline'] == self._deadline else {'route': None, 'location': None}
+        stall = {
+            'at': datetime.utcnow().isoformat(),
+            'lag_ms': round(lag_ms, 3),
+            'route': holder['route'],
+            'location': holder['location']
+        }
+        self._stalls.append(stall)
+        totals = self._by_route.setdefault(holder['route'] or 'unknown', {'stalls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        totals['stalls'] += 1
+        totals['total_ms'] = round(totals['total_ms'] + lag_ms, 3)
+        totals['max_ms'] = round(max(totals['max_ms'], lag_ms), 3)
+        logger.warning(
+            f"Event loop blocked for {lag_ms:.0f} ms by {holder['route'] or 'unknown route'} ({holder['location']})"
+        )
+
+    def get_stats(self) -> Dict:
+        lags = np.fromiter(self._lags, dtype=float)
+        return {
+            'enabled': self.enabled,
+            'interval_ms': self.interval_ms,
+            'stall_ms': self.stall_ms,
+            'samples': self._samples,
+            'lag_ms': {
+                'mean': round(float(lags.mean()), 3) if lags.size else None,
+                'p50': round(float(np.percentile(lags, 50)), 3) if lags.size else None,
+                'p99': round(float(np.percentile(lags, 99)), 3) if lags.size else None,
+                'max': round(self._max_lag_ms, 3)
+            },
+            'stalls': sum(totals['stalls'] for totals in self._by_route.values()),
+            'stalls_by_route': self._by_route,
+            'recent_stalls': list(self._stalls),
+            'offloaded_routes': sorted(OFFLOADED_ROUTES)
+        }
+
+def _route_name(scope: Optional[Dict]) -> Optional[str]:
+    if scope is None:
+        return None
+    # The matched route's template once routing has run, the raw path before
+    route = scope.get('route')
+    return f"{scope['method']} {getattr(route, 'path', None) or scope['path']}"
+
+class RequestTracker:
+    """ASGI middleware recording the request each task serves, for LoopMonitor"""
+
+    def __init__(self, app, monitor: LoopMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.monitor.enabled:
+            return await self.app(scope, receive, send)
+        task = asyncio.current_task()
+        self.monitor.requests[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.requests.pop(task, None)
+
+loop_monitor = LoopMonitor()
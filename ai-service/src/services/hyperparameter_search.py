@@ -0,0 +1,281 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from models.sgpa_predictor import SGPAPredictor
+from models.subject_predictor import SubjectPredictor
+from models.tree_engine import compile_ensemble, compile_scaler
+from services.inference_pool import _start_method
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PREDICTORS = {
+    "subject_predictor": SubjectPredictor,
+    "sgpa_predictor": SGPAPredictor,
+}
+
+# Objectives of the Pareto front, all minimized
+OBJECTIVES = ("rmse", "latency_ms", "size_bytes")
+
+# Worker-process state, populated by _init_worker
+_worker_data = None
+
+def _init_worker(model_name: str, X: np.ndarray, y: np.ndarray):
+    global _worker_data
+    _worker_data = (PREDICTORS[model_name](), X, y)
+
+def _evaluate_fold(params: Dict, train_index: np.ndarray, test_index: np.ndarray) -> Dict:
+    """
+    Fit one (params, fold) pair and score it the way it would be served:
+    RMSE/R² on the held-out fold, single-row latency and array size of the
+    compiled engine.
+    """
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.metrics import mean_squared_error, r2_score
+
+    predictor, X, y = _worker_data
+    estimator = predictor._build_model(params)
+    if 'n_jobs' in estimator.get_params():
+        # One core per task; the pool provides the parallelism
+        estimator.set_params(n_jobs=1)
+    scaler = StandardScaler()
+
+    started = time.perf_counter()
+    estimator.fit(scaler.fit_transform(X[train_index]), y[train_index])
+    fit_seconds = time.perf_counter() - started
+
+    engine, scaler_engine = compile_ensemble(estimator), compile_scaler(scaler)
+    X_test, y_test = X[test_index], y[test_index]
+    predictions = engine.predict(scaler_engine.transform(X_test))
+
+    rows = X_test[:min(len(X_test), 50)]
+    timings = []
+    for row in rows:
+        started = time.perf_counter()
+        engine.predict(scaler_engine.transform(row))
+        timings.append(time.perf_counter() - started)
+
+    return {
+        "rmse": float(np.sqrt(mean_squared_error(y_test, predictions))),
+        "r2": float(r2_score(y_test, predictions)),
+        "latency_ms": float(np.median(timings) * 1000),
+        "size_bytes": int(engine.nbytes + scaler_engine.nbytes),
+        "fit_seconds": round(fit_seconds, 3)
+    }
+
+def pareto_front(results: List[Dict], objectives=OBJECTIVES) -> List[Dict]:
+    """Results not dominated on every objective (lower is better) by another result"""
+    front = []
+    for candidate in results:
+        dominated = any(
+            all(other[k] <= candidate[k] for k in objectives) and
+            any(other[k] < candidate[k] for k in objectives)
+            for other in results
+        )
+        if not dominated:
+            front.append(candidate)
+    return sorted(front, key=lambda r: r[objectives[0]])
+
+class SearchCache:
+    """
+    One JSON file per finished (params, fold) evaluation.
+
+    Keys cover the model, parameters, fold layout and a fingerprint of the
+    data, so a repeated or interrupted search reuses every fold it already
+    scored and a change of data starts afresh. Files are written
+    atomically, so a killed search never leaves a partial entry.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.getenv(
+            "TUNING_CACHE_PATH",
+            os.path.join(os.getenv("MODEL_PATH", "./data/models"), "tuning_cache")
+        )
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(**parts) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, result: Dict):
+        staging = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(staging, "w") as f:
+            json.dump(result, f)
+        os.replace(staging, self._path(key))
+
+class HyperparameterSearch:
+    """
+    K-fold cross-validated search over a predictor's PARAM_SPACE.
+
+    The full grid is evaluated unless ``n_iter`` asks for a random sample of
+    it. Every (params, fold) pair is a separate task on a process pool and
+    its score is cached on disk as soon as it finishes. The report ranks the
+    candidates by mean CV RMSE and gives the Pareto front of accuracy vs
+    single-row inference latency vs compiled model size.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        space: Optional[Dict] = None,
+        n_iter: Optional[int] = None,
+        folds: int = 5,
+        workers: Optional[int] = None,
+        cache: Optional[SearchCache] = None,
+        seed: int = 42
+    ):
+        if model_name not in PREDICTORS:
+            raise KeyError(f"Model '{model_name}' not found")
+        self.model_name = model_name
+        self.predictor_class = PREDICTORS[model_name]
+        self.space = space or self.predictor_class.PARAM_SPACE
+        self.n_iter = n_iter
+        self.folds = folds
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache or SearchCache()
+        self.seed = seed
+
+    def candidates(self) -> List[Dict]:
+        from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+        grid = ParameterGrid(self.space)
+        if self.n_iter is None or self.n_iter >= len(grid):
+            return list(grid)
+        return list(ParameterSampler(self.space, self.n_iter, random_state=self.seed))
+
+    def run(self, training_data) -> Dict:
+        from sklearn.model_selection import KFold
+
+        predictor = self.predictor_class()
+        X = np.ascontiguousarray(training_data[predictor.feature_names], dtype=np.float64)
+        y = np.ascontiguousarray(training_data[predictor.target_name], dtype=np.float64)
+        fingerprint = hashlib.sha256(X.tobytes() + y.tobytes()).hexdigest()
+        splits = list(KFold(self.folds, shuffle=True, random_state=self.seed).split(X))
+
+        # Part of the cache key: REGRESSOR_BACKEND changes the estimator class
+        estimator_type = type(predictor._build_model()).__name__
+        candidates = self.candidates()
+        scores: Dict[int, Dict[int, Dict]] = {i: {} for i in range(len(candidates))}
+        pending = []
+        for i, params in enumerate(candidates):
+            full_params = {**predictor.params, **params}
+            for fold in range(self.folds):
+                key = SearchCache.key(
+                    model=self.model_name, estimator=estimator_type, params=full_params, fold=fold,
+                    folds=self.folds, seed=self.seed, data=fingerprint
+                )
+                cached = self.cache.get(key)
+                if cached is not None:
+                    scores[i][fold] = cached
+                else:
+                    pending.append((i, fold, key))
+
+        n_cached = len(candidates) * self.folds - len(pending)
+        logger.info(
+            f"Searching {len(candidates)} {self.model_name} candidates x {self.folds} folds: "
+            f"{n_cached} cached, {len(pending)} to run on {self.workers} workers"
+        )
+
+        started = time.perf_counter()
+        if pending:
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(_start_method()),
+                initializer=_init_worker,
+                initargs=(self.model_name, X, y)
+            ) as executor:
+                futures = {
+                    executor.submit(_evaluate_fold, candidates[i], *splits[fold]): (i, fold, key)
+                    for i, fold, key in pending
+                }
+                for future in as_completed(futures):
+                    i, fold, key = futures[future]
+                    result = future.result()
+                    self.cache.put(key, result)
+                    scores[i][fold] = result
+
+        results = [self._summarize(params, scores[i]) for i, params in enumerate(candidates)]
+        results.sort(key=lambda r: r["rmse"])
+        return {
+            "model_name": self.model_name,
+            "folds": self.folds,
+            "n_candidates": len(candidates),
+            "evaluations_run": len(pending),
+            "evaluations_cached": n_cached,
+            "search_seconds": round(time.perf_counter() - started, 3),
+            "best": results[0],
+            "pareto_front": pareto_front(results),
+            "results": results
+        }
+
+    def _summarize(self, params: Dict, fold_scores: Dict[int, Dict]) -> Dict:
+        """Mean (and spread of the RMSE) over the folds of one candidate"""
+        folds = [fold_scores[fold] for fold in sorted(fold_scores)]
+        mean = lambda k: float(np.mean([s[k] for s in folds]))
+        return {
+            "params": params,
+            "rmse": mean("rmse"),
+            "rmse_std": float(np.std([s["rmse"] for s in folds])),
+            "r2": mean("r2"),
+            "latency_ms": mean("latency_ms"),
+            "size_bytes": int(mean("size_bytes")),
+            "fit_seconds": mean("fit_seconds")
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter search")
+    parser.add_argument("model_name", choices=sorted(PREDICTORS))
+    parser.add_argument("--data", help="Training CSV (default: demo data)")
+    parser.add_argument("--n-samples", type=int, default=5000, help="Demo rows when --data is not given")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--n-iter", type=int, help="Random candidates to sample instead of the full grid")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--cache-dir")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    if args.data:
+        import pandas as pd
+        training_data = pd.read_csv(args.data)
+    else:
+        from services.prediction_service import PredictionService
+        service = PredictionService(load_models=False)
+        # Seeded so repeated runs hit the cache
+        if args.model_name == "subject_predictor":
+            training_data = service._demo_subject_data(args.n_samples, seed=42)
+        else:
+            training_data = service._demo_sgpa_data(args.n_samples, seed=42)
+
+    search = HyperparameterSearch(
+        args.model_name,
+        n_iter=args.n_iter,
+        folds=args.folds,
+        workers=args.workers,
+        cache=SearchCache(args.cache_dir) if args.cache_dir else None
+    )
+    report = search.run(training_data)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps({k: report[k] for k in ("best", "pareto_front")}, indent=2))
+
+if __name__ == "__main__":
+    main()
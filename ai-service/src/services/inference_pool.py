@@ -0,0 +1,168 @@
+import asyncio
+import atexit
+import functools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+THREAD_MODE = "thread"
+PROCESS_MODE = "process"
+
+# Worker-process state, populated by _init_worker
+_worker_service = None
+
+def _init_worker(engine_dir: str):
+    """
+    Process-pool initializer: map the shared engine arrays once per worker
+    and warm them up, so no worker takes its first request cold.
+    """
+    global _worker_service
+    from services.prediction_service import PredictionService
+
+    service = PredictionService(load_models=False)
+    loaded = service.load_engines(engine_dir, mmap_mode='r')
+    service.warm_up()
+    logger.info(f"Inference worker {os.getpid()} mapped and warmed engines: {loaded}")
+    _worker_service = service
+
+def _call_worker(method_name: str, *args):
+    """Run a PredictionService method inside a worker process"""
+    return getattr(_worker_service, method_name)(*args)
+
+def _start_method() -> str:
+    """
+    Never fork the server itself: it runs the event loop, executor, loop
+    monitor and job watcher threads, and a forked worker would inherit
+    whatever locks those held. The forkserver starts workers from a clean
+    single-threaded process (also on every reload); spawn is the fallback.
+    The forkserver imports the main module once, which only defines the app
+    (main.py starts the server under ``__name__ == "__main__"``); workers
+    add only _init_worker's PredictionService and get the models as
+    exported engine arrays, never from a router-level load.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return "forkserver"
+    return "spawn"
+
+def _default_shared_dir() -> str:
+    """Prefer tmpfs so mapped engine pages live in shared memory"""
+    root = os.getenv("INFERENCE_SHARED_DIR")
+    if root:
+        return root
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+class InferencePool:
+    """
+    Execution backend for PredictionService calls.
+
+    In ``thread`` mode calls run on a thread pool against the in-process
+    service. In ``process`` mode the compiled model arrays are exported once
+    to a shared directory and every worker process memory-maps them
+    read-only, so inference scales across cores without one model copy per
+    worker. Mode and size come from INFERENCE_BACKEND / INFERENCE_WORKERS.
+    """
+
+    def __init__(self, service, mode: Optional[str] = None, workers: Optional[int] = None):
+        self.service = service
+        self.mode = (mode or os.getenv("INFERENCE_BACKEND", THREAD_MODE)).lower()
+        if self.mode not in (THREAD_MODE, PROCESS_MODE):
+            raise ValueError(f"Invalid inference backend: {self.mode}")
+        default_workers = 4 if self.mode == THREAD_MODE else (os.cpu_count() or 1)
+        self.workers = workers or int(os.getenv("INFERENCE_WORKERS", default_workers))
+        self.engine_dir: Optional[str] = None
+        # Model versions in the current engine export, see reload
+        self.versions: Dict[str, str] = {}
+        self._reload_lock = threading.Lock()
+        self.executor: Executor = self._create_executor()
+        if self.mode == PROCESS_MODE:
+            atexit.register(self.shutdown)
+
+    def _create_executor(self) -> Executor:
+        if self.mode == THREAD_MODE:
+            return ThreadPoolExecutor(max_workers=self.workers)
+
+        self.engine_dir = tempfile.mkdtemp(prefix="mentortrack-engines-", dir=_default_shared_dir())
+        self.versions = self._served_versions()
+        exported = self.service.export_engines(self.engine_dir)
+        logger.info(f"Exported {len(exported)} model engines to {self.engine_dir} for {self.workers} workers")
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(_start_method()),
+            initializer=_init_worker,
+            initargs=(self.engine_dir,)
+        )
+
+    def target(self, method_name: str) -> Callable:
+        """Callable that runs a service method on this backend's executor"""
+        if self.mode == THREAD_MODE:
+            return getattr(self.service, method_name)
+        return functools.partial(_call_worker, method_name)
+
+    async def run(self, method_name: str, *args) -> Any:
+        """Run a service method off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.target(method_name), *args)
+
+    def warm_up(self) -> Dict:
+        """
+        Start the worker processes ahead of the first request. Each worker
+        warms its own engines in _init_worker before it takes any task, so
+        these no-op calls only have to get the processes started.
+        """
+        if self.mode == THREAD_MODE:
+            return {"workers": 0}
+        futures = [self.executor.submit(os.getpid) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+        return {"workers": self.workers}
+    
+    def _served_versions(self) -> Dict[str, str]:
+        return {
+            predictor.model_name: predictor.bundle.version
+            for predictor in self.service.predictors
+            if predictor.bundle is not None
+        }
+
+    def reload(self):
+        """
+        Re-export the current models and replace the workers.
+
+        The job watcher's notify and the registry poll can both report the
+        same publish; reloads are serialized and one that finds the export
+        already at the served versions does nothing.
+        """
+        if self.mode == THREAD_MODE:
+            return
+        with self._reload_lock:
+            if self._served_versions() == self.versions:
+                logger.debug(f"Inference pool already serves {self.versions}, reload skipped")
+                return
+            old_executor, old_dir = self.executor, self.engine_dir
+            self.executor = self._create_executor()
+            old_executor.shutdown(wait=False)
+            # Workers keep their mappings alive after the files are unlinked
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+    def shutdown(self):
+        """Stop the workers and remove the exported engine arrays"""
+        with self._reload_lock:
+            self.executor.shutdown(wait=False)
+            if self.engine_dir:
+                shutil.rmtree(self.engine_dir, ignore_errors=True)
+                self.engine_dir = None
+
+    def get_info(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "engine_dir": self.engine_dir,
+            "versions": self.versions
+        }
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+from concurrent.futures import Executor
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching scheduler for single-row predictions.
+
+    Requests arriving within ``max_wait_ms`` of the first queued request (or
+    until ``max_batch_size`` rows are queued) are handed to ``batch_fn`` as
+    one list and scored as a single matrix. ``batch_fn`` runs in ``executor``
+    (or is awaited directly when it is a coroutine function) and must return
+    one entry per request: the result, or the Exception raised for that
+    request.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        executor: Optional[Executor] = None,
+        max_wait_ms: Optional[float] = None,
+        max_batch_size: Optional[int] = None,
+        name: str = "batcher"
+    ):
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_wait_ms = max_wait_ms if max_wait_ms is not None else float(os.getenv("BATCH_MAX_WAIT_MS", 2))
+        self.max_batch_size = max_batch_size or int(os.getenv("BATCH_MAX_SIZE", 256))
+        self.name = name
+
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # Metrics
+        self._batches = 0
+        self._items = 0
+        self._max_batch_seen = 0
+        self._size_histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self._size_histogram["+Inf"] = 0
+        self._total_batch_time = 0.0
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one request and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000.0, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Hand the queued requests to the executor as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        asyncio.get_running_loop().create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[tuple]):
+        items = [item for item, _ in batch]
+        started = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(self.batch_fn):
+                results = await self.batch_fn(items)
+            else:
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(self.executor, self.batch_fn, items)
+        except Exception as e:
+            logger.error(f"{self.name} batch of {len(items)} failed: {str(e)}")
+            results = [e] * len(items)
+        else:
+            results = list(results)
+            if len(results) != len(items):
+                # zip would leave the unmatched callers waiting forever
+                error = RuntimeError(
+                    f"{self.name} batch function returned {len(results)} results for {len(items)} items"
+                )
+                logger.error(str(error))
+                results = [error] * len(items)
+        self._record(len(items), time.perf_counter() - started)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():  # caller went away
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _record(self, batch_size: int, elapsed: float):
+        self._batches += 1
+        self._items += batch_size
+        self._max_batch_seen = max(self._max_batch_seen, batch_size)
+        self._total_batch_time += elapsed
+        for bucket in BATCH_SIZE_BUCKETS:
+            if batch_size <= bucket:
+                self._size_histogram[bucket] += 1
+                break
+        else:
+            self._size_histogram["+Inf"] += 1
+
+    def get_stats(self) -> Dict:
+        """Batching settings and achieved batch-size metrics"""
+        return {
+            "name": self.name,
+            "max_wait_ms": self.max_wait_ms,
+            "max_batch_size": self.max_batch_size,
+            "queued": len(self._pending),
+            "batches": self._batches,
+            "items": self._items,
+            "average_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+            "max_batch_size_seen": self._max_batch_seen,
+            "average_batch_time_ms": round(self._total_batch_time / self._batches * 1000, 3) if self._batches else 0.0,
+            "batch_size_histogram": {str(k): v for k, v in self._size_histogram.items()}
+        }
@@ -0,0 +1,118 @@
+import asyncio
+import functools
+import os
+import threading
+from typing import Dict, Optional
+
+from models.enhanced_models import EnhancedMLModels, ml_models
+from models.model_registry import model_registry
+from services.inference_pool import InferencePool
+from services.micro_batcher import MicroBatcher
+from services.prediction_service import PredictionService
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class ModelContainer:
+    """
+    Process-wide owner of the served models.
+
+    Holds the one PredictionService, its InferencePool and micro-batchers,
+    and the enhanced models, so every router shares a single copy of each.
+    Components are created on first access (normally by the startup steps,
+    not at import time) and subscribe to the model registry so retrains,
+    pins and rollbacks swap the active version into serving.
+    Routes receive them through the ``get_*`` FastAPI dependencies below.
+    """
+
+    def __init__(self, enhanced_models: Optional[EnhancedMLModels] = None):
+        self.enhanced_models = enhanced_models or ml_models
+        self._prediction_service: Optional[PredictionService] = None
+        self._inference_pool: Optional[InferencePool] = None
+        self._batchers: Dict[str, MicroBatcher] = {}
+        self._lock = threading.RLock()
+
+        # Swap in the active registry version after retrains, pins and rollbacks
+        model_registry.subscribe(self.enhanced_models.MODEL_NAME, self.enhanced_models.load_models)
+
+    @property
+    def prediction_service(self) -> PredictionService:
+        if self._prediction_service is None:
+            with self._lock:
+                if self._prediction_service is None:
+                    service = PredictionService()
+                    for model_name in ("subject_predictor", "sgpa_predictor"):
+                        model_registry.subscribe(model_name, functools.partial(self._reload_predictor, model_name))
+                    self._prediction_service = service
+        return self._prediction_service
+
+    @property
+    def inference_pool(self) -> InferencePool:
+        """Thread or process pool for CPU-intensive tasks (INFERENCE_BACKEND)"""
+        if self._inference_pool is None:
+            with self._lock:
+                if self._inference_pool is None:
+                    self._inference_pool = InferencePool(self.prediction_service)
+        return self._inference_pool
+
+    def batcher(self, name: str) -> MicroBatcher:
+        """Micro-batcher coalescing concurrent single-student ``name`` requests"""
+        if name not in self._batchers:
+            with self._lock:
+                if name not in self._batchers:
+                    self._batchers[name] = MicroBatcher(
+                        functools.partial(self.inference_pool.run, f"predict_{name}_batch"),
+                        name=name
+                    )
+        return self._batchers[name]
+
+    def load_prediction_models(self) -> Dict:
+        """
+        Load the predictors; returns their load stats. The inference pool
+        and batchers are left to the first request or warm_up_inference_pool,
+        so a prefork master never holds executor state its workers inherit.
+        """
+        service = self.prediction_service
+        return {predictor.model_name: predictor.load_stats for predictor in service.predictors}
+
+    def _reload_predictor(self, model_name: str):
+        """Swap the active registry version of a predictor into serving"""
+        self._prediction_service.reload_model(model_name)
+        if self._inference_pool is not None:
+            self._inference_pool.reload()
+
+container = ModelContainer()
+
+async def watch_registry(interval: Optional[float] = None):
+    """
+    Swap in versions activated by other processes every ``interval``
+    seconds (REGISTRY_POLL_SECONDS, 0 disables), so every server worker
+    follows a retrain, pin or rollback handled by one of them.
+    """
+    interval = float(interval if interval is not None else os.getenv("REGISTRY_POLL_SECONDS", 5))
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            changed = await asyncio.to_thread(model_registry.poll)
+        except Exception as e:
+            logger.error(f"Registry poll failed: {str(e)}")
+            continue
+        if changed:
+            logger.info(f"Swapped in new active versions of {changed}")
+
+def get_prediction_service() -> PredictionService:
+    return container.prediction_service
+
+def get_inference_pool() -> InferencePool:
+    return container.inference_pool
+
+def get_subject_batcher() -> MicroBatcher:
+    return container.batcher("subject")
+
+def get_semester_batcher() -> MicroBatcher:
+    return container.batcher("semester")
+
+def get_enhanced_models() -> EnhancedMLModels:
+    return container.enhanced_models
@@ -1,18 +1,41 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import numpy as np
 from models.subject_predictor import SubjectPredictor
 from models.sgpa_predictor import SGPAPredictor
+from models.data_source import open_training_data
+from services import columnar
 from utils.logger import get_logger
+from utils.prediction_cache import prediction_cache
 
 logger = get_logger(__name__)
 
 class PredictionService:
     """Service class for handling ML predictions"""
     
-    def __init__(self):
+    def __init__(self, load_models: bool = True):
         self.subject_predictor = SubjectPredictor()
         self.sgpa_predictor = SGPAPredictor()
-        self._load_models()
+        if load_models:
+            self._load_models()
+    
+    @property
+    def predictors(self) -> List:
+        return [self.subject_predictor, self.sgpa_predictor]
+    
+    def export_engines(self, directory: str) -> List[str]:
+        """Export the compiled arrays of every trained model"""
+        return [
+            predictor.export_engines(directory)
+            for predictor in self.predictors
+            if predictor.engine is not None
+        ]
+    
+    def load_engines(self, directory: str, mmap_mode: str = 'r') -> Dict[str, bool]:
+        """Serve from exported engine arrays instead of loading estimators"""
+        return {
+            predictor.model_name: predictor.load_engines(directory, mmap_mode)
+            for predictor in self.predictors
+        }
     
     def _load_models(self):
         """Load pre-trained models"""
@@ -23,11 +46,13 @@ class PredictionService:
             
             if not subject_loaded:
                 logger.warning("Subject predictor model not found, using default model")
-                # Initialize with default parameters for demo
-                self._initialize_demo_models()
             
             if not sgpa_loaded:
                 logger.warning("SGPA predictor model not found, using default model")
+            
+            if not (subject_loaded and sgpa_loaded):
+                # Initialize with default parameters for demo
+                self._initialize_demo_models()
                 
             logger.info("Prediction models loaded successfully")
             
@@ -36,27 +61,144 @@ class PredictionService:
             self._initialize_demo_models()
     
     def _initialize_demo_models(self):
-        """Initialize demo models for development"""
+        """
+        Initialize demo models for development. They are published to the
+        registry so later cold starts map them instead of retraining.
+        """
         try:
-            # Create dummy training data for demo
-            import pandas as pd
-            
-            # Demo data for subject predictor
-            demo_data = pd.DataFrame({
-                'attendance_percentage': np.random.uniform(60, 95, 100),
-                'best_of_two_internals': np.random.uniform(15, 25, 100),
-                'assignment_marks': np.random.uniform(12, 20, 100),
-                'behavior_score': np.random.uniform(6, 10, 100),
-                'final_marks': np.random.uniform(50, 90, 100)
-            })
+            # Train demo models
+            if not self.subject_predictor.is_trained:
+                metrics = self.subject_predictor.train(self._demo_subject_data())
+                self.subject_predictor.publish({'demo': True, 'test_r2': metrics['test_r2']})
+                logger.info("Demo subject predictor model initialized")
             
-            # Train demo model
-            self.subject_predictor.train(demo_data)
-            logger.info("Demo subject predictor model initialized")
+            if not self.sgpa_predictor.is_trained:
+                metrics = self.sgpa_predictor.train(self._demo_sgpa_data())
+                self.sgpa_predictor.publish({'demo': True, 'test_r2': metrics['test_r2']})
+                logger.info("Demo SGPA predictor model initialized")
             
         except Exception as e:
             logger.error(f"Failed to initialize demo models: {str(e)}")
     
+    def _demo_subject_data(self, n_samples: int = 100, seed: Optional[int] = None):
+        """Create dummy training data for the subject predictor"""
+        import pandas as pd
+        
+        rng = np.random.default_rng(seed)
+        return pd.DataFrame({
+            'attendance_percentage': rng.uniform(60, 95, n_samples),
+            'best_of_two_internals': rng.uniform(15, 25, n_samples),
+            'assignment_marks': rng.uniform(12, 20, n_samples),
+            'behavior_score': rng.uniform(6, 10, n_samples),
+            'final_marks': rng.uniform(50, 90, n_samples)
+        })
+    
+    def _demo_sgpa_data(self, n_samples: int = 1000, seed: int = 42):
+        """Synthetic semester data labelled with the demo SGPA rules"""
+        import pandas as pd
+        
+        rng = np.random.default_rng(seed)
+        mean_prediction = rng.uniform(35, 95, n_samples)
+        backlog_count = rng.choice([0, 0, 0, 1, 1, 2, 3, 4], n_samples)
+        previous_sgpa = rng.uniform(4, 10, n_samples)
+        attendance_avg = rng.uniform(55, 100, n_samples)
+        
+        # Convert percentage to SGPA scale
+        sgpa = (mean_prediction / 100) * 10
+        
+        # Apply penalties and bonuses
+        sgpa -= backlog_count * 0.5
+        sgpa -= np.where(attendance_avg < 75, 0.5, 0.0)
+        sgpa += np.where(attendance_avg > 90, 0.2, 0.0)
+        
+        # Consider previous performance
+        sgpa = (sgpa * 0.7) + (previous_sgpa * 0.3)
+        
+        return pd.DataFrame({
+            'mean_subject_prediction': mean_prediction,
+            'active_backlog_count': backlog_count,
+            'previous_sgpa': previous_sgpa,
+            'attendance_average': attendance_avg,
+            'sgpa': np.clip(sgpa + rng.normal(0, 0.2, n_samples), 0.0, 10.0)
+        })
+    
+    def warm_up(self) -> Dict[str, Dict]:
+        """Warm up every loaded predictor"""
+        return {
+            predictor.model_name: predictor.warm_up()
+            for predictor in self.predictors
+        }
+    
+    def get_predictor(self, model_name: str):
+        """Predictor by model name"""
+        for predictor in self.predictors:
+            if predictor.model_name == model_name:
+                return predictor
+        raise KeyError(f"Model '{model_name}' not found")
+    
+    def train_model(self, model_name: str, config: Dict = None, progress=None) -> Dict:
+        """
+        Train and publish one predictor.
+        
+        ``config`` may name a CSV ``data_path``; otherwise ``n_samples`` demo
+        rows are generated. The model is published as a new registry
+        version. ``progress(fraction, stage)`` is called as training
+        advances.
+        
+        With ``incremental`` the rows are treated as a new slice: appended to
+        the persisted training set and used to grow ``n_estimators`` more
+        trees on the active version (``compare_full_retrain`` also times a
+        from-scratch fit for the savings report). ``params`` overrides the
+        predictor's hyperparameters, e.g. with the best candidate of
+        services.hyperparameter_search. With ``streaming`` the ``data_path``
+        CSV/Parquet file is read in ``chunk_size``-row chunks and never held
+        in memory whole (see BaseModel.train_streaming).
+        """
+        config = config or {}
+        progress = progress or (lambda fraction, stage: None)
+        predictor = self.get_predictor(model_name)
+        
+        if config.get('params'):
+            predictor.params.update(config['params'])
+        
+        if config.get('data_path') and config.get('streaming'):
+            progress(0.1, f"streaming {model_name} training data")
+            source = open_training_data(config['data_path'], config.get('chunk_size'))
+            metrics = predictor.train_streaming(source, float(config.get('test_fraction', 0.2)))
+            progress(0.9, "publishing model")
+            metrics['version'] = predictor.publish(metrics)['version']
+            return metrics
+        
+        progress(0.05, "loading training data")
+        if config.get('data_path'):
+            import pandas as pd
+            training_data = pd.read_csv(config['data_path'])
+        elif predictor is self.subject_predictor:
+            training_data = self._demo_subject_data(int(config.get('n_samples', 1000)))
+        else:
+            training_data = self._demo_sgpa_data(int(config.get('n_samples', 1000)), int(config.get('seed', 42)))
+        
+        progress(0.2, f"training {model_name}")
+        if config.get('incremental'):
+            metrics = predictor.train_incremental(
+                training_data,
+                n_estimators=config.get('n_estimators'),
+                compare_full=bool(config.get('compare_full_retrain', False))
+            )
+        else:
+            metrics = predictor.train_full(training_data)
+        
+        progress(0.9, "publishing model")
+        metrics['version'] = predictor.publish(metrics)['version']
+        return metrics
+    
+    def reload_model(self, model_name: str):
+        """Swap in the active registry version of one predictor"""
+        predictor = self.get_predictor(model_name)
+        if not predictor.load_model():
+            raise FileNotFoundError(f"No saved model found for '{model_name}'")
+        logger.info(f"Reloaded {model_name} version {predictor.version}")
+    
     def predict_subject_performance(self, request_data: Dict) -> Dict:
         """Predict individual subject performance"""
         try:
@@ -65,8 +207,12 @@ class PredictionService:
             
             logger.info(f"Predicting subject performance for student: {student_id}")
             
-            # Make prediction
-            prediction = self.subject_predictor.predict(features)
+            cache_key = self._cache_key('subject', self.subject_predictor, features)
+            prediction = prediction_cache.get(cache_key) if cache_key else None
+            if prediction is None:
+                prediction = self.subject_predictor.predict(features)
+                if cache_key:
+                    prediction_cache.put(cache_key, prediction)
             
             logger.info(f"Subject prediction completed for student: {student_id}")
             return prediction
@@ -75,6 +221,14 @@ class PredictionService:
             logger.error(f"Subject prediction failed: {str(e)}")
             raise Exception(f"Subject prediction failed: {str(e)}")
     
+    def _cache_key(self, namespace: str, predictor, features: Dict):
+        """Cache key for a request's features, or None if they cannot be keyed"""
+        try:
+            values = [features.get(name) for name in predictor.feature_names]
+            return prediction_cache.make_key(namespace, predictor.model_token, values)
+        except (AttributeError, TypeError, ValueError):
+            return None
+    
     def predict_semester_sgpa(self, request_data: Dict) -> Dict:
         """Predict semester SGPA"""
         try:
@@ -84,16 +238,12 @@ class PredictionService:
             
             logger.info(f"Predicting SGPA for student: {student_id}, semester: {semester}")
             
-            # For demo purposes, create a simple SGPA prediction
-            # In production, this would use the trained SGPA predictor
-            predicted_sgpa = self._demo_sgpa_prediction(features)
-            
-            result = {
-                'predicted_sgpa': predicted_sgpa,
-                'confidence': 0.85,
-                'risk_level': self._determine_sgpa_risk(predicted_sgpa),
-                'model_version': '1.0'
-            }
+            cache_key = self._cache_key('semester', self.sgpa_predictor, features)
+            result = prediction_cache.get(cache_key) if cache_key else None
+            if result is None:
+                result = self.sgpa_predictor.predict(features)
+                if cache_key:
+                    prediction_cache.put(cache_key, result)
             
             logger.info(f"SGPA prediction completed for student: {student_id}")
             return result
@@ -102,70 +252,130 @@ class PredictionService:
             logger.error(f"SGPA prediction failed: {str(e)}")
             raise Exception(f"SGPA prediction failed: {str(e)}")
     
-    def _demo_sgpa_prediction(self, features: Dict) -> float:
-        """Demo SGPA prediction logic"""
-        # Simple rule-based prediction for demo
-        mean_prediction = features.get('mean_subject_prediction', 70)
-        backlog_count = features.get('active_backlog_count', 0)
-        attendance_avg = features.get('attendance_average', 80)
-        previous_sgpa = features.get('previous_sgpa', 7.0)
+    def predict_subject_batch(self, requests: List[Dict]) -> List[Any]:
+        """
+        Predict subject performance for many requests in one matrix pass.
         
-        # Convert percentage to SGPA scale
-        base_sgpa = (mean_prediction / 100) * 10
+        Returns one entry per request: the prediction, or the Exception
+        raised for that request.
+        """
+        logger.info(f"Predicting subject performance for {len(requests)} requests")
         
-        # Apply penalties and bonuses
-        if backlog_count > 0:
-            base_sgpa -= (backlog_count * 0.5)
+        outcomes = [None] * len(requests)
+        features_list, indices, cache_keys = [], [], []
+        for i, request_data in enumerate(requests):
+            if 'features' not in request_data:
+                outcomes[i] = Exception("Subject prediction failed: missing features")
+                continue
+            cache_key = self._cache_key('subject', self.subject_predictor, request_data['features'])
+            cached = prediction_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                outcomes[i] = cached
+            else:
+                features_list.append(request_data['features'])
+                indices.append(i)
+                cache_keys.append(cache_key)
         
-        if attendance_avg < 75:
-            base_sgpa -= 0.5
-        elif attendance_avg > 90:
-            base_sgpa += 0.2
+        results = self.subject_predictor.batch_predict(features_list) if features_list else []
+        for i, cache_key, result in zip(indices, cache_keys, results):
+            if result['success']:
+                outcomes[i] = result['prediction']
+                if cache_key:
+                    prediction_cache.put(cache_key, result['prediction'])
+            else:
+                outcomes[i] = Exception(f"Subject prediction failed: {result['error']}")
         
-        # Consider previous performance
-        if previous_sgpa:
-            base_sgpa = (base_sgpa * 0.7) + (previous_sgpa * 0.3)
-        
-        # Clamp to valid range
-        return max(0.0, min(10.0, round(base_sgpa, 2)))
-    
-    def _determine_sgpa_risk(self, predicted_sgpa: float) -> str:
-        """Determine risk level based on predicted SGPA"""
-        if predicted_sgpa >= 7.5:
-            return 'SAFE'
-        elif predicted_sgpa >= 6.0:
-            return 'NEEDS_ATTENTION'
-        else:
-            return 'AT_RISK'
+        return outcomes
+    
+    def predict_semester_batch(self, requests: List[Dict]) -> List[Any]:
+        """
+        Predict semester SGPA for many requests in one matrix pass.
+        
+        Returns one entry per request: the prediction, or the Exception
+        raised for that request.
+        """
+        logger.info(f"Predicting SGPA for {len(requests)} requests")
+        
+        outcomes = [None] * len(requests)
+        features_list, indices, cache_keys = [], [], []
+        for i, request_data in enumerate(requests):
+            if 'features' not in request_data:
+                outcomes[i] = Exception("SGPA prediction failed: missing features")
+                continue
+            cache_key = self._cache_key('semester', self.sgpa_predictor, request_data['features'])
+            cached = prediction_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                outcomes[i] = cached
+            else:
+                features_list.append(request_data['features'])
+                indices.append(i)
+                cache_keys.append(cache_key)
+        
+        results = self.sgpa_predictor.batch_predict(features_list) if features_list else []
+        for i, cache_key, result in zip(indices, cache_keys, results):
+            if result['success']:
+                outcomes[i] = result['prediction']
+                if cache_key:
+                    prediction_cache.put(cache_key, result['prediction'])
+            else:
+                outcomes[i] = Exception(f"SGPA prediction failed: {result['error']}")
+        
+        return outcomes
     
     def batch_predict(self, students: List[Dict], prediction_type: str) -> List[Dict]:
         """Perform batch predictions"""
-        results = []
+        if prediction_type == 'SUBJECT':
+            outcomes = self.predict_subject_batch(students)
+        elif prediction_type == 'SEMESTER':
+            outcomes = self.predict_semester_batch(students)
+        else:
+            outcomes = [ValueError(f"Invalid prediction type: {prediction_type}")] * len(students)
         
-        for student_data in students:
-            try:
-                if prediction_type == 'SUBJECT':
-                    prediction = self.predict_subject_performance(student_data)
-                elif prediction_type == 'SEMESTER':
-                    prediction = self.predict_semester_sgpa(student_data)
-                else:
-                    raise ValueError(f"Invalid prediction type: {prediction_type}")
-                
+        results = []
+        for student_data, outcome in zip(students, outcomes):
+            if isinstance(outcome, Exception):
                 results.append({
                     'student_id': student_data['student_id'],
-                    'success': True,
-                    'prediction': prediction
+                    'success': False,
+                    'prediction': None,
+                    'error': str(outcome)
                 })
-                
-            except Exception as e:
+            else:
                 results.append({
                     'student_id': student_data['student_id'],
-                    'success': False,
-                    'error': str(e)
+                    'success': True,
+                    'prediction': outcome,
+                    'error': None
                 })
         
         return results
     
+    def batch_predict_columnar(self, payload: bytes, input_format: str, prediction_type: str,
+                               output_format: str = columnar.JSON) -> Any:
+        """
+        Batch predictions for a columnar payload (Arrow IPC stream or .npz).
+        
+        The named columns go straight into one matrix pass of the predictor,
+        without per-student request objects or the prediction cache. Returns
+        BatchPredictionResult rows for JSON output, the arrays themselves for
+        JSON columns, else the encoded columns.
+        """
+        student_ids, columns = columnar.read_columns(payload, input_format)
+        logger.info(f"Columnar {prediction_type} prediction for {len(student_ids)} students")
+        
+        if prediction_type == 'SUBJECT':
+            result = self.subject_predictor.predict_columns(columns, len(student_ids))
+        elif prediction_type == 'SEMESTER':
+            result = self.sgpa_predictor.predict_columns(columns, len(student_ids))
+        else:
+            raise ValueError(f"Invalid prediction type: {prediction_type}")
+        
+        if output_format == columnar.JSON:
+            return columnar.to_rows(student_ids, result)
+        if output_format == columnar.JSON_COLUMNS:
+            return columnar.to_columns(student_ids, result)
+        return columnar.write_columns(student_ids, result, output_format)
+    
     def explain_prediction(self, prediction_id: str) -> Dict:
         """Generate explanation for a prediction using SHAP"""
         try:
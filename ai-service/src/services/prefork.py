@@ -0,0 +1,148 @@
+import gc
+import os
+import signal
+import time
+from typing import Callable, Dict, Optional
+
+import psutil
+import uvicorn
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Set in the environment of prefork workers to their master's pid
+MASTER_PID_ENV = "PREFORK_MASTER_PID"
+
+# Workers dying sooner than this after their fork are restarted with a pause
+MIN_WORKER_SECONDS = 1.0
+
+def server_workers(workers: Optional[int] = None) -> int:
+    """Serving processes (SERVER_WORKERS); more than one selects the prefork server"""
+    return max(1, int(workers or os.getenv("SERVER_WORKERS", 1)))
+
+def master_pid() -> Optional[int]:
+    """Pid of the prefork master this process was forked from, if any"""
+    pid = os.getenv(MASTER_PID_ENV)
+    return int(pid) if pid else None
+
+class PreforkServer:
+    """
+    Load once, fork many.
+
+    The master binds the listening socket, runs ``preload`` (the model loads
+    and warm-ups) and then freezes the garbage collector's view of every
+    object allocated so far, so collections in the workers never write to
+    those pages and they stay shared copy-on-write. It then forks ``workers``
+    uvicorn servers on the inherited socket and restarts any that die. Each
+    worker's lifespan still runs the startup steps, which find the models
+    already loaded and only start per-worker state (inference pool).
+    """
+
+    def __init__(self, app, host: str, port: int, workers: int,
+                 preload: Callable[[], None], log_level: str = "info"):
+        self.config = uvicorn.Config(app, host=host, port=port, log_level=log_level)
+        self.workers = workers
+        self.preload = preload
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+
+    def run(self):
+        socket = self.config.bind_socket()
+        started = time.perf_counter()
+        self.preload()
+        gc.collect()
+        gc.freeze()
+        logger.info(
+            f"Prefork master {os.getpid()} preloaded in {(time.perf_counter() - started) * 1000:.0f} ms "
+            f"({gc.get_freeze_count()} objects frozen); forking {self.workers} workers"
+        )
+
+        os.environ[MASTER_PID_ENV] = str(os.getpid())
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for _ in range(self.workers):
+            self._spawn(socket)
+        self._supervise(socket)
+        socket.close()
+
+    def _spawn(self, socket):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+
+        # Worker: uvicorn installs its own signal handlers for graceful shutdown
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        code = 0
+        try:
+            uvicorn.Server(self.config).run(sockets=[socket])
+        except BaseException as e:
+            logger.error(f"Worker {os.getpid()} crashed: {str(e)}")
+            code = 1
+        finally:
+            # Never fall back into the master's code
+            os._exit(code)
+
+    def _supervise(self, socket):
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            logger.warning(f"Worker {pid} exited with code {os.waitstatus_to_exitcode(status)}; restarting")
+            if time.monotonic() - started < MIN_WORKER_SECONDS:
+                time.sleep(MIN_WORKER_SECONDS)
+            self._spawn(socket)
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+def _process_memory(process: psutil.Process, role: str) -> Dict:
+    info = process.memory_full_info()
+    return {
+        "pid": process.pid,
+        "role": role,
+        "current": process.pid == os.getpid(),
+        "uss_mb": round(info.uss / (1 << 20), 3),
+        "pss_mb": round(getattr(info, "pss", 0) / (1 << 20), 3),
+        "rss_mb": round(info.rss / (1 << 20), 3)
+    }
+
+def worker_memory() -> Dict:
+    """
+    Unique (USS), proportional (PSS) and resident memory of every serving
+    process: the prefork master and its workers, or this process alone.
+    USS is what each process costs on its own; pages still shared with
+    the master count in RSS but not in USS.
+    """
+    pid = master_pid()
+    if pid is None:
+        processes = [(psutil.Process(), "single")]
+    else:
+        master = psutil.Process(pid)
+        processes = [(master, "master")] + [(child, "worker") for child in master.children()]
+
+    report = []
+    for process, role in processes:
+        try:
+            report.append(_process_memory(process, role))
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return {
+        "mode": "single" if pid is None else "prefork",
+        "workers": sum(1 for row in report if row["role"] != "master"),
+        "processes": report,
+        "total_uss_mb": round(sum(row["uss_mb"] for row in report), 3),
+        "total_pss_mb": round(sum(row["pss_mb"] for row in report), 3),
+        "total_rss_mb": round(sum(row["rss_mb"] for row in report), 3)
+    }
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+from services.event_loop import cpu_executor
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Longest accepted input record; a longer line ends the stream with an error
+MAX_LINE_BYTES = 64 * 1024
+
+# (line number, raw line) pairs handed to a chunk scorer
+Lines = List[Tuple[int, bytes]]
+
+def stream_chunk_rows(chunk_rows: Optional[int] = None) -> int:
+    """Records scored together by the streaming endpoints (STREAM_CHUNK_ROWS)"""
+    return max(1, int(chunk_rows or os.getenv("STREAM_CHUNK_ROWS", 1000)))
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streaming response for handlers that read the request body while they
+    write the response.
+
+    Starlette's StreamingResponse listens for the client disconnecting by
+    reading ``receive`` alongside the body iterator, which would swallow the
+    request body messages the iterator is still reading. Here the iterator
+    is the only reader: a disconnect surfaces as ClientDisconnect from
+    ``request.stream()``, and writes to a closed connection are dropped by
+    the server.
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+async def _score(score_chunk: Callable[[Lines], bytes], lines: Lines) -> bytes:
+    """
+    Run ``score_chunk`` on cpu_executor(). The response status is long sent
+    by now, so a failing scorer (model not loaded, inference error) becomes
+    an error line per record of the chunk rather than a truncated stream.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(cpu_executor(), score_chunk, lines)
+    except Exception as e:
+        logger.error(f"Scoring NDJSON lines {lines[0][0]}-{lines[-1][0]} failed: {str(e)}")
+        error = json.dumps(f"Scoring failed: {str(e)}")
+        return "".join(f'{{"line": {line_number}, "error": {error}}}\n' for line_number, _ in lines).encode()
+
+async def score_ndjson(
+    body: AsyncIterator[bytes],
+    score_chunk: Callable[[Lines], bytes],
+    chunk_rows: int
+) -> AsyncIterator[bytes]:
+    """
+    Split an NDJSON request body into records and score them ``chunk_rows``
+    at a time.
+
+    ``score_chunk`` gets the numbered non-empty lines of one chunk and
+    returns its NDJSON output; it runs on cpu_executor() so parsing, scoring
+    and encoding stay off the event loop. Each chunk's output is yielded
+    before more of the body is read, so the server's flow control on both
+    sides keeps memory bounded by one chunk whatever the input size.
+    """
+    lines: Lines = []
+    line_number = 0
+    pending = b""
+    try:
+        async for data in body:
+            records = (pending + data).split(b"\n")
+            pending = records.pop()
+            if len(pending) > MAX_LINE_BYTES:
+                yield (
+                    f'{{"line": {line_number + len(records) + 1}, '
+                    f'"error": "Record longer than {MAX_LINE_BYTES} bytes, stream aborted"}}\n'
+                ).encode()
+                return
+            for record in records:
+                line_number += 1
+                if record.strip():
+                    lines.append((line_number, record))
+                if len(lines) >= chunk_rows:
+                    yield await _score(score_chunk, lines)
+                    lines = []
+    except ClientDisconnect:
+        logger.info(f"Client disconnected from NDJSON stream after {line_number} lines")
+        return
+
+    if pending.strip():
+        lines.append((line_number + 1, pending))
+    if lines:
+        yield await _score(score_chunk, lines)
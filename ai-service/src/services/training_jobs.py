@@ -0,0 +1,307 @@
+import json
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import psutil
+
+from models.model_registry import file_lock, model_registry
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+RELOADING = "reloading"
+COMPLETED = "completed"
+FAILED = "failed"
+
+ACTIVE_STATUSES = (PENDING, RUNNING, RELOADING)
+
+# Seconds a terminated job process gets to exit before it is killed
+TERMINATE_GRACE_SECONDS = 5.0
+
+def _train_enhanced(config: Dict, progress: Callable) -> Dict:
+    from models.enhanced_models import EnhancedMLModels
+    if config.get('incremental'):
+        return EnhancedMLModels().train_incremental(
+            int(config.get('n_samples', 500)),
+            seed=config.get('seed'),
+            n_estimators=config.get('n_estimators'),
+            compare_full=bool(config.get('compare_full_retrain', False)),
+            progress=progress
+        )
+    return EnhancedMLModels().train_models(int(config.get('n_samples', 2000)), progress=progress)
+
+def _train_predictor(model_name: str, config: Dict, progress: Callable) -> Dict:
+    from services.prediction_service import PredictionService
+    return PredictionService(load_models=False).train_model(model_name, config, progress)
+
+# Model name -> trainer run inside the job process
+TRAINERS = {
+    "enhanced": _train_enhanced,
+    "subject_predictor": lambda config, progress: _train_predictor("subject_predictor", config, progress),
+    "sgpa_predictor": lambda config, progress: _train_predictor("sgpa_predictor", config, progress),
+}
+
+def _to_json(value: Any) -> Any:
+    """Plain-Python copy of training metrics (numpy scalars become floats)"""
+    if isinstance(value, dict):
+        return {str(k): _to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+def _run_job(model_name: str, config: Dict, events):
+    """Job process entry point: train and report through ``events``"""
+    try:
+        os.nice(int(os.getenv("TRAINING_NICE", 10)))
+    except (AttributeError, OSError):
+        pass
+
+    def progress(fraction: float, stage: str):
+        events.put({"type": "progress", "progress": fraction, "stage": stage})
+
+    try:
+        metrics = TRAINERS[model_name](config, progress)
+        events.put({"type": "completed", "metrics": _to_json(metrics)})
+    except Exception as e:
+        events.put({"type": "failed", "error": str(e)})
+
+def _process_started(pid: int) -> Optional[float]:
+    """Start time of process ``pid``, None if there is no such process"""
+    try:
+        return psutil.Process(pid).create_time()
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+
+class TrainingJobManager:
+    """
+    Runs model retraining as background jobs.
+
+    Each job trains in its own (lower-priority) process so the serving
+    process keeps its event loop and cores, and publishes the result to the
+    model registry. A watcher thread follows the job's progress events; when
+    training succeeds the registry hooks subscribed for that model are run in
+    the serving process to swap in the new active version. One job per model
+    may be active at a time, and the last TRAINING_JOB_HISTORY jobs are kept
+    for status queries.
+
+    Job records live on disk, one JSON file per job under $MODEL_PATH/jobs,
+    and are read and updated under a file lock, so every prefork worker
+    answers status queries for every job and the one-job-per-model guard
+    holds across workers. The worker that started a job watches it; an
+    active job whose watcher has exited is marked failed.
+
+    Job processes are spawned, never forked: the serving process is
+    multi-threaded (event loop, executors, watchdog) and a forked child
+    would inherit whatever locks those threads held. A job still running
+    after TRAINING_JOB_TIMEOUT seconds (0 disables) is terminated and fails.
+    """
+
+    def __init__(self, history: Optional[int] = None, timeout: Optional[float] = None,
+                 directory: Optional[str] = None):
+        self.history = history or int(os.getenv("TRAINING_JOB_HISTORY", 50))
+        self.timeout = float(timeout if timeout is not None else os.getenv("TRAINING_JOB_TIMEOUT", 3600))
+        self.directory = directory or os.path.join(os.getenv("MODEL_PATH", "./data/models"), "jobs")
+
+    def submit(self, model_name: str, config: Optional[Dict] = None) -> Dict:
+        """Start a retrain job and return its status"""
+        if model_name not in TRAINERS:
+            raise KeyError(f"Model '{model_name}' not found")
+
+        with self._locked():
+            for job in self._read_all():
+                if job["model_name"] == model_name and job["status"] in ACTIVE_STATUSES:
+                    raise RuntimeError(f"Retraining of '{model_name}' already in progress: job {job['job_id']}")
+
+            job_id = uuid.uuid4().hex
+            self._write({
+                "job_id": job_id,
+                "model_name": model_name,
+                "status": PENDING,
+                "progress": 0.0,
+                "stage": "queued",
+                "config": config or {},
+                "metrics": None,
+                "error": None,
+                "created_at": datetime.utcnow().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "watcher_pid": os.getpid(),
+                "watcher_started": _process_started(os.getpid())
+            })
+            self._trim_history()
+
+        context = multiprocessing.get_context("spawn")
+        events = context.Queue()
+        process = context.Process(
+            target=_run_job,
+            args=(model_name, config or {}, events),
+            name=f"retrain-{model_name}",
+            daemon=True
+        )
+        try:
+            process.start()
+        except Exception as e:
+            self._finish(job_id, FAILED, error=f"Could not start the training process: {str(e)}")
+            raise
+        self._update(job_id, status=RUNNING, started_at=datetime.utcnow().isoformat(), pid=process.pid)
+        logger.info(f"Started retrain job {job_id} for {model_name} in process {process.pid}")
+
+        threading.Thread(
+            target=self._watch,
+            args=(job_id, process, events),
+            name=f"retrain-watch-{job_id[:8]}",
+            daemon=True
+        ).start()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._locked():
+            return self._read(job_id)
+
+    def list(self) -> List[Dict]:
+        """Every kept job, newest first"""
+        with self._locked():
+            return sorted(self._read_all(), key=lambda job: job["created_at"], reverse=True)
+
+    def _watch(self, job_id: str, process, events):
+        """Follow one job's events until it finishes, its process dies or it times out"""
+        deadline = time.monotonic() + self.timeout if self.timeout > 0 else None
+        while True:
+            try:
+                event = events.get(timeout=0.5)
+            except queue.Empty:
+                if deadline is not None and time.monotonic() > deadline and process.is_alive():
+                    self._terminate(process)
+                    self._finish(job_id, FAILED, error=f"Training timed out after {self.timeout:.0f} s (TRAINING_JOB_TIMEOUT)")
+                    return
+                if process.is_alive():
+                    continue
+                try:
+                    event = events.get(timeout=1.0)
+                except queue.Empty:
+                    self._finish(job_id, FAILED, error=f"Training process exited with code {process.exitcode}")
+                    return
+
+            if event["type"] == "progress":
+                self._update(job_id, progress=round(event["progress"], 3), stage=event["stage"])
+                continue
+
+            process.join()
+            if event["type"] == "failed":
+                self._finish(job_id, FAILED, error=event["error"])
+            else:
+                self._reload(job_id, event["metrics"])
+            return
+
+    @staticmethod
+    def _terminate(process):
+        process.terminate()
+        process.join(TERMINATE_GRACE_SECONDS)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def _reload(self, job_id: str, metrics: Dict):
+        model_name = self.get(job_id)["model_name"]
+        self._update(job_id, status=RELOADING, progress=0.95, stage="reloading model", metrics=metrics)
+        try:
+            model_registry.notify(model_name)
+        except Exception as e:
+            logger.error(f"Reload after retrain job {job_id} failed: {str(e)}")
+            self._finish(job_id, FAILED, error=f"Model trained but reload failed: {str(e)}")
+            return
+        self._finish(job_id, COMPLETED)
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None):
+        self._update(
+            job_id,
+            status=status,
+            progress=1.0 if status == COMPLETED else self.get(job_id)["progress"],
+            stage=status,
+            error=error,
+            finished_at=datetime.utcnow().isoformat()
+        )
+        logger.info(f"Retrain job {job_id} {status}" + (f": {error}" if error else ""))
+
+    def _update(self, job_id: str, **fields):
+        with self._locked():
+            job = self._read(job_id)
+            if job is not None:
+                job.update(fields)
+                self._write(job)
+
+    def _trim_history(self):
+        """Drop the oldest finished jobs beyond the history limit"""
+        jobs = sorted(self._read_all(), key=lambda job: job["created_at"])
+        finished = [job["job_id"] for job in jobs if job["status"] not in ACTIVE_STATUSES]
+        for job_id in finished[:max(0, len(jobs) - self.history)]:
+            try:
+                os.remove(self._path(job_id))
+            except FileNotFoundError:
+                pass
+
+    def _locked(self):
+        """Serialize job record updates across threads and worker processes"""
+        os.makedirs(self.directory, exist_ok=True)
+        return file_lock(os.path.join(self.directory, ".lock"))
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _read(self, job_id: str) -> Optional[Dict]:
+        # Job ids come from URLs; only plain hex ids name a record
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._path(job_id)) as f:
+                job = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return self._check_watcher(job)
+
+    def _read_all(self) -> List[Dict]:
+        jobs = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                job = self._read(name[:-len(".json")])
+                if job is not None:
+                    jobs.append(job)
+        return jobs
+
+    def _check_watcher(self, job: Dict) -> Dict:
+        """
+        Fail an active job whose watching worker is gone: nothing would ever
+        finish it. The records outlive the server, so a pid alone is not
+        enough (a restarted server is PID 1 again); the watcher must also
+        have the recorded start time.
+        """
+        watcher = job.get("watcher_pid")
+        alive = watcher is not None and _process_started(watcher) == job.get("watcher_started")
+        if job["status"] in ACTIVE_STATUSES and not alive:
+            job.update(
+                status=FAILED,
+                stage=FAILED,
+                error=f"Worker {watcher} watching the job exited",
+                finished_at=datetime.utcnow().isoformat()
+            )
+            self._write(job)
+        return job
+
+    def _write(self, job: Dict):
+        fd, staging = tempfile.mkstemp(prefix=".job-", dir=self.directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump(job, f)
+        os.replace(staging, self._path(job["job_id"]))
+
+training_jobs = TrainingJobManager()
@@ -0,0 +1,87 @@
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.logger import get_logger
+from utils.resource_usage import process_age_ms
+
+logger = get_logger(__name__)
+
+class Readiness:
+    """
+    Startup state reported by /health/ready.
+
+    ``run`` executes the startup steps (model loads and warm-ups) in order,
+    recording each step's duration and result; the service is ready only
+    once every step has succeeded. Time from process start to ready is
+    checked against STARTUP_BUDGET_MS so slow cold starts show up in the
+    logs and in the readiness report.
+    """
+
+    def __init__(self, budget_ms: Optional[float] = None):
+        self.budget_ms = budget_ms or float(os.getenv("STARTUP_BUDGET_MS", 10000))
+        self.startup_ms: Optional[float] = None
+        self.process_to_ready_ms: Optional[float] = None
+        self.ready = False
+        self.error: Optional[str] = None
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.steps: List[Dict] = []
+
+    def run(self, steps: List[Tuple[str, Callable[[], Any]]]):
+        self.ready = False
+        self.error = None
+        self.steps = []
+        self.started_at = datetime.utcnow().isoformat()
+        total_started = time.perf_counter()
+
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                result = step()
+            except Exception as e:
+                self.error = f"{name} failed: {str(e)}"
+                self.steps.append({"step": name, "ms": round((time.perf_counter() - started) * 1000, 3), "error": str(e)})
+                logger.error(f"Startup step {self.error}")
+                break
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+            self.steps.append({"step": name, "ms": elapsed_ms, "result": result})
+            logger.info(f"Startup step {name} finished in {elapsed_ms} ms")
+        else:
+            self.ready = True
+
+        self.finished_at = datetime.utcnow().isoformat()
+        self.startup_ms = round((time.perf_counter() - total_started) * 1000, 3)
+        self.process_to_ready_ms = round(process_age_ms(), 3)
+        logger.info(
+            f"Startup {'completed' if self.ready else 'failed'} in {self.startup_ms} ms "
+            f"({self.process_to_ready_ms} ms since process start)"
+        )
+        if self.ready and not self.within_budget:
+            logger.warning(
+                f"Startup took {self.process_to_ready_ms} ms, over the {self.budget_ms:g} ms budget"
+            )
+
+    @property
+    def within_budget(self) -> Optional[bool]:
+        if self.process_to_ready_ms is None:
+            return None
+        return self.process_to_ready_ms <= self.budget_ms
+
+    def to_dict(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "budget": {
+                "budget_ms": self.budget_ms,
+                "steps_ms": self.startup_ms,
+                "process_to_ready_ms": self.process_to_ready_ms,
+                "within_budget": self.within_budget
+            },
+            "steps": self.steps
+        }
+
+readiness = Readiness()
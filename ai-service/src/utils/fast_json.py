@@ -0,0 +1,39 @@
+from typing import Any
+
+import numpy as np
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _default(obj: Any) -> Any:
+    """Values orjson has no native encoding for"""
+    if isinstance(obj, np.ndarray):
+        # Object and string columns; numeric arrays are written natively
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """orjson encoding used by FastJSONResponse, NaN as null"""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    orjson-rendered JSON response.
+
+    NumPy arrays and scalars are written directly, without a pass through
+    Python floats. It is the app's default response class; routes that
+    build their payload themselves return it directly, which also skips
+    FastAPI's jsonable_encoder and response_model re-validation (the
+    response_model stays on the route for the OpenAPI schema).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,157 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+_MISSING = object()
+
+def _estimate_size(obj: Any) -> int:
+    """Approximate deep size in bytes of a cached key or prediction payload"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_estimate_size(k) + _estimate_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_estimate_size(v) for v in obj)
+    return size
+
+class PredictionCache:
+    """
+    In-process LRU cache for prediction results.
+
+    Entries are keyed on (namespace, model token, quantized features) and
+    bounded by count, approximate memory and age. Model tokens increase
+    every time a model is compiled, so when a namespace is seen with a newer
+    token (the model was retrained or reloaded) its old entries are dropped
+    and late results from the old model are ignored. Values are shared
+    between callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        decimals: Optional[int] = None,
+        enabled: Optional[bool] = None
+    ):
+        self.max_entries = max_entries or int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", 100000))
+        self.max_bytes = max_bytes or int(float(os.getenv("PREDICTION_CACHE_MAX_MB", 64)) * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", 3600))
+        self.decimals = decimals if decimals is not None else int(os.getenv("PREDICTION_CACHE_DECIMALS", 4))
+        self.enabled = enabled if enabled is not None else os.getenv("PREDICTION_CACHE_ENABLED", "true") == "true"
+
+        self._entries: "OrderedDict[Tuple, Tuple[Any, float, int]]" = OrderedDict()
+        self._tokens: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def make_key(self, namespace: str, token: int, features: Iterable) -> Tuple:
+        """Canonical key: features rounded to ``decimals`` so float noise still hits"""
+        quantized = tuple(
+            None if value is None else round(float(value), self.decimals)
+            for value in features
+        )
+        return (namespace, token, quantized)
+
+    def get(self, key: Tuple) -> Any:
+        """Return the cached value, or None on a miss"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key, _MISSING) if self._check_token(key) else _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return None
+            value, stored_at, size = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                self._remove(key, size)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Tuple, value: Any):
+        if not self.enabled:
+            return
+        size = _estimate_size(key) + _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if not self._check_token(key):
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (value, time.monotonic(), size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, namespace: Optional[str] = None):
+        """Drop every entry, or only those of one namespace"""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                self._tokens.clear()
+                self._bytes = 0
+            else:
+                self._drop_namespace(namespace)
+                self._tokens.pop(namespace, None)
+            self.invalidations += 1
+
+    def _check_token(self, key: Tuple) -> bool:
+        """
+        Drop a namespace's entries the first time a newer model token shows
+        up. Returns False for keys built against an older model.
+        """
+        namespace, token = key[0], key[1]
+        current = self._tokens.get(namespace, _MISSING)
+        if current is _MISSING:
+            self._tokens[namespace] = token
+        elif token > current:
+            self._drop_namespace(namespace)
+            self._tokens[namespace] = token
+            self.invalidations += 1
+        elif token < current:
+            return False
+        return True
+
+    def _drop_namespace(self, namespace: str):
+        for key in [k for k in self._entries if k[0] == namespace]:
+            self._remove(key, self._entries[key][2])
+
+    def _remove(self, key: Tuple, size: int):
+        del self._entries[key]
+        self._bytes -= size
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "approx_bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+# Process-wide cache shared by the prediction services
+prediction_cache = PredictionCache()
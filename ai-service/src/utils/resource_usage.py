@@ -0,0 +1,22 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+import psutil
+
+def rss_mb() -> float:
+    """Resident set size of this process in MiB"""
+    return psutil.Process().memory_info().rss / (1 << 20)
+
+def process_age_ms() -> float:
+    """Milliseconds since this process was created (interpreter start included)"""
+    return (time.time() - psutil.Process().create_time()) * 1000
+
+@contextmanager
+def measure_load(stats: Dict):
+    """Record wall time and resident-memory growth of the enclosed load into ``stats``"""
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    yield stats
+    stats['load_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    stats['rss_delta_mb'] = round(rss_mb() - rss_before, 3)